@@ -1,45 +1,43 @@
 import json
-import boto3
 import logging
 import os
 import io
-import re
+import time
 import uuid
 from PIL import Image  
 import base64
+import click
+from urllib.parse import quote
 from datetime import datetime, timezone
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from rembg import remove
 from transformers import AutoTokenizer
-from botocore.config import Config
+from boto3.dynamodb.conditions import Attr, Key
 from dotenv import load_dotenv
+from jobs import JobQueue
+from changefeed import ChangeLog, CHANGE_UPSERT, CHANGE_DELETE
+from wardrobe_cache import WardrobeCache, item_key
+from image_cache import ContentCache, content_hash
+from segmentation import SegmentationEngine
+from batching import MicroBatcher
+from parsing import JsonArrayElementStream, JsonObjectAccumulator
+from schemas import ATTRIBUTE_KEYS, ITEM_ATTRIBUTES, build_repair_prompt, parse_rec_outfit, parse_rec_response
+from preprocessing import DEFAULT_MAX_PIXELS, prepare_recognition_image
+from recognition_protocol import MULTIPART_PART_OVERHEAD, build_request_body, container_attributes, parse_container_attributes
+from retrieval import estimate_tokens, select_candidates, trim_to_token_budget
+from vector_index import VectorIndex, create_embedder
+from recommendation_cache import RecommendationCache, normalize_prompt
+from aws_clients import BoundedExecutor, client_config, create_client, create_resource, describe_config, endpoint_url
+from outfit_engine import candidate_items, describe_outfit, generate_outfits
+from renditions import CACHE_CONTROL, RENDITION_CONTENT_TYPE, RENDITION_SIZES, render, rendition_key
+from metrics import current_trace_id, start_trace
+from telemetry import BYTES, MODEL_TOKENS, REQUEST_SECONDS, REQUESTS, TRACE_HEADER, registry, span
 
 # Constants
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
-ATTRIBUTE_KEYS = [
-    "category",
-    "type",
-    "brand",
-    "size",
-    "style",
-    "color",
-    "material",
-    "fitted_market_value",
-    "accent_colors",
-    "pattern",
-    "shape",
-    "fit",
-    "neckline",
-    "key_design_elements",
-    "occasion_suitability",
-    "weather_appropriateness",
-    "fabric_weight",
-    "functional_features",
-    "additional_notes"
-]
+MAX_PAGE_SIZE = 500  # Largest page /list and /list-outfits return
 
-# DynamoDB field definitions
+# DynamoDB field definitions: (name placeholder, attribute, value placeholder, item field)
 DYNAMO_FIELDS = [
     ("#nm", "name", ":name", "name"),
     ("#category", "category", ":category", "category"),
@@ -49,6 +47,7 @@ DYNAMO_FIELDS = [
     ("#sty", "style", ":style", "style"),
     ("#pr", "color", ":primary_color", "color"),
     ("#mat", "material", ":material", "material"),
+    ("#fmv", "fitted_market_value", ":fitted_market_value", "fitted_market_value"),
     ("#st", "status", ":status", "status"),
     ("#processed_at", "processed_at", ":processed_at", "processed_at"),
     ("#ac", "accent_colors", ":accent_colors", "accent_colors"),
@@ -62,29 +61,32 @@ DYNAMO_FIELDS = [
     ("#fw", "fabric_weight", ":fabric_weight", "fabric_weight"),
     ("#ff", "functional_features", ":functional_features", "functional_features"),
     ("#an", "additional_notes", ":additional_notes", "additional_notes"),
+    ("#rn", "renditions", ":renditions", "renditions"),
+    ("#em", "error_message", ":error_message", "error_message"),
+    ("#fav", "favorite", ":favorite", "favorite"),
 ]
 
-# Helper to build update_expression, attribute names, and values
-def build_dynamo_update(metadata, product_name):
+def build_dynamo_update(fields: dict):
+    """
+    Builds a SET update from DYNAMO_FIELDS for the fields present in `fields`. Every
+    attribute goes through a name placeholder, so reserved words such as "size",
+    "name" and "status" need no special casing.
+
+    Args:
+        fields (dict): key: item field, value: new value.
+
+    Returns:
+        tuple: (UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues).
+    """
     update_parts = []
     names = {}
     values = {}
-
-    for abv, full, val_key in DYNAMO_FIELDS:
-        update_parts.append(f"{abv} = {val_key}")
-        names[abv] = full
-        if val_key == ":name":
-            values[val_key] = product_name
-        elif val_key == ":status":
-            values[val_key] = "processed"
-        elif val_key == ":processed_at":
-            from datetime import datetime, timezone
-            values[val_key] = datetime.now(timezone.utc).isoformat()
-        else:
-            values[val_key] = metadata.get(full, "unknown")
-
-    update_expression = "SET " + ", ".join(update_parts)
-    return update_expression, names, values
+    for name_key, attribute, value_key, field in DYNAMO_FIELDS:
+        if field in fields:
+            update_parts.append(f"{name_key} = {value_key}")
+            names[name_key] = attribute
+            values[value_key] = fields[field]
+    return "SET " + ", ".join(update_parts), names, values
 
 # Load environment variables from .env file
 load_dotenv()
@@ -100,128 +102,448 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=[TRACE_HEADER])
 
-# Initialize AWS resources
-dynamodb = boto3.resource("dynamodb", region_name=os.getenv("AWS_REGION"))
+# Initialize AWS resources (pool sizes, timeouts, retries and endpoint overrides are set in aws_clients.py)
+dynamodb = create_resource("dynamodb")  # DYNAMODB_ENDPOINT_URL, e.g. DynamoDB Local for development
 outfits_table = dynamodb.Table('outfits')
 clothing_items_table = dynamodb.Table("clothing-items")
 
-s3_client = boto3.client(
+# Secondary indexes on clothing-items used for filtered listings
+CATEGORY_INDEX = os.getenv("CATEGORY_INDEX", "category-index")
+STATUS_INDEX = os.getenv("STATUS_INDEX", "status-index")
+S3_URL_INDEX = os.getenv("S3_URL_INDEX", "s3_url-index")
+ITEM_FIELDS = ["clothing-item-id", "id", "name", "s3_url", "renditions", "status", "favorite",
+               "processed_at", "error_message"] + ATTRIBUTE_KEYS
+OUTFIT_FIELDS = ["id", "images", "prompt", "createdAt"]
+
+# e.g. MinIO or moto server for development; objects are then addressed path-style
+S3_ENDPOINT_URL = endpoint_url("s3")
+s3_client = create_client(
     "s3",
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+    # Presigned URLs must be SigV4 to work in every region
+    signature_version="s3v4",
+    s3={"addressing_style": "path" if S3_ENDPOINT_URL else "virtual"}
+)
+
+# Direct-to-S3 uploads: raw images land under INCOMING_PREFIX and are processed from there
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(50 * 1024 * 1024)))
+MULTIPART_THRESHOLD = int(os.getenv("MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+MULTIPART_PART_SIZE = max(int(os.getenv("MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)  # S3 minimum is 5MB
+PRESIGNED_URL_EXPIRY = int(os.getenv("PRESIGNED_URL_EXPIRY", "900"))
+INCOMING_PREFIX = "incoming/"
+ALLOWED_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+sagemaker_client = create_client("sagemaker-runtime")
+bedrock_runtime = create_client("bedrock-runtime")
+
+# Shared bounded pool for fanning out independent S3/DynamoDB calls
+io_executor = BoundedExecutor(max_workers=int(os.getenv("IO_WORKERS", "8")), name="io")
+
+# Dedup cache for background removal and recognition results, keyed by image content
+image_cache = ContentCache(
+    max_bytes=int(os.getenv("IMAGE_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    disk_dir=os.path.join(os.path.dirname(__file__), "cache", "images") if os.getenv("IMAGE_CACHE_DISK") == "1" else None
+)
+
+# Background removal with preloaded rembg sessions
+segmentation_engine = SegmentationEngine(
+    model_name=os.getenv("REMBG_MODEL", "u2net"),
+    pool_size=int(os.getenv("REMBG_POOL_SIZE", "2")),
+    max_side=int(os.getenv("REMBG_MAX_SIDE")) if os.getenv("REMBG_MAX_SIDE") else None,
+    threads=int(os.getenv("REMBG_THREADS")) if os.getenv("REMBG_THREADS") else None
+)
+if os.getenv("REMBG_PRELOAD", "1") == "1":
+    segmentation_engine.warmup()
+
+# Recognition endpoint. Concurrent upload jobs share batched invocations.
+RECOGNITION_ENDPOINT = os.getenv("RECOGNITION_ENDPOINT", "qwen-inference")
+RECOGNITION_STREAMING = os.getenv("RECOGNITION_STREAMING") == "1"  # Stream single images instead of batching
+RECOGNITION_MAX_PIXELS = int(os.getenv("RECOGNITION_MAX_PIXELS", str(DEFAULT_MAX_PIXELS)))  # Keep equal to the container's MAX_PIXELS
+# Ask again for required attributes the model left out, instead of failing the upload
+RECOGNITION_REPAIR = os.getenv("RECOGNITION_REPAIR", "1") == "1"
+RECOGNITION_REPAIR_MAX_TOKENS = int(os.getenv("RECOGNITION_REPAIR_MAX_TOKENS", "128"))
+recognition_batcher = MicroBatcher(
+    lambda entries: run_recognition_batch(*map(list, zip(*entries))),  # (JPEG bytes, trace id) per entry
+    max_batch_size=int(os.getenv("RECOGNITION_MAX_BATCH", "8")),
+    window_ms=float(os.getenv("RECOGNITION_BATCH_WINDOW_MS", "50")),
+    max_batch_cost=MAX_IMAGE_SIZE,  # Keep each request body under the SageMaker payload limit
+    # Entries hold the encoded JPEG that is sent, plus its multipart part headers
+    cost_fn=lambda entry: len(entry[0]) + MULTIPART_PART_OVERHEAD,
+    # Endpoint calls in flight at once; upload jobs keep encoding while these run
+    max_concurrency=int(os.getenv("RECOGNITION_CONCURRENCY", "2")),
+    name="recognition-batcher"
 )
 
-sagemaker_client = boto3.client(
-    "sagemaker-runtime",
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+# Recommendation retrieval: candidates kept per category, and the token budget for their descriptions
+RECOMMEND_CANDIDATES_PER_CATEGORY = int(os.getenv("RECOMMEND_CANDIDATES_PER_CATEGORY", "8"))
+RECOMMEND_INVENTORY_TOKEN_BUDGET = int(os.getenv("RECOMMEND_INVENTORY_TOKEN_BUDGET", "1500"))
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-sonnet-20240229-v1:0")
+MAX_OUTFITS = 5  # Outfits per /recommend call
+RECOMMEND_MODES = ["model", "fast"]  # "fast" answers from the rule-based outfit engine without Bedrock
+# Answer from the outfit engine when the Bedrock call or its output fails
+RECOMMEND_FALLBACK = os.getenv("RECOMMEND_FALLBACK", "1") == "1"
+# If > 0, prompt candidates are the items of this many top rule-based outfits instead of per-category retrieval
+RECOMMEND_PRESELECT_OUTFITS = int(os.getenv("RECOMMEND_PRESELECT_OUTFITS", "0"))
+
+# Cache of recommendation responses, keyed by wardrobe version and normalized prompt
+recommendation_cache = RecommendationCache(
+    max_entries=int(os.getenv("RECOMMEND_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("RECOMMEND_CACHE_TTL", "3600"))
 )
 
-bedrock_runtime = boto3.client(
-    "bedrock-runtime",
-    region_name=os.getenv("AWS_REGION"),
-    config=Config(retries={"max_attempts": 3})
+# Background worker pool for upload jobs
+upload_jobs = JobQueue(max_workers=int(os.getenv("UPLOAD_WORKERS", "4")))
+if io_executor.max_workers + upload_jobs.max_workers > client_config("s3").max_pool_connections:
+    logger.warning("IO_WORKERS + UPLOAD_WORKERS exceeds AWS_MAX_POOL_CONNECTIONS; S3 connections will be discarded and reopened")
+
+# Wardrobe change log for incremental /list syncs
+change_log = ChangeLog()
+LONG_POLL_MAX_SECONDS = 30
+
+def load_all_clothing_items():
+    """
+    Reads every item from the clothing-items table, following pagination.
+    """
+    with span("dynamodb_scan"):
+        items, _ = read_items(clothing_items_table, "scan")
+    return items
+
+# Process-local wardrobe cache, kept current by the mutation endpoints
+wardrobe_cache = WardrobeCache(load_all_clothing_items, ttl_seconds=float(os.getenv("WARDROBE_CACHE_TTL", "300")))
+
+# Embedding index over item attributes for /search and /similar
+vector_index = VectorIndex(
+    create_embedder(os.getenv("EMBEDDING_MODEL")),
+    path=None if os.getenv("VECTOR_INDEX_DISK") == "0" else os.path.join(os.path.dirname(__file__), "cache", "vectors")
 )
+DEFAULT_SEARCH_RESULTS = 10
+MAX_SEARCH_RESULTS = 50
 
-def compress_image(image_bytes, max_size=5*1024*1024, quality=85):
+def record_item_upsert(item: dict):
     """
-    Compress an image to ensure it stays under a specified size limit (default 5MB).
+    Writes a created or updated item through to the wardrobe cache and change log.
 
     Args:
-        image_bytes (bytes): The original image in bytes.
-        max_size (int, optional): Maximum allowed image size in bytes. Defaults to 5MB.
-        quality (int, optional): Initial JPEG quality. Defaults to 85.
+        item (dict): Full item record after the write.
+    """
+    if not item:
+        return
+    wardrobe_cache.put(item)
+    change_log.record(CHANGE_UPSERT, item_key(item), item)
+    recommendation_cache.clear()
+    # Only items with recognized attributes are searchable
+    if item.get("status", "processed") == "processed":
+        vector_index.upsert(item_key(item), create_item_embedding_text(item))
+    else:
+        vector_index.remove(item_key(item))
+
+def record_item_delete(item_id: str):
+    """
+    Removes a deleted item from the wardrobe cache and records it in the change log.
+
+    Args:
+        item_id (str): Id of the deleted item.
+    """
+    wardrobe_cache.remove(item_id)
+    change_log.record(CHANGE_DELETE, item_id)
+    recommendation_cache.clear()
+    vector_index.remove(item_id)
+
+def update_item_fields(item_id: str, fields: dict, **kwargs):
+    """
+    Writes fields to a clothing item with one update_item call and returns the updated
+    record (ReturnValues ALL_NEW, so no read-back is needed). The wardrobe cache is
+    updated with it.
+
+    Args:
+        item_id (str): Id of the clothing item.
+        fields (dict): key: item field from DYNAMO_FIELDS, value: new value.
+        **kwargs: Extra update_item arguments, e.g. ConditionExpression.
 
     Returns:
-        bytes: Compressed image in JPEG format.
+        dict: The item as stored after the update.
     """
-    try:
-        img = Image.open(io.BytesIO(image_bytes))
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-            
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=quality)
-        
-        # Reduce quality incrementally if still too large
-        while len(output.getvalue()) > max_size and quality > 10:
-            quality -= 5
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=quality)
-            
-        logger.info(f"Compressed image from {len(image_bytes)} to {len(output.getvalue())} bytes")
-        return output.getvalue()
-    except Exception as e:
-        logger.error(f"Error compressing image: {e}")
-        return image_bytes  # Fallback to original if compression fails
+    update_expression, names, values = build_dynamo_update(fields)
+    names.update(kwargs.pop("ExpressionAttributeNames", {}))
+    values.update(kwargs.pop("ExpressionAttributeValues", {}))
+    with span("dynamodb_update"):
+        response = clothing_items_table.update_item(
+            Key={"clothing-item-id": item_id},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_NEW",
+            **kwargs
+        )
+    item = response.get("Attributes")
+    record_item_upsert(item)
+    return item
 
-def run_recognition(temp_file_path):
+def put_items(items: list):
+    """
+    Writes new item records: put_item for one, a batch writer (25 puts per call) for several.
+    """
+    with span("dynamodb_put"):
+        if len(items) == 1:
+            clothing_items_table.put_item(Item=items[0])
+        elif items:
+            with clothing_items_table.batch_writer() as batch:
+                for item in items:
+                    batch.put_item(Item=item)
+    for item in items:
+        record_item_upsert(item)
+
+def sync_vector_index():
+    """
+    Re-syncs the vector index with the wardrobe whenever the wardrobe cache has been
+    reloaded from DynamoDB, picking up changes made by other processes. Writes in this
+    process already reach the index through record_item_upsert/record_item_delete.
     """
-    Calls the Qwen VL model with the provided image file and returns the recognition result.
+    items = wardrobe_cache.items()  # Reloads the cache first if its TTL has expired
+    if vector_index.synced_version == wardrobe_cache.refreshes:
+        return
+    vector_index.sync(
+        {
+            item_key(item): create_item_embedding_text(item)
+            for item in items if item.get("status", "processed") == "processed"
+        },
+        version=wardrobe_cache.refreshes
+    )
+
+def encode_recognition_image(image_bytes: bytes, image=None):
+    """
+    Prepares an image for the recognition endpoint.
 
     Args:
-        temp_file_path (str): Path to the temporary image file.
+        image_bytes (bytes | memoryview): Encoded image.
+        image (PIL.Image.Image, optional): Already decoded image_bytes, reused instead of decoding again.
 
     Returns:
-        dict: Recognition result from the model.
+        bytes: JPEG bytes, sent to the endpoint as-is.
     """
-    with open(temp_file_path, "rb") as image_file:
-        image_bytes = image_file.read()
-        
-        # Compress if over MAX_IMAGE_SIZE (leave some headroom)
-        if len(image_bytes) > MAX_IMAGE_SIZE:
-            image_bytes = compress_image(image_bytes)
-            
-        # Convert to base64 (expected model input format)
-        image_base64 = "data:image;base64," + base64.b64encode(image_bytes).decode("utf-8")
-
-        # Call Qwen VL model
+    # Resize to the model's pixel budget and encode in one pass
+    image_bytes, stats = prepare_recognition_image(
+        image_bytes, img=image, max_pixels=RECOGNITION_MAX_PIXELS, max_size=MAX_IMAGE_SIZE
+    )
+    logger.info(
+        f"Preprocessed image from {stats['input_bytes']} to {stats['bytes']} bytes "
+        f"({stats['size'][0]}x{stats['size'][1]}, ~{stats['vision_tokens']} vision tokens, "
+        f"quality {stats['quality']}, {stats['encodes']} encodes, {stats['encode_ms']} ms)"
+    )
+    return image_bytes
+
+def parse_recognition_output(generated_text: str):
+    """
+    Extracts the attributes from the recognition model's output and maps the model's
+    keys ("Primary Color", nested "analysis" objects, ...) onto ATTRIBUTE_KEYS.
+
+    Args:
+        generated_text (str): Raw text generated by the model.
+
+    Returns:
+        dict: Normalized attributes (possibly incomplete), or None if no JSON was found.
+    """
+    logger.info(f"Model response:\n{generated_text}")
+    with span("recognition_parse"):
+        attributes, missing = ITEM_ATTRIBUTES.parse(generated_text)
+    if not attributes:
+        logger.error("No valid JSON found in model output.")
+        return None
+    logger.info(f"Extracted features: {attributes}")
+    if missing:
+        logger.info(f"Recognition output is missing required attributes: {missing}")
+    return attributes
+
+def record_container_tokens(response):
+    """
+    Counts the tokens the recognition container reports in its CustomAttributes response.
+    """
+    attributes = parse_container_attributes(response.get("CustomAttributes"))
+    if attributes.get("tokens", "").isdigit():
+        MODEL_TOKENS.inc(int(attributes["tokens"]), model=RECOGNITION_ENDPOINT, direction="output")
+
+def invoke_recognition(images: list, trace_ids: list = None):
+    """
+    Calls the Qwen VL model once for one or more images.
+
+    Args:
+        images (list): JPEG bytes per image, from encode_recognition_image.
+        trace_ids (list, optional): Trace id of the request each image came from.
+
+    Returns:
+        list: Generated text per image, in order.
+    """
+    # A single image goes as a raw JPEG body, several as one multipart request
+    body, content_type = build_request_body(images)
+    custom_attributes = container_attributes(trace_ids)
+    BYTES.inc(len(body), kind="recognition_payload")
+    with span("recognition_invoke"):
         response = sagemaker_client.invoke_endpoint(
-            EndpointName="qwen-inference",
-            ContentType="application/json",
-            Body=json.dumps({"image": image_base64})
+            EndpointName=RECOGNITION_ENDPOINT,
+            ContentType=content_type,
+            Accept="application/json",
+            Body=body,
+            **({"CustomAttributes": custom_attributes} if custom_attributes else {})
         )
-        print("Raw response:", response)
+        # Retrieve generated texts, one per image
+        result = json.loads(response["Body"].read().decode("utf-8"))
+    record_container_tokens(response)
+    generated_texts = result["generated_texts"] if "generated_texts" in result else [result["generated_text"]]
+    if len(generated_texts) != len(images):
+        raise RuntimeError(f"Recognition returned {len(generated_texts)} texts for {len(images)} images")
+    logger.info(
+        f"[{custom_attributes}] Recognition batch of {len(images)} images completed: "
+        f"{response.get('CustomAttributes') or 'no metrics'}, request id {response.get('ResponseMetadata', {}).get('RequestId')}"
+    )
+    return generated_texts
+
+def run_recognition_batch(images: list, trace_ids: list = None):
+    """
+    Recognizes a batch of images with one endpoint call. If the batched call fails, each
+    image is sent again on its own, so a bad image or a failed call only fails its own item.
 
-        # Retrieve generate text and log
-        generated_text = response["generated_text"]
-        logger.info(f"Model response:\n{generated_text}")
+    Args:
+        images (list): JPEG bytes per image, from encode_recognition_image.
+        trace_ids (list, optional): Trace id of the request each image came from.
 
-        # Parse JSON
+    Returns:
+        list: Recognition result dict per image, in order, or None for an image that failed.
+    """
+    trace_ids = trace_ids or [None] * len(images)
+    try:
+        generated_texts = invoke_recognition(images, trace_ids)
+    except Exception as e:
+        if len(images) == 1:
+            logger.error(f"[{trace_ids[0]}] Recognition failed: {e}")
+            return [None]
+        logger.error(f"Recognition batch of {len(images)} images failed, sending each image on its own: {e}")
+        return [run_recognition_batch([image], [trace_id])[0] for image, trace_id in zip(images, trace_ids)]
+
+    results = []
+    for generated_text, trace_id in zip(generated_texts, trace_ids):
         try:
-            # Find clean json string
-            start_index = generated_text.find("{")
-            end_index = generated_text.rfind("}") + 1
+            results.append(parse_recognition_output(generated_text))
+        except Exception as e:
+            logger.error(f"[{trace_id}] Could not parse recognition output: {e}")
+            results.append(None)
+    return results
 
-            # If no valid json found, return None
-            if start_index == -1 or end_index == 0:
-                logger.error("No valid JSON found in model output.")
-                return None
+def run_recognition_stream(body: bytes, trace_id: str = None):
+    """
+    Calls the Qwen VL model in streaming mode and parses the attributes as soon as
+    the top-level JSON object is complete, closing the stream without waiting for the rest.
 
-            # Extract json string
-            valid_json_string = generated_text[start_index:end_index]
+    Args:
+        body (bytes): JPEG bytes from encode_recognition_image.
+        trace_id (str, optional): Trace id of the request the image came from.
 
-            # Load json
-            features = json.loads(valid_json_string)
-            logger.info(f"Extracted features: {features}")
+    Returns:
+        dict: Recognition result, or None if the stream ended without a complete JSON object.
+    """
+    BYTES.inc(len(body), kind="recognition_payload")
+    custom_attributes = container_attributes([trace_id], stream=1)
+    json_text = None
+    generated_parts = []
+    # Timed like invoke_recognition: from the call until the JSON object is complete
+    with span("recognition_invoke"):
+        response = sagemaker_client.invoke_endpoint_with_response_stream(
+            EndpointName=RECOGNITION_ENDPOINT,
+            ContentType="image/jpeg",
+            Accept="text/plain",
+            CustomAttributes=custom_attributes,
+            Body=body
+        )
+        event_stream = response["Body"]
+        accumulator = JsonObjectAccumulator()
+        try:
+            for event in event_stream:
+                if "PayloadPart" not in event:
+                    continue
+                chunk = event["PayloadPart"]["Bytes"].decode("utf-8", errors="ignore")
+                generated_parts.append(chunk)
+                json_text = accumulator.feed(chunk)
+                if json_text is not None:
+                    break
+        finally:
+            event_stream.close()
+    logger.info(
+        f"[{custom_attributes}] Recognition stream completed, "
+        f"request id {response.get('ResponseMetadata', {}).get('RequestId')}"
+    )
+
+    if json_text is None:
+        logger.error(f"[{trace_id}] Recognition stream ended before the JSON object was complete.")
+        json_text = "".join(generated_parts)
+    return parse_recognition_output(json_text)
+
+def run_recognition(image_bytes: bytes, image=None):
+    """
+    Calls the Qwen VL model with the provided image and returns the recognition result.
+    The image is encoded on the calling (upload job) thread; concurrent calls are then
+    merged into batched endpoint invocations, unless RECOGNITION_STREAMING is enabled,
+    in which case each image is streamed on its own.
 
-            return features
+    Args:
+        image_bytes (bytes | memoryview): Encoded image, kept in memory.
+        image (PIL.Image.Image, optional): Already decoded image_bytes, reused instead of decoding again.
+
+    Returns:
+        dict: Recognition result from the model, or None if recognition failed.
+    """
+    body = encode_recognition_image(image_bytes, image)
+    if RECOGNITION_STREAMING:
+        attributes = run_recognition_stream(body, current_trace_id())
+    else:
+        attributes = recognition_batcher.submit((body, current_trace_id())).result()
+
+    missing = ITEM_ATTRIBUTES.missing(attributes or {})
+    if missing and RECOGNITION_REPAIR:
+        attributes = repair_recognition(body, attributes or {}, missing)
+    return attributes
+
+def repair_recognition(body: bytes, attributes: dict, missing: list):
+    """
+    Asks the recognition model again for only the missing required attributes (via the
+    container's `prompt` custom attribute, with a small token budget) and merges them in.
+
+    Args:
+        body (bytes): JPEG bytes from encode_recognition_image.
+        attributes (dict): Attributes parsed so far.
+        missing (list): Required attribute keys to ask for.
+
+    Returns:
+        dict: The merged attributes, or None if there still are none.
+    """
+    logger.info(f"Asking the recognition model again for: {missing}")
+    try:
+        response = sagemaker_client.invoke_endpoint(
+            EndpointName=RECOGNITION_ENDPOINT,
+            ContentType="image/jpeg",
+            Accept="application/json",
+            CustomAttributes=container_attributes(
+                prompt=quote(build_repair_prompt(missing)), max_new_tokens=RECOGNITION_REPAIR_MAX_TOKENS
+            ),
+            Body=body
+        )
+        result = json.loads(response["Body"].read().decode("utf-8"))
+        record_container_tokens(response)
+        repaired, _ = ITEM_ATTRIBUTES.parse(result["generated_text"])
+    except Exception as e:
+        logger.error(f"Recognition repair failed: {e}")
+        return attributes or None
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing extracted JSON: {e}")
-            return None
+    merged = {**attributes, **{key: value for key, value in repaired.items() if key in missing and value}}
+    logger.info(f"Recognition repair filled {sorted(set(missing) - set(ITEM_ATTRIBUTES.missing(merged)))}")
+    return merged or None
 
-def create_detailed_item_description(item: dict, item_id: str):
+def create_detailed_item_description(item: dict, item_id: str = None):
     """
     Builds a detailed description for a clothing item to be used in prompts.
 
     Args:
         item (dict): Clothing item attributes.
-        item_id (str): Unique identifier for the item.
+        item_id (str, optional): Unique identifier for the item. Left out of the description if None.
 
     Returns:
         str: Detailed item description string.
@@ -250,7 +572,8 @@ def create_detailed_item_description(item: dict, item_id: str):
     description_parts = []
     
     # Start with the ID reference
-    description_parts.append(f"[Item {item_id}]")
+    if item_id is not None:
+        description_parts.append(f"[Item {item_id}]")
 
     # Basic item description (example: "Striped red t-shirt")
     base_desc = f"{color} {type_of_clothing}"
@@ -302,16 +625,64 @@ def create_detailed_item_description(item: dict, item_id: str):
 
     return full_description
 
-def create_outfit_recommendation_prompt(clothing_items: list):
+def create_item_embedding_text(item: dict):
+    """
+    Builds the text an item is embedded from for the vector index: its category and
+    the same attributes as its detailed prompt description.
+
+    Args:
+        item (dict): Clothing item attributes.
+
+    Returns:
+        str: Text to embed.
+    """
+    return f"{item.get('category', '')}: {create_detailed_item_description(item)}"
+
+def create_compact_item_description(item: dict, item_id: str):
+    """
+    Builds a short description for a clothing item: only the attributes that decide
+    whether it fits an occasion and the weather, without free-text notes.
+
+    Args:
+        item (dict): Clothing item attributes.
+        item_id (str): Unique identifier for the item.
+
+    Returns:
+        str: Compact item description string.
+    """
+    NULL_ATTRIBUTES = ["Not specified", "Not applicable", "N/A", "pending"]
+
+    def known(key):
+        value = item.get(key)
+        return value if value and value not in NULL_ATTRIBUTES else None
+
+    base_desc = " ".join(part for part in [known('pattern'), known('color'), known('type')] if part)
+    description_parts = [f"[Item {item_id}] {base_desc}"]
+    if known('style'):
+        description_parts.append(f"{known('style')} style")
+    if known('material'):
+        description_parts.append(known('material'))
+    if known('fit'):
+        description_parts.append(f"{known('fit')} fit")
+    if known('occasion_suitability'):
+        description_parts.append(f"for {known('occasion_suitability')}")
+    if known('weather_appropriateness'):
+        description_parts.append(f"{known('weather_appropriateness')} weather")
+    return ", ".join(description_parts)
+
+def create_outfit_recommendation_prompt(clothing_items: list, compact: bool = False, count: int = 1):
     """
     Builds a system prompt string from a list of clothing items for outfit recommendation.
 
     Args:
         clothing_items (list): List of clothing item dictionaries.
+        compact (bool, optional): Use compact item descriptions instead of detailed ones.
+        count (int, optional): Number of distinct outfits to ask for.
 
     Returns:
         str: System prompt for the recommendation model.
     """
+    describe = create_compact_item_description if compact else create_detailed_item_description
     # Group items by category
     inventory_by_category = {} # key: category, value: list of item descriptions strings
     for idx, item in enumerate(clothing_items):
@@ -320,7 +691,7 @@ def create_outfit_recommendation_prompt(clothing_items: list):
             inventory_by_category[category] = []
         
         # Create detailed description for each item
-        item_description = create_detailed_item_description(item, str(idx))
+        item_description = describe(item, str(idx))
         inventory_by_category[category].append(item_description)
 
     # Build inventory text. List available items by category
@@ -338,14 +709,20 @@ AVAILABLE INVENTORY:
 INSTRUCTIONS:
 1. Only recommend items that are explicitly listed in the inventory above.
 2. Each outfit should include: at least 1 top, 1 bottom, and 1 footwear (optional outerwear depending on the occasion/weather).
-3. The recommendation should follow the JSON format exactly as shown below:
+3. Recommend exactly {count} outfit{"s" if count > 1 else ""}.{" No two outfits may use the same combination of items." if count > 1 else ""}
+4. The recommendation should follow the JSON format exactly as shown below:
 {{
-    "Outfit": [item_id numbers],
-    "Explanation": "1-2 sentences explaining why this outfit works",
-    "Styling Tips": "1-2 sentences on additional styling suggestions"
+    "outfits": [
+        {{
+            "Outfit": [item_id numbers],
+            "Explanation": "1-2 sentences explaining why this outfit works",
+            "Styling Tips": "1-2 sentences on additional styling suggestions"
+        }}
+    ]
 }}
 
 FORMAT:
+- "outfits": Array with one object per outfit, best outfit first
 - "Outfit": Array of IDs (without the "Item" prefix)
 - "Explanation" and "Styling Tips": Concise sentences.
 
@@ -354,246 +731,1081 @@ Do not include any extra text, markdown formatting, or explanation outside of th
 """
     return prompt
 
-def parse_rec_response(response_str: str):
+# ------------------------ Recommendation helpers ------------------------
+def parse_outfit_count(value):
+    """
+    Parses the `count` of outfits to recommend.
+
+    Returns:
+        int: Number of outfits (1 if not given).
+
+    Raises:
+        ValueError: If the value is not an integer between 1 and MAX_OUTFITS.
     """
-    Parses the raw model response string to extract the 'Outfit', 'Explanation', and 'Styling Tips' fields as JSON.
+    count = int(value) if value is not None else 1
+    if count < 1 or count > MAX_OUTFITS:
+        raise ValueError(f"count must be between 1 and {MAX_OUTFITS}")
+    return count
+
+def parse_recommend_mode(value):
+    """
+    Parses the recommendation `mode`.
+
+    Returns:
+        str: "model" (default) or "fast".
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    mode = value or "model"
+    if mode not in RECOMMEND_MODES:
+        raise ValueError(f"mode must be one of {', '.join(RECOMMEND_MODES)}")
+    return mode
+
+def rule_based_outfits(wardrobe: list, user_prompt: str, count: int):
+    """
+    Recommends outfits with the local outfit engine, in the same shape as parsed model
+    outfits plus "source": "rules".
+
+    Returns:
+        list: Outfits (fewer than count if the wardrobe cannot fill them; empty if a slot has no items).
+    """
+    outfits = []
+    for _, outfit_items in generate_outfits(wardrobe, user_prompt, count=count):
+        explanation, styling = describe_outfit(outfit_items, user_prompt)
+        outfits.append({
+            "outfit": [item["s3_url"] for item in outfit_items],
+            "explanation": explanation,
+            "styling": styling,
+            "source": "rules"
+        })
+    return outfits
+
+def build_recommendation_request(wardrobe: list, user_prompt: str, count: int):
+    """
+    Selects the candidate items for a request and builds the Bedrock request body.
 
     Args:
-        response_str (str): Raw text response from the recommendation model.
+        wardrobe (list): Every wardrobe item.
+        user_prompt (str): The user's request.
+        count (int): Number of outfits to ask for.
 
     Returns:
-        dict: Parsed fields as a dictionary.
+        tuple: (candidate items, indexed as in the prompt; request body dict).
     """
-    outfit_match = re.search(r"\"Outfit\":\s*(\[[^\]]*\])", response_str)
-    explanation_match = re.search(r"\"Explanation\":\s*\"([^\"]*)\"", response_str)
-    styling_match = re.search(r"\"Styling Tips\":\s*\"([^\"]*)\"", response_str)
-    
-    if not (outfit_match and explanation_match and styling_match):
-        raise ValueError("Invalid response format from recommendation model.")
-    
-    outfit_ids = json.loads(outfit_match.group(1))
-    explanation = explanation_match.group(1)
-    styling_tips = styling_match.group(1)
-    
+    # Keep the items that best match the request, within the prompt token budget
+    candidates = []
+    if RECOMMEND_PRESELECT_OUTFITS > 0:
+        candidates = candidate_items(wardrobe, user_prompt, outfits=RECOMMEND_PRESELECT_OUTFITS)
+    if not candidates:
+        candidates = select_candidates(wardrobe, user_prompt, per_category=RECOMMEND_CANDIDATES_PER_CATEGORY)
+    candidates = trim_to_token_budget(
+        candidates,
+        lambda item: create_compact_item_description(item, "000"),
+        max_tokens=RECOMMEND_INVENTORY_TOKEN_BUDGET
+    )
+    items = [item for _, item in candidates]
+
+    # Create outfit recommendation prompt using the candidate items
+    sys_prompt = create_outfit_recommendation_prompt(items, compact=True, count=count)
+    logger.info(f"Prompt tokens: ~{estimate_tokens(sys_prompt)} for {len(items)} of {len(wardrobe)} items")
+    logger.info(f"System prompt created:\n{sys_prompt}")
+
+    # Prepare the messages for Claude model
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": f"{sys_prompt}\n\n{user_prompt}"
+                }
+            ]
+        }
+    ]
+
+    # Prepare the body for Bedrock; each extra outfit needs room for its explanation and tips
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 1000 + 400 * (count - 1),
+        "messages": messages,
+        "temperature": 0.7,
+        "top_p": 0.9
+    }
+    return items, body
+
+def record_bedrock_usage(usage: dict):
+    """
+    Counts the input and output tokens of a Bedrock response's (or stream event's) usage block.
+    """
+    for key, direction in (("input_tokens", "input"), ("output_tokens", "output")):
+        if (usage or {}).get(key):
+            MODEL_TOKENS.inc(usage[key], model=BEDROCK_MODEL_ID, direction=direction)
+
+def resolve_outfit(rec_output: dict, items: list):
+    """
+    Maps the item numbers of a parsed outfit to the items' S3 URLs.
+
+    Args:
+        rec_output (dict): Parsed outfit from parse_rec_outfit.
+        items (list): Items in the order they were numbered in the prompt.
+
+    Returns:
+        dict: The outfit with "outfit" holding S3 URLs.
+    """
+    resolved_outfit_urls = []
+    for idx in rec_output["outfit"]:
+        if isinstance(idx, int) and 0 <= idx < len(items):
+            resolved_outfit_urls.append(items[idx]["s3_url"])
+        else:
+            logger.error(f"Index {idx} out of range; total valid items: {len(items)}")
+    return {**rec_output, "outfit": resolved_outfit_urls}
+
+def unique_outfits(outfits: list):
+    """
+    Drops outfits that repeat the same set of items as an earlier one.
+    """
+    seen = set()
+    unique = []
+    for outfit in outfits:
+        key = tuple(sorted(outfit["outfit"]))
+        if key not in seen:
+            seen.add(key)
+            unique.append(outfit)
+    return unique
+
+def format_sse(event: str, payload: dict):
+    """
+    Formats one Server-Sent Events message.
+    """
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+# ------------------------ Listing helpers ------------------------
+def encode_page_token(last_key: dict, cursor: int = None):
+    """
+    Encodes a DynamoDB LastEvaluatedKey (and the listing's change-log cursor) as an opaque token.
+
+    Args:
+        last_key (dict): LastEvaluatedKey from a scan/query, or None when there are no more pages.
+        cursor (int, optional): Change-log cursor taken before the first page.
+
+    Returns:
+        str: URL-safe token, or None if there is no next page.
+    """
+    if not last_key:
+        return None
+    payload = json.dumps({"key": last_key, "cursor": cursor}, default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("utf-8")
+
+def decode_page_token(token: str):
+    """
+    Decodes a token produced by encode_page_token.
+
+    Args:
+        token (str): Token from a previous response.
+
+    Returns:
+        tuple: (ExclusiveStartKey dict, cursor int or None).
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("utf-8")))
+        return payload["key"], payload.get("cursor")
+    except Exception:
+        raise ValueError("Invalid next_token")
+
+def parse_limit(value, maximum=MAX_PAGE_SIZE):
+    """
+    Parses the `limit` query parameter.
+
+    Returns:
+        int: Page size, or None to read every page.
+
+    Raises:
+        ValueError: If the value is not a positive integer.
+    """
+    if value is None:
+        return None
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
+
+def parse_fields(value, allowed_fields: list):
+    """
+    Parses the comma separated `fields` projection parameter.
+
+    Returns:
+        list: Requested attribute names, or None to return every attribute.
+
+    Raises:
+        ValueError: If an unknown attribute is requested.
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def build_projection(fields: list):
+    """
+    Builds ProjectionExpression arguments for a list of attribute names.
+
+    Returns:
+        dict: Keyword arguments for scan/query (empty if fields is None).
+    """
+    if not fields:
+        return {}
+    names = {f"#p{idx}": field for idx, field in enumerate(fields)}
     return {
-        "outfit": outfit_ids,
-        "explanation": explanation,
-        "styling": styling_tips
+        "ProjectionExpression": ", ".join(names.keys()),
+        "ExpressionAttributeNames": names,
+    }
+
+def project_item(item: dict, fields: list):
+    """
+    Drops every attribute not in fields (no-op when fields is None).
+    """
+    if not fields or item is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+def read_items(table, method: str, limit: int = None, start_key: dict = None, **kwargs):
+    """
+    Runs a scan or query and follows LastEvaluatedKey across the 1 MB response pages.
+
+    Args:
+        table: DynamoDB table resource.
+        method (str): "scan" or "query".
+        limit (int, optional): Stop once this many items are read. Reads everything if None.
+        start_key (dict, optional): ExclusiveStartKey to resume from.
+        **kwargs: Extra scan/query arguments.
+
+    Returns:
+        tuple: (items list, LastEvaluatedKey to resume from or None).
+    """
+    items = []
+    while True:
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        if limit:
+            kwargs["Limit"] = limit - len(items)
+        response = getattr(table, method)(**kwargs)
+        items.extend(response.get("Items", []))
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key or (limit and len(items) >= limit):
+            return items, start_key
+
+def build_item_filter_query(category: str = None, status: str = None, favorite: bool = None):
+    """
+    Picks the cheapest read for the requested filters. Category and status are served by
+    a Query on their secondary index; anything left over becomes a FilterExpression.
+
+    Args:
+        category (str, optional): Category to match.
+        status (str, optional): Status to match.
+        favorite (bool, optional): Favorite flag to match.
+
+    Returns:
+        tuple: ("scan" or "query", keyword arguments for the call).
+    """
+    kwargs = {}
+    filters = []
+    if category:
+        method = "query"
+        kwargs["IndexName"] = CATEGORY_INDEX
+        kwargs["KeyConditionExpression"] = Key("category").eq(category)
+        if status:
+            filters.append(Attr("status").eq(status))
+    elif status:
+        method = "query"
+        kwargs["IndexName"] = STATUS_INDEX
+        kwargs["KeyConditionExpression"] = Key("status").eq(status)
+    else:
+        method = "scan"
+
+    # Booleans cannot be index keys, so favorite is always a filter
+    if favorite is not None:
+        if favorite:
+            filters.append(Attr("favorite").eq(True))
+        else:
+            filters.append(Attr("favorite").not_exists() | Attr("favorite").eq(False))
+
+    if filters:
+        filter_expression = filters[0]
+        for condition in filters[1:]:
+            filter_expression = filter_expression & condition
+        kwargs["FilterExpression"] = filter_expression
+    return method, kwargs
+
+# ------------------------ Delete helpers ------------------------
+def s3_key_from_url(url: str):
+    """
+    Extracts the S3 object key from a public S3 URL (or a path-style S3_ENDPOINT_URL one).
+    """
+    if S3_ENDPOINT_URL and url.startswith(S3_ENDPOINT_URL.rstrip("/") + "/"):
+        return url[len(S3_ENDPOINT_URL.rstrip("/")) + 1:].split("/", 1)[-1]
+    return url.split(".com/")[-1]
+
+def is_s3_url(url: str):
+    """
+    Checks that a URL points at S3 (or at S3_ENDPOINT_URL).
+    """
+    return "amazonaws.com/" in url or bool(S3_ENDPOINT_URL and url.startswith(S3_ENDPOINT_URL.rstrip("/") + "/"))
+
+def item_s3_keys(item: dict):
+    """
+    Returns the S3 keys of an item's original image and its renditions.
+    """
+    urls = [item.get("s3_url")] + [url for name, url in (item.get("renditions") or {}).items() if name != "original"]
+    return [s3_key_from_url(url) for url in urls if url]
+
+def find_item_by_url(url: str):
+    """
+    Looks up the clothing item stored at an S3 URL. Uses the wardrobe cache's
+    s3_url index, falling back to a Query on the s3_url GSI.
+
+    Args:
+        url (str): Public S3 URL of the item image.
+
+    Returns:
+        dict: Clothing item, or None if no record points at the URL.
+    """
+    item = wardrobe_cache.get_by_url(url)
+    if item:
+        return item
+    response = clothing_items_table.query(
+        IndexName=S3_URL_INDEX,
+        KeyConditionExpression=Key("s3_url").eq(url),
+        Limit=1
+    )
+    items = response.get("Items", [])
+    return items[0] if items else None
+
+def find_item_by_id(item_id: str):
+    """
+    Looks up a clothing item by id in the wardrobe cache, falling back to DynamoDB.
+
+    Args:
+        item_id (str): Id of the clothing item.
+
+    Returns:
+        dict: Clothing item, or None if it does not exist.
+    """
+    item = wardrobe_cache.get(item_id)
+    if item:
+        return item
+    return clothing_items_table.get_item(Key={"clothing-item-id": item_id}).get("Item")
+
+def delete_items(item_ids: list, s3_keys: list):
+    """
+    Deletes item records and their S3 images. A single item uses delete_object/delete_item;
+    several use S3 delete_objects (1000 keys per call) and a DynamoDB batch writer
+    (25 deletes per call). Every S3 chunk and the record batch run as separate io_executor
+    tasks, so a bulk delete fans out across pooled connections.
+
+    Args:
+        item_ids (list): Ids of the clothing item records to delete.
+        s3_keys (list): S3 object keys to delete.
+    """
+    bucket = os.getenv("S3_BUCKET")
+
+    def delete_objects(chunk):
+        if len(chunk) == 1:
+            s3_client.delete_object(Bucket=bucket, Key=chunk[0])
+            return
+        response = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True}
+        )
+        for error in response.get("Errors", []):
+            logger.error(f"Failed to delete S3 object {error.get('Key')}: {error.get('Message')}")
+
+    def delete_records():
+        if len(item_ids) == 1:
+            clothing_items_table.delete_item(Key={"clothing-item-id": item_ids[0]})
+            return
+        with clothing_items_table.batch_writer() as batch:
+            for item_id in item_ids:
+                batch.delete_item(Key={"clothing-item-id": item_id})
+
+    futures = [io_executor.submit(delete_objects, s3_keys[start:start + 1000]) for start in range(0, len(s3_keys), 1000)]
+    if item_ids:
+        futures.append(io_executor.submit(delete_records))
+    for future in futures:
+        future.result()
+
+    for item_id in item_ids:
+        record_item_delete(item_id)
+
+# ------------------------ Upload pipeline ------------------------
+def build_placeholder_item(item_id: str, product_name: str, s3_url: str):
+    """
+    Builds the "processing" placeholder record written before an upload job runs.
+
+    Args:
+        item_id (str): Unique identifier for the item.
+        product_name (str): Display name for the item.
+        s3_url (str): Public URL the processed image will be stored at.
+
+    Returns:
+        dict: Placeholder clothing item record.
+    """
+    placeholder_item = {
+        "clothing-item-id": item_id,
+        "id": item_id,
+        "name": product_name,
+        "s3_url": s3_url,
+        "status": "processing",
+        "processed_at": None,
+        "error_message": None,
     }
+    for key in ATTRIBUTE_KEYS:
+        placeholder_item[key] = "pending"
+    return placeholder_item
+
+def mark_item_failed(item_id: str, message: str):
+    """
+    Moves a clothing item record into the "failed" state.
+
+    Args:
+        item_id (str): Unique identifier for the item.
+        message (str): Error message stored on the record.
+    """
+    update_item_fields(item_id, {"status": "failed", "error_message": message})
+
+def s3_public_url(file_key: str):
+    """
+    Returns the public URL of an object in the upload bucket.
+    """
+    if S3_ENDPOINT_URL:
+        return f"{S3_ENDPOINT_URL.rstrip('/')}/{os.getenv('S3_BUCKET')}/{file_key}"
+    return f"https://{os.getenv('S3_BUCKET')}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{file_key}"
+
+def store_renditions(item_id: str, image, original_url: str):
+    """
+    Renders the thumbnail and preview of an item image and uploads them to S3 in
+    parallel, under predictable keys with a WebP Content-Type and long cache headers.
+
+    Args:
+        item_id (str): Item the renditions belong to.
+        image (PIL.Image.Image | bytes): The stored original image.
+        original_url (str): Public URL of the original image.
+
+    Returns:
+        dict: key: rendition name ("original", "thumb", "preview"), value: public URL.
+    """
+    start = time.perf_counter()
+    with span("render_renditions"):
+        rendered = render(image)
+
+    def upload(name, data):
+        key = rendition_key(item_id, name)
+        s3_client.put_object(
+            Bucket=os.getenv("S3_BUCKET"),
+            Key=key,
+            Body=data,
+            ContentType=RENDITION_CONTENT_TYPE,
+            CacheControl=CACHE_CONTROL,
+            ContentDisposition="inline"
+        )
+        return name, s3_public_url(key)
+
+    with span("s3_renditions"):
+        futures = [io_executor.submit(upload, name, data) for name, data in rendered.items()]
+        renditions = {"original": original_url, **dict(future.result() for future in futures)}
+    BYTES.inc(sum(len(data) for data in rendered.values()), kind="s3_rendition")
+    logger.info(
+        f"Stored renditions for item {item_id} in {(time.perf_counter() - start) * 1000:.0f} ms: "
+        + ", ".join(f"{name} {len(data)} bytes" for name, data in rendered.items())
+    )
+    return renditions
+
+def process_upload(item_id: str, file_key: str, product_name: str, input_bytes: bytes):
+    """
+    Upload job: background removal, S3 storage and recognition for one image.
+    Runs on a JobQueue worker and moves the item record from "processing"
+    to "processed" or "failed". The image stays in memory throughout.
+
+    Args:
+        item_id (str): Unique identifier for the item.
+        file_key (str): S3 key the processed image is stored under.
+        product_name (str): Display name for the item.
+        input_bytes (bytes): Raw uploaded image.
+    """
+    try:
+        # Process image, reusing the cutout if this exact photo was uploaded before
+        digest = content_hash(input_bytes)
+        cutout = None
+        output_bytes = image_cache.get_cutout(digest)
+        if output_bytes is None:
+            with span("rembg_remove"):
+                cutout = segmentation_engine.remove_background_image(input_bytes)
+            output_file = io.BytesIO()
+            cutout.save(output_file, format="PNG")
+            output_bytes = output_file.getvalue()
+            image_cache.put_cutout(digest, output_bytes)
+        else:
+            logger.info(f"Reusing cached cutout for item {item_id}")
+        output_file = io.BytesIO(output_bytes)
+
+        # Upload to S3
+        with span("s3_upload"):
+            s3_client.upload_fileobj(
+                output_file,
+                os.getenv("S3_BUCKET"),
+                file_key,
+                ExtraArgs={
+                    'ContentType': 'image/png',  # The cutout is always stored as PNG
+                    'CacheControl': CACHE_CONTROL,
+                    'ContentDisposition': 'inline'
+                }
+            )
+        BYTES.inc(len(output_bytes), kind="s3_original")
+        logger.info(f"Uploaded file to S3: {file_key}")
+
+        # Smaller renditions for list views; the item still works from the original if this fails
+        try:
+            renditions = store_renditions(item_id, cutout or output_bytes, s3_public_url(file_key))
+        except Exception as e:
+            logger.error(f"Could not store renditions for item {item_id}: {e}")
+            renditions = {"original": s3_public_url(file_key)}
+
+        metadata = image_cache.get_attributes(digest)
+        if metadata is not None:
+            metadata = ITEM_ATTRIBUTES.normalize(metadata)  # Entries cached before key normalization
+        if metadata is None:
+            # Run image recognition on the in-memory cutout
+            with span("recognition"):
+                metadata = run_recognition(output_bytes, cutout)
+            # Incomplete attributes are not cached, so a re-upload asks the model again
+            if metadata is not None and not ITEM_ATTRIBUTES.missing(metadata):
+                image_cache.put_attributes(digest, metadata)
+        else:
+            logger.info(f"Reusing cached attributes for item {item_id}")
+    except Exception as e:
+        mark_item_failed(item_id, f"Image processing failed: {e}")
+        raise
+
+    # Handle failed processing
+    if metadata is None:
+        mark_item_failed(item_id, "Image processing failed - possibly too large")
+        raise RuntimeError(f"Recognition returned no attributes for item {item_id}")
+
+    # Update record with analysis
+    fields = {key: metadata.get(key, "unknown") for key in ATTRIBUTE_KEYS}
+    fields.update(
+        name=product_name,
+        status="processed",
+        processed_at=datetime.now(timezone.utc).isoformat(),
+        renditions=renditions
+    )
+    update_item_fields(item_id, fields)
+
+def process_s3_upload(item_id: str, incoming_key: str, file_key: str, product_name: str):
+    """
+    Upload job for a direct-to-S3 upload: reads the raw image the client PUT under
+    incoming_key, runs process_upload on it and deletes the raw object once it has been read.
+    A failed item cannot be retried from the raw object, so it is deleted on failure too.
+
+    Args:
+        item_id (str): Unique identifier for the item.
+        incoming_key (str): S3 key the client uploaded the raw image to.
+        file_key (str): S3 key the processed image is stored under.
+        product_name (str): Display name for the item.
+    """
+    bucket = os.getenv("S3_BUCKET")
+    try:
+        input_bytes = s3_client.get_object(Bucket=bucket, Key=incoming_key)["Body"].read()
+        BYTES.inc(len(input_bytes), kind="upload_received")
+    except Exception as e:
+        mark_item_failed(item_id, f"Could not read the uploaded image: {e}")
+        raise
+    try:
+        process_upload(item_id, file_key, product_name, input_bytes)
+    finally:
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=incoming_key)
+        except Exception as e:
+            # Left for the incoming/ lifecycle rule; the job's own outcome stands
+            logger.warning(f"Could not delete raw upload {incoming_key}: {e}")
+
+def upload_product_name(provided_name: str, current_count: int, index: int, total: int):
+    """
+    Names an uploaded item: "Clothing Piece N" without a name, otherwise the given
+    name, numbered when several files share it.
+    """
+    if not provided_name or provided_name.lower() == "untitled":
+        return f"Clothing Piece {current_count + index + 1}"
+    return f"{provided_name} {current_count + index + 1}" if total > 1 else provided_name
+
+def presign_upload(item_id: str, incoming_key: str, size: int, content_type: str):
+    """
+    Creates the presigned request(s) a client uses to upload one image straight to S3:
+    a single PUT URL, or a multipart upload with one PUT URL per part for large files.
+
+    Args:
+        item_id (str): Item the upload belongs to.
+        incoming_key (str): S3 key to upload to.
+        size (int): File size in bytes.
+        content_type (str): The file's Content-Type.
+
+    Returns:
+        dict: Upload instructions ({item_id, key, method, url, headers} or {item_id, key, upload_id, part_size, parts}).
+    """
+    bucket = os.getenv("S3_BUCKET")
+    if size <= MULTIPART_THRESHOLD:
+        url = s3_client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": bucket, "Key": incoming_key, "ContentType": content_type},
+            ExpiresIn=PRESIGNED_URL_EXPIRY
+        )
+        return {"item_id": item_id, "key": incoming_key, "method": "PUT", "url": url, "headers": {"Content-Type": content_type}}
+
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=incoming_key, ContentType=content_type)["UploadId"]
+    part_count = -(-size // MULTIPART_PART_SIZE)
+    parts = [
+        {
+            "part_number": part_number,
+            "url": s3_client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket, "Key": incoming_key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=PRESIGNED_URL_EXPIRY
+            )
+        }
+        for part_number in range(1, part_count + 1)
+    ]
+    return {"item_id": item_id, "key": incoming_key, "upload_id": upload_id, "part_size": MULTIPART_PART_SIZE, "parts": parts}
+
+# ------------------------ Request metrics ------------------------
+@app.before_request
+def begin_request_trace():
+    """
+    Starts the request's trace: the caller's X-Trace-Id if sent, otherwise a new id.
+    It is passed to the recognition container and returned in the response header.
+    """
+    g.trace_id = start_trace(request.headers.get(TRACE_HEADER))
+    g.started_at = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Counts the request by endpoint and status and records its latency. Streamed
+    responses are measured up to their first byte.
+    """
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    elapsed = time.perf_counter() - g.get("started_at", time.perf_counter())
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    response.headers[TRACE_HEADER] = g.get("trace_id", "")
+    if endpoint != "/metrics":
+        logger.info(f"[{g.get('trace_id')}] {request.method} {endpoint} {response.status_code} in {elapsed * 1000:.0f} ms")
+    return response
 
 # ------------------------ Endpoints ------------------------
 @app.route("/upload", methods=["POST"])
 def upload_file():
     """
-    Endpoint to upload a new clothing item image and metadata.
-    Accepts multipart/form-data with an image file and item attributes.
+    Endpoint to upload new clothing item images.
+    Accepts multipart/form-data with one or more image files and an optional name.
+    Writes a "processing" placeholder record per file and queues the background removal,
+    storage and recognition work, so the request returns before any model runs.
 
     Returns:
-        JSON response indicating success or failure, and item information if successful.
+        202 JSON response with the placeholder items and their job ids, or 400 on invalid input.
     """
     files = request.files.getlist("file")
     if not files or len(files) == 0:
         return jsonify({"error": "No file part"}), 400
 
     for file in files:
-        if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
+        if not file.filename.lower().endswith(ALLOWED_IMAGE_EXTENSIONS):
             return jsonify({"error": "Only image files are allowed"}), 400
 
     provided_name = request.form.get("name", "").strip()
-    scan_response = table.scan()
-    current_count = len(scan_response.get("Items", []))
+    current_count = wardrobe_cache.count()
     uploaded_items = []
+    pending = []
 
     for index, file in enumerate(files):
         unique_id = str(uuid.uuid4())
         unique_filename = f"{unique_id}_{file.filename}"
         file_key = f"user-uploads/{unique_filename}"
+        s3_url = s3_public_url(file_key)
 
-        if not provided_name or provided_name.lower() == "untitled":
-            product_name = f"Clothing Piece {current_count + index + 1}"
-        else:
-            product_name = f"{provided_name} {current_count + index + 1}" if len(files) > 1 else provided_name
-
-        # Process image
+        product_name = upload_product_name(provided_name, current_count, index, len(files))
+        uploaded_items.append(build_placeholder_item(unique_id, product_name, s3_url))
         input_bytes = file.read()
-        output_bytes = remove(input_bytes)
-        output_file = io.BytesIO(output_bytes)
-        output_file.seek(0)
-
-        # Upload to S3
-        s3_client.upload_fileobj(
-            output_file,
-            os.getenv("S3_BUCKET"),
-            file_key,
-            ExtraArgs={
-                'ContentType': 'image/jpeg',  # Changed to jpeg
-                'ContentDisposition': 'inline'
-            }
+        BYTES.inc(len(input_bytes), kind="upload_received")
+        pending.append((unique_id, file_key, product_name, input_bytes))
+
+    # Placeholder records go in one batch, before any job can update them
+    put_items(uploaded_items)
+
+    # Hand the images off to the worker pool
+    jobs = []
+    for unique_id, file_key, product_name, input_bytes in pending:
+        job_id = upload_jobs.submit(
+            process_upload, unique_id, file_key, product_name, input_bytes,
+            item_id=unique_id
         )
-        s3_url = f"https://{os.getenv('S3_BUCKET')}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{file_key}"
-        logger.info(f"Uploaded file to S3: {s3_url}")
-
-        # Create placeholder record
-        placeholder_item = {
-            "id": unique_id,
-            "name": product_name,
-            "s3_url": s3_url,
-            "status": "processing",
-            "processed_at": None,
-            "error_message": None,
-            "category": "pending",
-            "type": "pending",
-            "brand": "pending",
-            "size": "pending",
-            "style": "pending",
-            "color": "pending",
-            "material": "pending",
-            "fitted_market_value": "pending",
-            "accent_colors": "pending",
-            "pattern": "pending",
-            "shape": "pending",
-            "fit": "pending",
-            "neckline": "pending",
-            "key_design_elements": "pending",
-            "occasion_suitability": "pending",
-            "weather_appropriateness": "pending",
-            "fabric_weight": "pending",
-            "functional_features": "pending",
-            "additional_notes": "pending"
-        }
+        jobs.append({"job_id": job_id, "item_id": unique_id})
+        logger.info(f"Queued upload job {job_id} for item {unique_id}")
 
-        clothing_item_table.put_item(Item=placeholder_item)
+    return jsonify({
+        "message": "Upload accepted for processing",
+        "jobs": jobs,
+        "items": uploaded_items
+    }), 202
 
-        # Save file temporarily and run image recognition
-        temp_path = f"/tmp/{unique_filename}"
-        with open(temp_path, "wb") as temp_file:
-            temp_file.write(output_bytes)
+@app.route("/upload/init", methods=["POST"])
+def upload_init():
+    """
+    First phase of a direct-to-S3 upload. Creates an "uploading" placeholder per file
+    and returns presigned URLs the client PUTs the image bytes to, so they never pass
+    through Flask. Files over MULTIPART_THRESHOLD get a multipart upload with one
+    URL per part.
 
-        metadata = run_recognition(temp_path, s3_url, product_name)
-        os.remove(temp_path)
+    Request JSON:
+        files (list): {"filename", "size", "content_type"} per image.
+        name (str, optional): Display name, as for /upload.
 
-        # NEW: Handle failed processing
-        if metadata is None:
-            clothing_item_table.update_item(
-                Key={"id": unique_id},
-                UpdateExpression="SET #st = :status, error_message = :error",
-                ExpressionAttributeValues={
-                    ":status": "failed",
-                    ":error": "Image processing failed - possibly too large"
-                },
-                ExpressionAttributeNames={"#st": "status"}
+    Returns:
+        200 JSON response with `uploads` (upload instructions per file) and the placeholder `items`,
+        or 400 on invalid input.
+    """
+    data = request.get_json(silent=True) or {}
+    files = data.get("files") if isinstance(data, dict) else None
+    if not files or not isinstance(files, list):
+        return jsonify({"error": "No files provided"}), 400
+    for file in files:
+        if not isinstance(file, dict):
+            return jsonify({"error": "Each file must be an object with filename, size and content_type"}), 400
+        if not isinstance(file.get("content_type", ""), str):
+            return jsonify({"error": "content_type must be a string"}), 400
+        filename = str(file.get("filename", ""))
+        if not filename.lower().endswith(ALLOWED_IMAGE_EXTENSIONS):
+            return jsonify({"error": "Only image files are allowed"}), 400
+        size = file.get("size")
+        if not isinstance(size, int) or isinstance(size, bool) or not 0 < size <= MAX_UPLOAD_SIZE:
+            return jsonify({"error": f"size must be between 1 and {MAX_UPLOAD_SIZE} bytes"}), 400
+
+    try:
+        provided_name = str(data.get("name") or "").strip()
+        current_count = wardrobe_cache.count()
+        uploads = []
+        items = []
+        for index, file in enumerate(files):
+            item_id = str(uuid.uuid4())
+            filename = os.path.basename(file["filename"])
+            file_key = f"user-uploads/{item_id}_{filename}"
+            content_type = file.get("content_type") or "application/octet-stream"
+
+            placeholder_item = build_placeholder_item(
+                item_id, upload_product_name(provided_name, current_count, index, len(files)), s3_public_url(file_key)
             )
-            continue  # Skip to next file
-
-        # Update record with analysis
-        update_expression = (
-            "SET #nm = :name, #category = :category, #ty = :type, #br = :brand, "
-            "#size = :size, #sty = :style, #pr = :primary_color, #mat = :material, "
-            "#fmv = :fitted_market_value, #st = :status, #processed_at = :processed_at, analysis = :analysis, "
-            "#ac = :accent_colors, #pat = :pattern, #sh = :shape, #fit = :fit, #nl = :neckline, "
-            "#kde = :key_design_elements, #oc = :occasion_suitability, #wa = :weather_appropriateness, "
-            "#fw = :fabric_weight, #ff = :functional_features, #an = :additional_notes"
-        )
-        expression_attribute_names = {
-            "#nm": "name",
-            "#category": "category",
-            "#ty": "type",
-            "#br": "brand",
-            "#size": "size",
-            "#sty": "style",
-            "#pr": "color",
-            "#mat": "material",
-            "#st": "status",
-            "#processed_at": "processed_at",
-            "#ac": "accent_colors",
-            "#pat": "pattern",
-            "#sh": "shape",
-            "#fit": "fit",
-            "#nl": "neckline",
-            "#kde": "key_design_elements",
-            "#oc": "occasion_suitability",
-            "#wa": "weather_appropriateness",
-            "#fw": "fabric_weight",
-            "#ff": "functional_features",
-            "#an": "additional_notes"
-        }
-        expression_attribute_values = {
-            ":name": product_name,
-            ":status": "processed",
-            ":processed_at": datetime.now(timezone.utc).isoformat(),
-            ":category": metadata.get("category", "unknown"),
-            ":type": metadata.get("type", "unknown"),
-            ":brand": metadata.get("brand", "unknown"),
-            ":style": metadata.get("style", "unknown"),
-            ":primary_color": metadata.get("color", "unknown"),
-            ":accent_colors": metadata.get("accent_colors", "unknown"),
-            ":pattern": metadata.get("pattern", "unknown"),
-            ":shape": metadata.get("shape", "unknown"),
-            ":fit": metadata.get("fit", "unknown"),
-            ":neckline": metadata.get("neckline", "unknown"),
-            ":key_design_elements": metadata.get("key_design_elements", "unknown"),
-            ":material": metadata.get("material", "unknown"),
-            ":occasion_suitability": metadata.get("occasion_suitability", "unknown"),
-            ":weather_appropriateness": metadata.get("weather_appropriateness", "unknown"),
-            ":fabric_weight": metadata.get("fabric_weight", "unknown"),
-            ":functional_features": metadata.get("functional_features", "unknown"),
-            ":additional_notes": metadata.get("additional_notes", "unknown")
-        }
+            placeholder_item["status"] = "uploading"
+            items.append(placeholder_item)
+            uploads.append(presign_upload(item_id, INCOMING_PREFIX + file_key, file["size"], content_type))
+        put_items(items)
 
-        clothing_items_table.update_item(
-            Key={"clothing-item-id": unique_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ExpressionAttributeNames=expression_attribute_names,
+        return jsonify({"uploads": uploads, "items": items, "expires_in": PRESIGNED_URL_EXPIRY}), 200
+    except Exception as e:
+        logger.error(f"Error in /upload/init endpoint: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/upload/complete", methods=["POST"])
+def upload_complete():
+    """
+    Second phase of a direct-to-S3 upload. Completes multipart uploads, checks each
+    object exists and is within MAX_UPLOAD_SIZE, and queues the same background
+    removal and recognition job as /upload, which reads the image from S3.
+
+    Request JSON:
+        uploads (list): {"item_id"} per file, plus "upload_id" and "parts"
+            ([{"part_number", "etag"}]) for multipart uploads.
+
+    Returns:
+        202 JSON response with a `jobs` list of {job_id, item_id} and `errors` per
+        item that could not be completed, or 400 if nothing could be queued.
+    """
+    data = request.get_json(silent=True) or {}
+    completions = data.get("uploads") if isinstance(data, dict) else None
+    if not completions or not isinstance(completions, list):
+        return jsonify({"error": "No uploads provided"}), 400
+    if not all(isinstance(completion, dict) and isinstance(completion.get("item_id"), str) for completion in completions):
+        return jsonify({"error": "Each upload must be an object with an item_id"}), 400
+
+    bucket = os.getenv("S3_BUCKET")
+
+    def complete(completion):
+        item_id = completion.get("item_id")
+        item = find_item_by_id(item_id) if item_id else None
+        if item is None or item.get("status") != "uploading":
+            return {"item_id": item_id, "error": "Unknown upload or already completed"}
+        file_key = s3_key_from_url(item["s3_url"])
+        incoming_key = INCOMING_PREFIX + file_key
+        try:
+            if completion.get("upload_id"):
+                s3_client.complete_multipart_upload(
+                    Bucket=bucket,
+                    Key=incoming_key,
+                    UploadId=completion["upload_id"],
+                    MultipartUpload={"Parts": [
+                        {"PartNumber": int(part["part_number"]), "ETag": part["etag"]}
+                        for part in sorted(completion.get("parts") or [], key=lambda part: int(part["part_number"]))
+                    ]}
+                )
+            size = s3_client.head_object(Bucket=bucket, Key=incoming_key)["ContentLength"]
+            if size > MAX_UPLOAD_SIZE:
+                s3_client.delete_object(Bucket=bucket, Key=incoming_key)
+                raise ValueError(f"Upload is larger than {MAX_UPLOAD_SIZE} bytes")
+        except Exception as e:
+            logger.error(f"Could not complete upload for item {item_id}: {e}")
+            return {"item_id": item_id, "error": str(e)}
+
+        try:
+            # Conditional, so a repeated /upload/complete cannot queue the job twice
+            update_item_fields(
+                item_id, {"status": "processing"},
+                ConditionExpression="#st = :uploading",
+                ExpressionAttributeValues={":uploading": "uploading"}
+            )
+        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            return {"item_id": item_id, "error": "Unknown upload or already completed"}
+        job_id = upload_jobs.submit(
+            process_s3_upload, item_id, incoming_key, file_key, item.get("name"),
+            item_id=item_id
         )
+        logger.info(f"Queued upload job {job_id} for item {item_id} from {incoming_key}")
+        return {"job_id": job_id, "item_id": item_id}
 
-        item = clothing_items_table.get_item(Key={"clothing-item-id": unique_id}).get("Item")
-        uploaded_items.append(item)
+    # Each file's S3 completion, size check and status flip are independent round trips
+    results = io_executor.map(complete, completions)
+    jobs = [result for result in results if "job_id" in result]
+    errors = [result for result in results if "error" in result]
 
-    return jsonify({
-        "message": "Upload and classification successful",
-        "items": uploaded_items
-    })
+    if not jobs:
+        return jsonify({"error": "No uploads could be completed", "errors": errors}), 400
+    return jsonify({"message": "Upload accepted for processing", "jobs": jobs, "errors": errors}), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """
+    Endpoint to check the state of a background upload job.
+
+    Returns:
+        JSON response with the job record, or 404 if the job is unknown.
+    """
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+def parse_cursor(value):
+    """
+    Parses a change-log cursor from a query parameter.
+
+    Args:
+        value (str): Raw cursor value.
+
+    Returns:
+        int: Cursor, or None if missing or malformed.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_wait(value):
+    """
+    Parses the `wait` long-poll parameter.
+
+    Returns:
+        float: Seconds to wait, capped at LONG_POLL_MAX_SECONDS (0 if missing).
+
+    Raises:
+        ValueError: If the value is not a non-negative number.
+    """
+    if value is None:
+        return 0.0
+    try:
+        wait = float(value)
+    except ValueError:
+        wait = None
+    if wait is None or not wait >= 0:  # Also rejects NaN
+        raise ValueError("wait must be a non-negative number of seconds")
+    return min(wait, LONG_POLL_MAX_SECONDS)
 
 @app.route("/list", methods=["GET"])
 def list_files():
     """
     Endpoint to list all clothing item files for the current user.
 
+    Query params:
+        since (int, optional): Cursor from a previous response. Only items created, updated
+            or deleted after it are returned.
+        wait (float, optional): With `since`, seconds to block until something changes (long poll).
+        limit (int, optional): Page size. Without it every page is read.
+        next_token (str, optional): Token from a previous page.
+        fields (str, optional): Comma separated attributes to return, e.g. "id,name,s3_url".
+        category, status (str, optional): Filters served by a secondary-index Query.
+        favorite (bool, optional): Only (un)favorited items.
+
     Returns:
-        JSON response with a list of clothing items.
+        JSON response with a list of clothing items, deleted item ids, the new cursor,
+        whether the response is a full listing, and the token for the next page.
     """
     try:
-        response = clothing_item_table.scan()
-        items = response.get("Items", [])
-        return jsonify({"files": items})
+        fields = parse_fields(request.args.get("fields"), ITEM_FIELDS)
+        limit = parse_limit(request.args.get("limit"))
+        next_token = request.args.get("next_token")
+        start_key, cursor = decode_page_token(next_token) if next_token else (None, None)
+        wait = parse_wait(request.args.get("wait"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        since = parse_cursor(request.args.get("since"))
+        if since is not None:
+            if wait > 0:
+                change_log.wait_for_change(since, wait)
+            delta = change_log.changes_since(since)
+            if delta is not None:
+                changed, deleted, new_cursor = delta
+                return jsonify({
+                    "files": [project_item(item, fields) for item in changed],
+                    "deleted": deleted,
+                    "cursor": new_cursor,
+                    "full": False,
+                    "next_token": None
+                })
+
+        # Full listing. Take the cursor before the first page so changes made while
+        # paging are resent on the next delta sync.
+        if cursor is None:
+            cursor = change_log.version
+
+        category = request.args.get("category")
+        status = request.args.get("status")
+        favorite = request.args.get("favorite")
+        favorite = None if favorite is None else favorite.lower() == "true"
+
+        # Unpaginated listings are served from the wardrobe cache
+        if limit is None and start_key is None:
+            items = [
+                project_item(item, fields)
+                for item in wardrobe_cache.items(category=category)
+                if (status is None or item.get("status") == status)
+                and (favorite is None or bool(item.get("favorite")) == favorite)
+            ]
+            return jsonify({"files": items, "deleted": [], "cursor": cursor, "full": True, "next_token": None})
+
+        method, kwargs = build_item_filter_query(category=category, status=status, favorite=favorite)
+        kwargs.update(build_projection(fields))
+        items, last_key = read_items(clothing_items_table, method, limit=limit, start_key=start_key, **kwargs)
+        return jsonify({
+            "files": items,
+            "deleted": [],
+            "cursor": cursor,
+            "full": True,
+            "next_token": encode_page_token(last_key, cursor)
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/changes", methods=["GET"])
+def stream_changes():
+    """
+    Server-Sent Events endpoint that pushes wardrobe changes as they happen.
+    Each event carries the same payload as a `/list?since=` delta.
+
+    Query params:
+        since (int, optional): Cursor to resume from. Defaults to the current version.
+
+    Returns:
+        text/event-stream response.
+    """
+    cursor = parse_cursor(request.args.get("since"))
+    if cursor is None:
+        cursor = change_log.version
+
+    def generate(cursor):
+        yield f"event: cursor\ndata: {json.dumps({'cursor': cursor})}\n\n"
+        while True:
+            if not change_log.wait_for_change(cursor, LONG_POLL_MAX_SECONDS):
+                yield ": keep-alive\n\n"
+                continue
+            delta = change_log.changes_since(cursor)
+            if delta is None:
+                # Fell too far behind the log; the client has to reload the full list
+                yield "event: resync\ndata: {}\n\n"
+                return
+            changed, deleted, cursor = delta
+            payload = {"files": changed, "deleted": deleted, "cursor": cursor, "full": False}
+            yield f"event: change\ndata: {json.dumps(payload, default=str)}\n\n"
+
+    return Response(
+        stream_with_context(generate(cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.route("/delete", methods=["POST"])
 def delete_file():
     """
-    Endpoint to delete a clothing item by its item_id.
+    Endpoint to delete one or more clothing items and their images.
+    Items are addressed by id (`id`, `clothing-item-id` or a list in `ids`)
+    or by S3 URL (`url` or a list in `urls`).
 
     Returns:
-        JSON response indicating success or failure.
+        JSON response indicating success or failure, with the deleted and unknown item ids.
     """
-    data = request.get_json()
-    url = data.get("url", "")
-    if not url or "amazonaws.com/" not in url:
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    ids = data.get("ids") or []
+    urls = data.get("urls") or []
+    if not isinstance(ids, list) or not isinstance(urls, list):
+        return jsonify({"error": "ids and urls must be lists of strings"}), 400
+    if data.get("id") or data.get("clothing-item-id"):
+        ids = ids + [data.get("id") or data.get("clothing-item-id")]
+    if data.get("url"):
+        urls = urls + [data["url"]]
+    if not all(isinstance(value, str) for value in ids + urls):
+        return jsonify({"error": "Item ids and S3 URLs must be strings"}), 400
+
+    if not ids and not urls:
+        return jsonify({"error": "No item id or S3 URL provided"}), 400
+    if any(not is_s3_url(url) for url in urls):
         return jsonify({"error": "Invalid S3 URL"}), 400
 
     try:
-        key = url.split(".com/")[-1]
-        s3_client.delete_object(Bucket=os.getenv("S3_BUCKET"), Key=key)
-        response = clothing_item_table.scan(
-            FilterExpression=boto3.dynamodb.conditions.Attr("s3_url").eq(url)
-        )
-        items = response.get("Items", [])
-        if items:
-            for item in items:
-                clothing_item_table.delete_item(Key={"clothing-item-id": item["clothing-item-id"]})
-        return jsonify({"message": "Deleted successfully"}), 200
+        item_ids = []
+        s3_keys = []
+        not_found = []
+        for item_id in ids:
+            item = find_item_by_id(item_id)
+            if item is None:
+                not_found.append(item_id)
+                continue
+            item_ids.append(item_key(item))
+            s3_keys.extend(item_s3_keys(item))
+        for url in urls:
+            # The image is removed even if no record points at it
+            s3_keys.append(s3_key_from_url(url))
+            item = find_item_by_url(url)
+            if item:
+                item_ids.append(item_key(item))
+                s3_keys.extend(item_s3_keys(item))
+
+        item_ids = list(dict.fromkeys(item_ids))
+        delete_items(item_ids, list(dict.fromkeys(s3_keys)))
+        return jsonify({"message": "Deleted successfully", "deleted": item_ids, "not_found": not_found}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -610,39 +1822,13 @@ def update_item():
     if not item_id:
         return jsonify({"error": "No item ID provided"}), 400
 
-    update_expression = "SET "
-    expression_attribute_values = {}
-    expression_attribute_names = {}
     allowed_fields = ["name"] + ATTRIBUTE_KEYS
-
-    for field in allowed_fields:
-        if field in data:
-            if field == "type":
-                update_expression += f"#ty = :{field}, "
-                expression_attribute_names["#ty"] = "type"
-            elif field == "style":
-                update_expression += f"#sty = :{field}, "
-                expression_attribute_names["#sty"] = "style"
-            elif field == "name":
-                update_expression += f"#nm = :{field}, "
-                expression_attribute_names["#nm"] = "name"
-            else:
-                update_expression += f"{field} = :{field}, "
-            expression_attribute_values[f":{field}"] = data[field]
-
-    update_expression = update_expression.rstrip(", ")
-
-    if update_expression == "SET":
+    fields = {field: data[field] for field in allowed_fields if field in data}
+    if not fields:
         return jsonify({"error": "No valid fields provided for update."}), 400
 
     try:
-        clothing_item_table.update_item(
-            Key={"clothing-item-id": item_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ExpressionAttributeNames=expression_attribute_names
-        )
-        updated_item = table.get_item(Key={"id": item_id}).get("Item")
+        updated_item = update_item_fields(item_id, fields)
         return jsonify(updated_item), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -661,12 +1847,7 @@ def toggle_favorite():
     if item_id is None or favorite is None:
         return jsonify({"error": "Missing parameters"}), 400
     try:
-        table.update_item(
-            Key={"id": item_id},
-            UpdateExpression="SET favorite = :fav",
-            ExpressionAttributeValues={":fav": favorite}
-        )
-        updated_item = table.get_item(Key={"id": item_id}).get("Item")
+        updated_item = update_item_fields(item_id, {"favorite": favorite})
         return jsonify(updated_item), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -675,88 +1856,224 @@ def toggle_favorite():
 def recommend():
     """
     Endpoint to get outfit recommendations based on user wardrobe and preferences.
+    Identical requests against an unchanged wardrobe are answered from the
+    recommendation cache unless "regenerate" is set.
+
+    With mode "fast", or when the model call fails, outfits come from the local
+    rule-based outfit engine instead and carry "source": "rules".
+
+    Request JSON:
+        user_prompt (str, optional): What the outfit is for.
+        count (int, optional): Number of distinct outfits, 1 to 5 (default 1), from a single model call.
+        regenerate (bool, optional): Skip the recommendation cache.
+        mode (str, optional): "model" (default) or "fast" for rule-based outfits without a model call.
 
     Returns:
-        JSON response with recommended outfits, explanations, and styling tips.
+        JSON response with the recommended outfit, explanation, and styling tips,
+        or {"outfits": [...]} when count is greater than 1.
     """
     try:
         data = request.get_json()  
         user_prompt = data.get("user_prompt", "")
+        regenerate = bool(data.get("regenerate", False))
+        try:
+            count = parse_outfit_count(data.get("count"))
+            mode = parse_recommend_mode(data.get("mode"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         logger.info(f"User prompt received: {user_prompt}")
-        
-        # Read from Clothing Items Table
-        response = clothing_item_table.scan()
-        items = response.get('Items', [])
-        logger.info(f"Total items scanned from Clothing Items Table: {len(items)}")
-
-        # Create outfit recommendation prompt using wardrobe items
-        sys_prompt = create_outfit_recommendation_prompt(items)
-        logger.info(f"System prompt created:\n{sys_prompt}")
-        
-        # Prepare the messages for Claude model
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"{sys_prompt}\n\n{user_prompt}"
-                    }
-                ]
-            }
-        ]
-
-        # Prepare the body for Bedrock
-        body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1000,
-            "messages": messages,
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
+
+        # Read the wardrobe version before the items, so a concurrent change can only make the key older
+        wardrobe_version = change_log.version
+        wardrobe = wardrobe_cache.items()
+        logger.info(f"Total items read from wardrobe cache: {len(wardrobe)}")
+
+        # Rule-based outfits take milliseconds, so they are never cached
+        if mode == "fast":
+            outfits = rule_based_outfits(wardrobe, user_prompt, count)
+            if not outfits:
+                return jsonify({"error": "The wardrobe needs at least one top, bottom and footwear item."}), 400
+            return jsonify(outfits[0] if count == 1 else {"outfits": outfits})
+
+        # Serve repeated requests against an unchanged wardrobe from the cache
+        cache_key = (wardrobe_version, wardrobe_cache.refreshes, normalize_prompt(user_prompt), count)
+        if regenerate:
+            recommendation_cache.record_bypass()
+        else:
+            cached = recommendation_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Recommendation served from cache")
+                return jsonify(cached)
+        start = time.perf_counter()
+
+        with span("prompt_build"):
+            items, body = build_recommendation_request(wardrobe, user_prompt, count)
 
         # Invoke the Bedrock model
-        response = bedrock_runtime.invoke_model(
-            modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-            contentType="application/json",
-            body=json.dumps(body)
-        )
-        
-        result = json.loads(response['body'].read().decode())
-        generated_text = result["content"][0]["text"]
+        try:
+            with span("bedrock_invoke"):
+                response = bedrock_runtime.invoke_model(
+                    modelId=BEDROCK_MODEL_ID,
+                    contentType="application/json",
+                    body=json.dumps(body)
+                )
+                result = json.loads(response['body'].read().decode())
+            record_bedrock_usage(result.get("usage"))
+            generated_text = result["content"][0]["text"]
+        except Exception as model_error:
+            logger.error(f"Error invoking recommendation model: {str(model_error)}")
+            outfits = rule_based_outfits(wardrobe, user_prompt, count) if RECOMMEND_FALLBACK else []
+            if not outfits:
+                raise
+            logger.info("Answering with rule-based outfits instead")
+            return jsonify(outfits[0] if count == 1 else {"outfits": outfits})
         logger.info(f"Generated text from model: {generated_text}")
 
         try:
-            rec_output = parse_rec_response(generated_text)
+            with span("recommendation_parse"):
+                outfits = [resolve_outfit(outfit, items) for outfit in parse_rec_response(generated_text)]
         except Exception as parse_error:
             logger.error(f"Error parsing recommendation output: {str(parse_error)}")
             logger.error("Full generated text for debugging:")
             logger.error(generated_text)
-            return jsonify({"error": "Invalid response format from recommendation model."}), 500
+            outfits = rule_based_outfits(wardrobe, user_prompt, count) if RECOMMEND_FALLBACK else []
+            if not outfits:
+                return jsonify({"error": "Invalid response format from recommendation model."}), 500
+            logger.info("Answering with rule-based outfits instead")
+            return jsonify(outfits[0] if count == 1 else {"outfits": outfits})
 
-        logger.info(f"Parsed recommendation output: {rec_output}")
-        
-        # Map numeric indices to actual items
-        resolved_outfit_urls = []
-        if "outfit" in rec_output and isinstance(rec_output["outfit"], list):
-            for idx in rec_output["outfit"]:
-                logger.info(f"Processing index: {idx}")
-                if isinstance(idx, int) and idx < len(items):
-                    s3_url = items[idx]["s3_url"]
-                    logger.info(f"Resolved index {idx} to S3 URL: {s3_url}")
-                    resolved_outfit_urls.append(s3_url)
-                else:
-                    logger.error(f"Index {idx} out of range; total valid items: {len(items)}")
-            rec_output["outfit"] = resolved_outfit_urls
-        else:
-            logger.error("Recommendation output does not contain a valid 'outfit' array.")
-            return jsonify({"error": "Invalid recommendation output from model."}), 500
+        outfits = unique_outfits(outfits)[:count]
+        logger.info(f"Parsed recommendation output: {outfits}")
 
+        rec_output = outfits[0] if count == 1 else {"outfits": outfits}
+        recommendation_cache.put(cache_key, rec_output, time.perf_counter() - start)
         return jsonify(rec_output)
 
     except Exception as e:
         logger.error(f"Error in /recommend endpoint: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+@app.route("/recommend/stream", methods=["POST"])
+def recommend_stream():
+    """
+    Server-Sent Events variant of /recommend. The model's output is streamed with
+    invoke_model_with_response_stream and each outfit is sent as soon as its JSON
+    object is complete, so the first outfit arrives long before the last.
+
+    Request JSON:
+        Same as /recommend; mode "fast" streams rule-based outfits.
+
+    Returns:
+        text/event-stream response with one "outfit" event per outfit, then a "done"
+        event ({"count", "cached"}), or an "error" event. If the model call fails before
+        any outfit was sent, rule-based outfits are streamed instead.
+    """
+    data = request.get_json() or {}
+    user_prompt = data.get("user_prompt", "")
+    regenerate = bool(data.get("regenerate", False))
+    try:
+        count = parse_outfit_count(data.get("count"))
+        mode = parse_recommend_mode(data.get("mode"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logger.info(f"User prompt received for streaming: {user_prompt}")
+
+    wardrobe_version = change_log.version
+    wardrobe = wardrobe_cache.items()
+    cache_key = (wardrobe_version, wardrobe_cache.refreshes, normalize_prompt(user_prompt), count)
+    if regenerate:
+        recommendation_cache.record_bypass()
+        cached = None
+    else:
+        cached = recommendation_cache.get(cache_key)
+
+    def stream_rule_based(outfits):
+        for outfit in outfits:
+            yield format_sse("outfit", outfit)
+        yield format_sse("done", {"count": len(outfits), "cached": False})
+
+    def generate():
+        if mode == "fast":
+            outfits = rule_based_outfits(wardrobe, user_prompt, count)
+            if not outfits:
+                yield format_sse("error", {"error": "The wardrobe needs at least one top, bottom and footwear item."})
+                return
+            yield from stream_rule_based(outfits)
+            return
+
+        if cached is not None:
+            outfits = [cached] if count == 1 else cached["outfits"]
+            for outfit in outfits:
+                yield format_sse("outfit", outfit)
+            yield format_sse("done", {"count": len(outfits), "cached": True})
+            return
+
+        start = time.perf_counter()
+        outfits, seen = [], set()
+        try:
+            with span("prompt_build"):
+                items, body = build_recommendation_request(wardrobe, user_prompt, count)
+            with span("bedrock_invoke"):
+                response = bedrock_runtime.invoke_model_with_response_stream(
+                    modelId=BEDROCK_MODEL_ID,
+                    contentType="application/json",
+                    body=json.dumps(body)
+                )
+            event_stream = response["body"]
+            splitter = JsonArrayElementStream()
+            try:
+                for event in event_stream:
+                    if "chunk" not in event:
+                        continue
+                    message = json.loads(event["chunk"]["bytes"])
+                    # Input tokens arrive with message_start, the output total with message_delta
+                    if message.get("type") == "message_start":
+                        record_bedrock_usage({"input_tokens": message["message"].get("usage", {}).get("input_tokens")})
+                    elif message.get("type") == "message_delta":
+                        record_bedrock_usage({"output_tokens": message.get("usage", {}).get("output_tokens")})
+                    if message.get("type") != "content_block_delta":
+                        continue
+                    for outfit_text in splitter.feed(message["delta"].get("text", "")):
+                        try:
+                            outfit = resolve_outfit(parse_rec_outfit(json.loads(outfit_text)), items)
+                        except ValueError as parse_error:
+                            logger.error(f"Skipping invalid outfit from model: {str(parse_error)}: {outfit_text}")
+                            continue
+                        if tuple(sorted(outfit["outfit"])) in seen:
+                            continue
+                        seen.add(tuple(sorted(outfit["outfit"])))
+                        outfits.append(outfit)
+                        yield format_sse("outfit", outfit)
+                    if len(outfits) == count:
+                        break
+            finally:
+                event_stream.close()
+        except Exception as e:
+            logger.error(f"Error in /recommend/stream endpoint: {str(e)}")
+            # Outfits already sent stay; the rule-based engine only answers if none were
+            fallback = rule_based_outfits(wardrobe, user_prompt, count) if RECOMMEND_FALLBACK and not outfits else []
+            if fallback:
+                yield from stream_rule_based(fallback)
+            else:
+                yield format_sse("error", {"error": str(e)})
+            return
+
+        if not outfits:
+            fallback = rule_based_outfits(wardrobe, user_prompt, count) if RECOMMEND_FALLBACK else []
+            if fallback:
+                yield from stream_rule_based(fallback)
+            else:
+                yield format_sse("error", {"error": "Invalid response format from recommendation model."})
+            return
+        logger.info(f"Streamed {len(outfits)} outfits in {time.perf_counter() - start:.2f}s")
+        recommendation_cache.put(cache_key, outfits[0] if count == 1 else {"outfits": outfits}, time.perf_counter() - start)
+        yield format_sse("done", {"count": len(outfits), "cached": False})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
     
 @app.route('/save-outfit', methods=['POST'])
 def save_outfit():
@@ -787,16 +2104,190 @@ def list_outfits():
     """
     Endpoint to list all saved outfits for the current user.
 
+    Query params:
+        limit (int, optional): Page size. Without it every outfit is returned as a plain list.
+        next_token (str, optional): Token from a previous page.
+        fields (str, optional): Comma separated attributes to return.
+
+    Returns:
+        JSON response with a list of saved outfits, or `{outfits, next_token}` when paginated.
+    """
+    try:
+        fields = parse_fields(request.args.get("fields"), OUTFIT_FIELDS)
+        limit = parse_limit(request.args.get("limit"))
+        next_token = request.args.get("next_token")
+        start_key, _ = decode_page_token(next_token) if next_token else (None, None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        items, last_key = read_items(outfits_table, "scan", limit=limit, start_key=start_key, **build_projection(fields))
+        if limit is None:
+            return jsonify(items)
+        return jsonify({"outfits": items, "next_token": encode_page_token(last_key)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def build_search_results(matches: list, fields: list = None):
+    """
+    Turns (item id, score) matches from the vector index into item records with a score.
+    """
+    results = []
+    for item_id, score in matches:
+        item = wardrobe_cache.get(item_id)
+        if item is not None:
+            results.append({**project_item(item, fields), "score": round(score, 4)})
+    return results
+
+@app.route("/search", methods=["GET"])
+def search_items():
+    """
+    Endpoint to find wardrobe items matching a free-text query (e.g. "warm waterproof jacket").
+
+    Query params:
+        q (str): Query text.
+        k (int, optional): Number of results (default 10, at most 50).
+        category (str, optional): Only return items of this category.
+        fields (str, optional): Comma separated attributes to return.
+
+    Returns:
+        JSON response with the matching items, best first, each with its similarity score.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query parameter 'q'"}), 400
+    try:
+        k = parse_limit(request.args.get("k"), maximum=MAX_SEARCH_RESULTS) or DEFAULT_SEARCH_RESULTS
+        fields = parse_fields(request.args.get("fields"), ITEM_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        sync_vector_index()
+        category = request.args.get("category")
+        include = {item_key(item) for item in wardrobe_cache.items(category)} if category else None
+        matches = vector_index.search(query, k, include=include)
+        return jsonify({"results": build_search_results(matches, fields)})
+    except Exception as e:
+        logger.error(f"Error in /search endpoint: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/similar/<item_id>", methods=["GET"])
+def similar_items(item_id):
+    """
+    Endpoint to find the wardrobe items most similar to a given item.
+
+    Query params:
+        k (int, optional): Number of results (default 10, at most 50).
+        category (str, optional): Only return items of this category (e.g. bottoms that go with a top).
+        fields (str, optional): Comma separated attributes to return.
+
     Returns:
-        JSON response with a list of saved outfits.
+        JSON response with the similar items, best first, each with its similarity score.
     """
     try:
-        response = outfits_table.scan()
-        items = response.get("Items", [])
-        return jsonify(items)
+        k = parse_limit(request.args.get("k"), maximum=MAX_SEARCH_RESULTS) or DEFAULT_SEARCH_RESULTS
+        fields = parse_fields(request.args.get("fields"), ITEM_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        sync_vector_index()
+        category = request.args.get("category")
+        include = {item_key(item) for item in wardrobe_cache.items(category)} if category else None
+        matches = vector_index.similar(item_id, k, include=include)
+        if matches is None:
+            return jsonify({"error": "Item not found or not processed yet"}), 404
+        return jsonify({"results": build_search_results(matches, fields)})
     except Exception as e:
+        logger.error(f"Error in /similar endpoint: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/stats", methods=["GET"])
+def get_stats():
+    """
+    Endpoint to report in-process cache counters.
+
+    Returns:
+        JSON response with per-cache statistics.
+    """
+    return jsonify({
+        "wardrobe_cache": wardrobe_cache.stats(),
+        "image_cache": image_cache.stats(),
+        "segmentation": segmentation_engine.stats(),
+        "recognition_batches": recognition_batcher.stats(),
+        "vector_index": vector_index.stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "aws": {"io_executor": io_executor.stats(), "clients": describe_config()}
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Endpoint for Prometheus scraping: request counts and latency by endpoint, per-stage
+    latency and failures (background removal, S3, recognition, DynamoDB, prompt
+    building, Bedrock, parsing), AWS call latency, model tokens and bytes moved.
+
+    Returns:
+        Metrics in the Prometheus text exposition format.
+    """
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+# ------------------------ CLI commands ------------------------
+@app.cli.command("backfill-renditions")
+@click.option("--limit", type=int, default=None, help="Process at most this many items.")
+@click.option("--force", is_flag=True, help="Regenerate renditions that already exist.")
+@click.option("--concurrency", type=int, default=8, help="Items processed in parallel.")
+def backfill_renditions(limit, force, concurrency):
+    """
+    Generates thumbnail and preview renditions for processed items that lack them, and
+    rewrites the original's Content-Type and Cache-Control headers.
+
+    Usage:
+        flask --app app backfill-renditions [--limit N] [--force] [--concurrency N]
+    """
+    bucket = os.getenv("S3_BUCKET")
+    pending = [
+        item for item in load_all_clothing_items()
+        if item.get("status") == "processed" and item.get("s3_url")
+        and (force or not all(name in (item.get("renditions") or {}) for name in RENDITION_SIZES))
+    ][:limit]
+    click.echo(f"{len(pending)} items need renditions")
+
+    def backfill(item):
+        item_id = item_key(item)
+        try:
+            file_key = s3_key_from_url(item["s3_url"])
+            data = s3_client.get_object(Bucket=bucket, Key=file_key)["Body"].read()
+            image = Image.open(io.BytesIO(data))
+            image.load()
+
+            # Older uploads were tagged image/jpeg whatever their format
+            s3_client.copy_object(
+                Bucket=bucket,
+                Key=file_key,
+                CopySource={"Bucket": bucket, "Key": file_key},
+                MetadataDirective="REPLACE",
+                ContentType=Image.MIME.get(image.format, "application/octet-stream"),
+                CacheControl=CACHE_CONTROL,
+                ContentDisposition="inline"
+            )
+            update_item_fields(item_id, {"renditions": store_renditions(item_id, image, item["s3_url"])})
+            return True
+        except Exception as e:
+            logger.error(f"Could not backfill renditions for item {item_id}: {e}")
+            click.echo(f"Failed {item_id}: {e}", err=True)
+            return False
+
+    # Own pool: store_renditions fans out on io_executor, which must not be waited on from itself
+    executor = BoundedExecutor(max_workers=concurrency, name="backfill")
+    results = executor.map(backfill, pending)
+    done = sum(results)
+    failed = len(results) - done
+    click.echo(f"Backfilled {done} items, {failed} failed")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5001)
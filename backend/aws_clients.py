@@ -0,0 +1,260 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config
+
+from telemetry import AWS_CALL_FAILURES, AWS_CALL_SECONDS
+
+logger = logging.getLogger()
+
+# Per-service settings: env prefix for overrides, connect/read timeouts (seconds), retry attempts.
+# Model endpoints get long read timeouts; Bedrock keeps few attempts so the outfit engine fallback answers quickly.
+SERVICE_SETTINGS = {
+    "s3": {"prefix": "S3", "connect_timeout": 5.0, "read_timeout": 60.0, "max_attempts": 5},
+    "dynamodb": {"prefix": "DYNAMODB", "connect_timeout": 2.0, "read_timeout": 10.0, "max_attempts": 5},
+    "sagemaker-runtime": {"prefix": "SAGEMAKER", "connect_timeout": 5.0, "read_timeout": 120.0, "max_attempts": 3},
+    "bedrock-runtime": {"prefix": "BEDROCK", "connect_timeout": 5.0, "read_timeout": 120.0, "max_attempts": 3},
+}
+DEFAULT_POOL_CONNECTIONS = 50  # botocore's default is 10
+DEFAULT_RETRY_MODE = "adaptive"  # Standard retries plus client-side rate limiting when throttled
+
+
+def _setting(service, name):
+    settings = SERVICE_SETTINGS[service]
+    value = os.getenv(f"{settings['prefix']}_{name.upper()}")
+    return type(settings[name])(value) if value else settings[name]
+
+
+def client_config(service: str, **overrides):
+    """
+    Builds the botocore Config for a service.
+
+    Pool size, retry mode and attempts come from AWS_MAX_POOL_CONNECTIONS,
+    AWS_RETRY_MODE and <SERVICE>_MAX_ATTEMPTS; timeouts from <SERVICE>_CONNECT_TIMEOUT
+    and <SERVICE>_READ_TIMEOUT (e.g. S3_READ_TIMEOUT). TCP keep-alive is always on.
+
+    Args:
+        service (str): boto3 service name, e.g. "s3".
+        **overrides: Extra Config arguments, e.g. signature_version.
+
+    Returns:
+        botocore.config.Config: The client configuration.
+    """
+    return Config(
+        max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", str(DEFAULT_POOL_CONNECTIONS))),
+        connect_timeout=_setting(service, "connect_timeout"),
+        read_timeout=_setting(service, "read_timeout"),
+        retries={"mode": os.getenv("AWS_RETRY_MODE", DEFAULT_RETRY_MODE), "max_attempts": _setting(service, "max_attempts")},
+        tcp_keepalive=True,
+        **overrides
+    )
+
+
+def endpoint_url(service: str):
+    """
+    Returns the endpoint override for a service from <SERVICE>_ENDPOINT_URL (e.g.
+    S3_ENDPOINT_URL for MinIO, DYNAMODB_ENDPOINT_URL for DynamoDB Local), or None.
+    """
+    return os.getenv(f"{SERVICE_SETTINGS[service]['prefix']}_ENDPOINT_URL") or None
+
+
+@lru_cache(maxsize=1)
+def _session():
+    # Created on first use, so credentials loaded from .env are picked up
+    return boto3.session.Session(region_name=os.getenv("AWS_REGION"))
+
+
+def create_client(service: str, **config_overrides):
+    """
+    Creates a boto3 client with the tuned Config and endpoint override for its service.
+    Clients are thread-safe and meant to be created once and shared. Every call is
+    timed into the aws_call_duration_seconds metric.
+    """
+    return instrument(
+        _session().client(service, endpoint_url=endpoint_url(service), config=client_config(service, **config_overrides))
+    )
+
+
+def create_resource(service: str, **config_overrides):
+    """
+    Creates a boto3 resource (e.g. DynamoDB) with the same settings as create_client.
+    """
+    resource = _session().resource(service, endpoint_url=endpoint_url(service), config=client_config(service, **config_overrides))
+    instrument(resource.meta.client)
+    return resource
+
+
+def instrument(client):
+    """
+    Records the latency (retries included) and failures of every call a client makes,
+    labelled by service and operation, through botocore's before-call/after-call events.
+
+    Returns:
+        The same client.
+    """
+    service = client.meta.service_model.service_name
+
+    def before_call(model, context, **kwargs):
+        context["metrics_call"] = (model.name, time.perf_counter())
+
+    def after_call(context, http_response=None, exception=None, **kwargs):
+        call = context.pop("metrics_call", None)
+        if call is None:
+            return
+        operation, started_at = call
+        AWS_CALL_SECONDS.observe(time.perf_counter() - started_at, service=service, operation=operation)
+        if exception is not None or http_response.status_code >= 300:
+            AWS_CALL_FAILURES.inc(service=service, operation=operation)
+
+    client.meta.events.register("before-call", before_call)
+    client.meta.events.register("after-call", after_call)
+    client.meta.events.register("after-call-error", after_call)
+    return client
+
+
+def describe_config():
+    """
+    Returns the effective pool size, timeouts and retries per service, for /stats.
+    """
+    return {
+        service: {
+            "max_pool_connections": int(os.getenv("AWS_MAX_POOL_CONNECTIONS", str(DEFAULT_POOL_CONNECTIONS))),
+            "connect_timeout": _setting(service, "connect_timeout"),
+            "read_timeout": _setting(service, "read_timeout"),
+            "retry_mode": os.getenv("AWS_RETRY_MODE", DEFAULT_RETRY_MODE),
+            "max_attempts": _setting(service, "max_attempts"),
+            "endpoint_url": endpoint_url(service),
+        }
+        for service in SERVICE_SETTINGS
+    }
+
+
+class PoolFullCounter(logging.Handler):
+    """
+    Counts urllib3's "Connection pool is full, discarding connection" warnings, which
+    mean more threads used a client at once than it has pooled connections.
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.discarded = 0
+
+    def emit(self, record):
+        if "Connection pool is full" in record.getMessage():
+            self.discarded += 1
+
+
+pool_full_counter = PoolFullCounter()
+logging.getLogger("urllib3.connectionpool").addHandler(pool_full_counter)
+
+
+class BoundedExecutor:
+    """
+    Thread pool for fanning out independent S3/DynamoDB calls, with a bound on queued
+    work: submit() blocks once max_pending tasks are in flight, so a bulk operation
+    cannot queue unbounded work. Tracks how often the pool was saturated.
+
+    Tasks must not submit to the same executor and wait on the result, or a full
+    pool deadlocks.
+    """
+
+    def __init__(self, max_workers=8, max_pending=None, name="io"):
+        """
+        Args:
+            max_workers (int): Threads running tasks.
+            max_pending (int, optional): Tasks running or queued before submit() blocks (4 x max_workers by default).
+            name (str): Thread name prefix.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 4
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.active = 0
+        self.peak_active = 0
+        self.saturated = 0  # Submissions made while every worker was busy
+        self.blocked = 0  # Submissions that waited for a pending slot
+        self.blocked_seconds = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules fn(*args, **kwargs) in the caller's context (so it keeps the trace id), waiting
+        for a slot if max_pending tasks are in flight.
+
+        Returns:
+            concurrent.futures.Future: The task's future.
+        """
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self._slots.acquire()
+            with self._lock:
+                self.blocked += 1
+                self.blocked_seconds += time.perf_counter() - start
+        with self._lock:
+            self.submitted += 1
+            if self.active >= self.max_workers:
+                self.saturated += 1
+        try:
+            return self._executor.submit(contextvars.copy_context().run, self._run, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def map(self, fn, items):
+        """
+        Runs fn on every item concurrently and returns the results in order.
+
+        Raises:
+            Exception: The first exception raised by fn, after every task has finished.
+        """
+        futures = [self.submit(fn, item) for item in items]
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._slots.release()
+        return result
+
+    def stats(self):
+        """
+        Returns task counters and how often the pool was saturated.
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "active": self.active,
+                "peak_active": self.peak_active,
+                "saturation_rate": self.saturated / self.submitted if self.submitted else 0.0,
+                "blocked_submits": self.blocked,
+                "blocked_ms": round(self.blocked_seconds * 1000, 1),
+                "connection_pool_discards": pool_full_counter.discarded,
+            }
@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger()
+
+
+class MicroBatcher:
+    """
+    Merges concurrent single-item calls into batched calls.
+
+    Callers submit one item and get a Future. A background thread waits for the first
+    item, keeps collecting for up to window_ms (or until the batch is full), then hands
+    the batch to a pool of max_concurrency threads that call batch_fn once with it and
+    resolve each Future with its own result. While every slot is busy, new items keep
+    queueing and go out together in the next batch.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, window_ms=50, max_batch_cost=None, cost_fn=len,
+                 max_concurrency=1, name="batcher"):
+        """
+        Args:
+            batch_fn (callable): Takes a list of items and returns a list of results in the same order.
+            max_batch_size (int): Maximum number of items per batch.
+            window_ms (float): How long to wait for more items after the first one arrives.
+            max_batch_cost (int, optional): Budget for the summed cost_fn of a batch (e.g. payload bytes).
+            cost_fn (callable): Cost of one item, used with max_batch_cost.
+            max_concurrency (int): Batches allowed to run at the same time.
+            name (str): Name of the worker thread, and prefix of the batch threads.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self.max_batch_cost = max_batch_cost
+        self.cost_fn = cost_fn
+        self.max_concurrency = max_concurrency
+        self.batches = 0
+        self.items = 0
+        self.peak_in_flight = 0
+        self._in_flight = 0
+        self._stats_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=name)
+        self._queue = queue.Queue()
+        self._carry = None  # Item that did not fit in the previous batch
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """
+        Queues one item for the next batch.
+
+        Args:
+            item: Input for batch_fn.
+
+        Returns:
+            Future: Resolves to the item's result, or raises the batch's exception.
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def stats(self):
+        """
+        Returns the number of batches run, the mean batch size and how many ran at once.
+        """
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else None,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "max_concurrency": self.max_concurrency,
+            }
+
+    def _collect(self):
+        batch = [self._carry] if self._carry else [self._queue.get()]
+        self._carry = None
+        cost = self.cost_fn(batch[0][0]) if self.max_batch_cost else 0
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if self.max_batch_cost:
+                item_cost = self.cost_fn(entry[0])
+                if cost + item_cost > self.max_batch_cost:
+                    self._carry = entry
+                    break
+                cost += item_cost
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            # Wait for a free slot first, so items arriving meanwhile join the next batch
+            self._slots.acquire()
+            batch = self._collect()
+            with self._stats_lock:
+                self._in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(items)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
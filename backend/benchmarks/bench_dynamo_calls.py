@@ -0,0 +1,180 @@
+"""
+Counts the DynamoDB calls each write endpoint makes, against an in-memory table stub.
+
+Usage:
+    python benchmarks/bench_dynamo_calls.py [wardrobe size]
+
+The clothing-items table is replaced by a stub that keeps items in a dict, pages
+scans at SCAN_PAGE_SIZE items (standing in for DynamoDB's 1 MB pages) and counts
+every call by operation. Upload jobs are not run; the write an upload job makes when
+it finishes is counted separately. For each request the "before" column is what the
+previous write path made: a put_item per placeholder, update_item followed by a
+get_item read-back, and a full scan for the upload count whenever the wardrobe
+cache had expired.
+"""
+import io
+import logging
+import math
+import os
+import re
+import sys
+from collections import Counter
+
+# Quiet, offline settings for importing the app
+logging.basicConfig(level=logging.WARNING)
+for name, value in {
+    "AWS_REGION": "us-east-1", "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+    "S3_BUCKET": "bench", "REMBG_PRELOAD": "0", "VECTOR_INDEX_DISK": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)  # app.py configures INFO logging on import
+
+SCAN_PAGE_SIZE = 100
+UPLOAD_FILES = 5
+
+
+class BatchWriterStub:
+    """
+    Buffers puts and deletes like boto3's batch writer and flushes 25 per call.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.buffer = []
+
+    def put_item(self, Item):
+        self.buffer.append(("put", Item))
+
+    def delete_item(self, Key):
+        self.buffer.append(("delete", Key))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for start in range(0, len(self.buffer), 25):
+            self.table.calls["batch_write_item"] += 1
+            for op, value in self.buffer[start:start + 25]:
+                if op == "put":
+                    self.table.items[value["clothing-item-id"]] = dict(value)
+                else:
+                    self.table.items.pop(value["clothing-item-id"], None)
+        return False
+
+
+class TableStub:
+    """
+    In-memory clothing-items table that counts calls per operation.
+    """
+
+    def __init__(self, items):
+        self.items = {item["clothing-item-id"]: item for item in items}
+        self.calls = Counter()
+
+    def put_item(self, Item, **kwargs):
+        self.calls["put_item"] += 1
+        self.items[Item["clothing-item-id"]] = dict(Item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self.calls["get_item"] += 1
+        item = self.items.get(Key["clothing-item-id"])
+        return {"Item": dict(item)} if item else {}
+
+    def delete_item(self, Key, **kwargs):
+        self.calls["delete_item"] += 1
+        self.items.pop(Key["clothing-item-id"], None)
+        return {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ExpressionAttributeNames=None, **kwargs):
+        self.calls["update_item"] += 1
+        names = ExpressionAttributeNames or {}
+        item = self.items.setdefault(Key["clothing-item-id"], dict(Key))
+        for assignment in re.sub(r"^SET\s+", "", UpdateExpression).split(","):
+            name, value = (part.strip() for part in assignment.split("="))
+            item[names.get(name, name)] = ExpressionAttributeValues[value]
+        return {"Attributes": dict(item)} if kwargs.get("ReturnValues") == "ALL_NEW" else {}
+
+    def batch_writer(self, **kwargs):
+        return BatchWriterStub(self)
+
+    def scan(self, ExclusiveStartKey=None, Limit=None, **kwargs):
+        self.calls["scan"] += 1
+        ids = sorted(self.items)
+        start = ids.index(ExclusiveStartKey["clothing-item-id"]) + 1 if ExclusiveStartKey else 0
+        page = ids[start:start + min(SCAN_PAGE_SIZE, Limit or SCAN_PAGE_SIZE)]
+        response = {"Items": [dict(self.items[item_id]) for item_id in page]}
+        if start + len(page) < len(ids):
+            response["LastEvaluatedKey"] = {"clothing-item-id": page[-1]}
+        return response
+
+
+class JobQueueStub:
+    def submit(self, fn, *args, item_id=None, **kwargs):
+        return f"job-{item_id}"
+
+
+def wardrobe(size):
+    return [
+        {
+            "clothing-item-id": f"seed-{index:05d}", "id": f"seed-{index:05d}", "name": f"Clothing Piece {index}",
+            "s3_url": f"https://bench.s3.amazonaws.com/user-uploads/seed-{index}.png", "status": "processed",
+            "category": ["Top", "Bottom", "Footwear", "Outerwear"][index % 4],
+        }
+        for index in range(size)
+    ]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    table = TableStub(wardrobe(size))
+    app.clothing_items_table = table
+    app.upload_jobs = JobQueueStub()
+    client = app.app.test_client()
+    scan_pages = max(1, math.ceil(size / SCAN_PAGE_SIZE))
+    item_id = f"seed-{0:05d}"
+
+    def upload(files):
+        data = {"file": [(io.BytesIO(b"image"), f"photo{index}.png") for index in range(files)]}
+        return client.post("/upload", data=data, content_type="multipart/form-data")
+
+    def init(files):
+        return client.post("/upload/init", json={"files": [
+            {"filename": f"photo{index}.png", "size": 1024, "content_type": "image/png"} for index in range(files)
+        ]})
+
+    def finish_job():
+        fields = {key: "bench" for key in app.ATTRIBUTE_KEYS}
+        fields.update(name="Clothing Piece", status="processed", processed_at="now", renditions={})
+        app.update_item_fields(item_id, fields)
+
+    cases = [
+        ("/upload, 1 file, cold cache", lambda: upload(1), 1 + scan_pages),
+        (f"/upload, {UPLOAD_FILES} files, cache expired", lambda: (app.wardrobe_cache.invalidate(), upload(UPLOAD_FILES)),
+         UPLOAD_FILES + scan_pages),
+        (f"/upload/init, {UPLOAD_FILES} files, cache expired", lambda: (app.wardrobe_cache.invalidate(), init(UPLOAD_FILES)),
+         UPLOAD_FILES + scan_pages),
+        ("upload job result write", finish_job, 1),
+        ("/update", lambda: client.post("/update", json={"id": item_id, "color": "Navy", "size": "M"}), 2),
+        ("/favorite", lambda: client.post("/favorite", json={"id": item_id, "favorite": True}), 2),
+    ]
+
+    print(f"Wardrobe of {size} items, scans paged at {SCAN_PAGE_SIZE} items\n")
+    print(f"{'request':<40}{'before':>8}{'now':>6}  calls")
+    for label, run, before in cases:
+        table.calls.clear()
+        response = run()
+        response = response[-1] if isinstance(response, tuple) else response
+        if response is not None and response.status_code >= 400:
+            print(f"{label}: HTTP {response.status_code} {response.get_json()}")
+            continue
+        calls = ", ".join(f"{operation} {count}" for operation, count in sorted(table.calls.items()))
+        print(f"{label:<40}{before:>8}{sum(table.calls.values()):>6}  {calls}")
+
+
+if __name__ == "__main__":
+    main()
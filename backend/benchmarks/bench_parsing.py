@@ -0,0 +1,152 @@
+"""
+Replays the model responses logged in app.log through the old and new parsers.
+
+Usage:
+    python benchmarks/bench_parsing.py [path/to/app.log]
+
+Recognition responses ("Model response:" blocks) and recommendation responses
+("Generated text from model:" blocks) are parsed as logged and with the kinds of damage
+seen from LLMs: a markdown code fence, chatter around the JSON, a trailing comma and
+output cut off at 85% of its length. For each it reports the share of responses
+parsed, the share of required recognition attributes that end up filled (the rest
+would be stored as "unknown" or need a repair call) and the mean parse time.
+"""
+import json
+import os
+import re
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from parsing import JsonArrayElementStream  # noqa: E402
+from schemas import ATTRIBUTE_KEYS, ITEM_ATTRIBUTES, REQUIRED_ATTRIBUTE_KEYS, parse_rec_response  # noqa: E402
+
+LOG_LINE = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d \w+: ")
+MARKERS = {"Model response:": "recognition", "Generated text from model:": "recommendation"}
+
+VARIANTS = {
+    "as logged": lambda text: text,
+    "code fence": lambda text: f"```json\n{text}\n```",
+    "chatter": lambda text: f"Here is the analysis:\n{text}\nLet me know if you need anything else.",
+    "trailing comma": lambda text: re.sub(r'"\s*\n(\s*)}\s*$', '",\n\\1}', text.rstrip()),
+    "truncated": lambda text: text[:int(len(text) * 0.85)],
+}
+
+
+def read_responses(path):
+    """
+    Returns (kind, text) for every logged model response, in log order.
+    """
+    responses, current = [], None
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if LOG_LINE.match(line):
+                if current:
+                    responses.append((current[0], "".join(current[1]).strip()))
+                current = None
+                message = LOG_LINE.sub("", line, count=1)
+                for marker, kind in MARKERS.items():
+                    if message.startswith(marker):
+                        current = (kind, [message[len(marker):]])
+            elif current:
+                current[1].append(line)
+    if current:
+        responses.append((current[0], "".join(current[1]).strip()))
+    return responses
+
+
+def legacy_parse_recognition(text):
+    """
+    The previous recognition parser: outermost braces, json.loads, exact key lookup.
+    """
+    start, end = text.find("{"), text.rfind("}") + 1
+    if start == -1 or end == 0:
+        return None
+    try:
+        features = json.loads(text[start:end])
+    except json.JSONDecodeError:
+        return None
+    return {key: features.get(key, "unknown") for key in ATTRIBUTE_KEYS}
+
+
+def legacy_parse_rec_response(text):
+    """
+    The previous recommendation parser: outermost brackets, then complete array elements.
+    """
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    end = max(text.rfind("}"), text.rfind("]")) + 1
+    if not starts or end == 0:
+        return None
+    try:
+        parsed = json.loads(text[min(starts):end])
+    except json.JSONDecodeError:
+        parsed = [json.loads(element) for element in JsonArrayElementStream().feed(text)]
+    if isinstance(parsed, dict):
+        parsed = parsed.get("outfits", [parsed])
+    outfits = [outfit for outfit in parsed if isinstance(outfit, dict) and isinstance(outfit.get("Outfit"), list)]
+    return outfits or None
+
+
+def new_parse_recognition(text):
+    attributes, _ = ITEM_ATTRIBUTES.parse(text)
+    return attributes or None
+
+
+def new_parse_rec_response(text):
+    try:
+        return parse_rec_response(text)
+    except ValueError:
+        return None
+
+
+def filled(attributes):
+    """
+    Number of required attributes with a real value.
+    """
+    if not attributes:
+        return 0
+    return len(REQUIRED_ATTRIBUTE_KEYS) - len(ITEM_ATTRIBUTES.missing(attributes))
+
+
+def measure(parser, texts, kind):
+    parsed = filled_total = 0
+    start = time.perf_counter()
+    results = [parser(text) for text in texts]
+    elapsed = (time.perf_counter() - start) / len(texts)
+    for result in results:
+        parsed += result is not None
+        if kind == "recognition":
+            filled_total += filled(result)
+    fill_rate = filled_total / (len(texts) * len(REQUIRED_ATTRIBUTE_KEYS)) if kind == "recognition" else None
+    return parsed / len(texts), fill_rate, elapsed * 1e6
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BACKEND_DIR, "app.log")
+    responses = read_responses(path)
+    if not responses:
+        print(f"No model responses found in {path}")
+        return
+
+    parsers = {
+        "recognition": (legacy_parse_recognition, new_parse_recognition),
+        "recommendation": (legacy_parse_rec_response, new_parse_rec_response),
+    }
+    print(f"{'kind':<16}{'variant':<16}{'n':>4}{'old parsed':>12}{'new parsed':>12}"
+          f"{'old filled':>12}{'new filled':>12}{'old us':>9}{'new us':>9}")
+    for kind, (legacy, new) in parsers.items():
+        texts = [text for response_kind, text in responses if response_kind == kind]
+        if not texts:
+            continue
+        for variant, damage in VARIANTS.items():
+            damaged = [damage(text) for text in texts]
+            old_parsed, old_filled, old_us = measure(legacy, damaged, kind)
+            new_parsed, new_filled, new_us = measure(new, damaged, kind)
+            fill = (f"{old_filled * 100:>11.0f}%{new_filled * 100:>11.0f}%" if old_filled is not None else f"{'-':>12}{'-':>12}")
+            print(f"{kind:<16}{variant:<16}{len(texts):>4}{old_parsed * 100:>11.0f}%{new_parsed * 100:>11.0f}%"
+                  f"{fill}{old_us:>9.0f}{new_us:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
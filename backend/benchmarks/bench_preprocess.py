@@ -0,0 +1,92 @@
+"""
+Compares the old JPEG quality loop against resolution-targeted preprocessing.
+
+Usage:
+    python benchmarks/bench_preprocess.py [image or directory ...]
+
+Without arguments a few synthetic rembg-style cutouts are generated. For each image it
+reports encoded bytes, encode time, number of encodes and the vision tokens the
+Qwen2.5-VL processor would spend on the result.
+"""
+import io
+import math
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing import estimate_vision_tokens, prepare_recognition_image  # noqa: E402
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+PROCESSOR_DEFAULT_MAX_PIXELS = 12845056  # Qwen2.5-VL processor default when max_pixels is not set
+
+
+def legacy_compress(image_bytes):
+    """
+    The previous pipeline: sent as-is under 5MB, otherwise re-encoded at quality 85, 80, ... 10.
+    """
+    start = time.perf_counter()
+    encodes = 0
+    img = Image.open(io.BytesIO(image_bytes))
+    if len(image_bytes) > MAX_IMAGE_SIZE:
+        img = img.convert("RGB")
+        quality = 85
+        output = io.BytesIO()
+        img.save(output, format="JPEG", quality=quality)
+        encodes += 1
+        while len(output.getvalue()) > MAX_IMAGE_SIZE and quality > 10:
+            quality -= 5
+            output = io.BytesIO()
+            img.save(output, format="JPEG", quality=quality)
+            encodes += 1
+        image_bytes = output.getvalue()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    # The processor resizes anything over its default budget itself
+    width, height = img.size
+    if width * height > PROCESSOR_DEFAULT_MAX_PIXELS:
+        scale = math.sqrt(PROCESSOR_DEFAULT_MAX_PIXELS / (width * height))
+        width, height = int(width * scale), int(height * scale)
+    return len(image_bytes), elapsed, encodes, estimate_vision_tokens(width, height)
+
+
+def synthetic_cutouts():
+    """
+    Yields (name, PNG bytes) for noisy RGBA cutouts at typical phone resolutions.
+    """
+    for width, height in [(1024, 768), (3024, 4032), (4000, 3000)]:
+        img = Image.effect_noise((width, height), 64).convert("RGB")
+        mask = Image.new("L", (width, height), 0)
+        mask.paste(255, (width // 6, height // 6, width * 5 // 6, height * 5 // 6))
+        img.putalpha(mask)
+        output = io.BytesIO()
+        img.save(output, format="PNG")
+        yield f"synthetic {width}x{height}", output.getvalue()
+
+
+def image_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith((".png", ".jpg", ".jpeg")):
+                    yield from image_files([os.path.join(path, name)])
+        else:
+            with open(path, "rb") as f:
+                yield os.path.basename(path), f.read()
+
+
+def main():
+    images = image_files(sys.argv[1:]) if len(sys.argv) > 1 else synthetic_cutouts()
+    print(f"{'image':<28}{'method':<10}{'bytes':>12}{'encode ms':>12}{'encodes':>10}{'tokens':>10}")
+    for name, image_bytes in images:
+        size, elapsed, encodes, tokens = legacy_compress(image_bytes)
+        print(f"{name:<28}{'legacy':<10}{size:>12}{elapsed:>12.1f}{encodes:>10}{tokens:>10}")
+        _, stats = prepare_recognition_image(image_bytes)
+        print(f"{'':<28}{'budget':<10}{stats['bytes']:>12}{stats['encode_ms']:>12.1f}"
+              f"{stats['encodes']:>10}{stats['vision_tokens']:>10}")
+
+
+if __name__ == "__main__":
+    main()
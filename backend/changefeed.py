@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+# Change operations
+CHANGE_UPSERT = "upsert"
+CHANGE_DELETE = "delete"
+
+
+class ChangeLog:
+    """
+    In-process log of wardrobe changes, used for incremental /list syncs.
+
+    Every mutation is stamped with a monotonically increasing version. Versions are
+    seeded from the wall clock in milliseconds so cursors handed out before a restart
+    are older than anything this process has recorded and force a full resync.
+    """
+
+    def __init__(self, max_entries=10000):
+        """
+        Args:
+            max_entries (int): Number of changes retained. Older cursors need a full resync.
+        """
+        self._entries = deque(maxlen=max_entries)  # (version, op, item_id, item)
+        self._version = self._now_ms()
+        self._base_version = self._version  # Oldest cursor the log can serve
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _now_ms():
+        return time.time_ns() // 1_000_000
+
+    @property
+    def version(self):
+        """
+        int: Version of the most recent change (the cursor a fully synced client holds).
+        """
+        with self._condition:
+            return self._version
+
+    def record(self, op: str, item_id: str, item: dict = None):
+        """
+        Appends a change and wakes up any waiting readers.
+
+        Args:
+            op (str): CHANGE_UPSERT or CHANGE_DELETE.
+            item_id (str): Id of the changed clothing item.
+            item (dict, optional): Full item after the change (upserts only).
+
+        Returns:
+            int: Version assigned to the change.
+        """
+        with self._condition:
+            self._version = max(self._version + 1, self._now_ms())
+            if len(self._entries) == self._entries.maxlen:
+                self._base_version = self._entries[0][0]
+            self._entries.append((self._version, op, item_id, item))
+            self._condition.notify_all()
+            return self._version
+
+    def changes_since(self, cursor: int):
+        """
+        Collects the changes recorded after a cursor, keeping only the latest change per item.
+
+        Args:
+            cursor (int): Version the client last synced to.
+
+        Returns:
+            tuple: (upserted items list, deleted item ids list, new cursor),
+                or None if the cursor is too old or unknown and the client must resync.
+        """
+        with self._condition:
+            if cursor < self._base_version or cursor > self._version:
+                return None
+
+            latest = {}  # key: item id, value: (op, item)
+            for version, op, item_id, item in self._entries:
+                if version > cursor:
+                    latest[item_id] = (op, item)
+
+            upserted = [item for op, item in latest.values() if op == CHANGE_UPSERT]
+            deleted = [item_id for item_id, (op, _) in latest.items() if op == CHANGE_DELETE]
+            return upserted, deleted, self._version
+
+    def wait_for_change(self, cursor: int, timeout: float):
+        """
+        Blocks until a change newer than the cursor is recorded or the timeout passes.
+
+        Args:
+            cursor (int): Version the client last synced to.
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if there are changes after the cursor.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._version > cursor, timeout=timeout)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+# Cached pipeline stages
+STAGE_CUTOUT = "cutout"  # Background-removed PNG bytes
+STAGE_ATTRIBUTES = "attributes"  # Parsed recognition attributes dict
+
+
+def content_hash(image_bytes: bytes):
+    """
+    Returns the SHA-256 hex digest used as the cache key for an uploaded image.
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class ContentCache:
+    """
+    Content-addressed cache of upload pipeline results, keyed by a hash of the
+    original image bytes, so re-uploading the same photo skips background removal
+    and recognition.
+
+    The memory tier is an LRU bounded by total bytes. When disk_dir is set, entries
+    are also written there (<digest>.png / <digest>.json) and promoted back into
+    memory on a memory miss.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        """
+        Args:
+            max_bytes (int): Memory budget for cached entries.
+            disk_dir (str, optional): Directory for the on-disk tier. Disabled if None.
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key: (stage, digest), value: (value, size in bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = {STAGE_CUTOUT: 0, STAGE_ATTRIBUTES: 0}
+        self._misses = {STAGE_CUTOUT: 0, STAGE_ATTRIBUTES: 0}
+        self._disk_hits = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get_cutout(self, digest: str):
+        """
+        Returns the cached background-removed PNG for an image hash, or None.
+        """
+        return self._get(STAGE_CUTOUT, digest)
+
+    def put_cutout(self, digest: str, cutout: bytes):
+        """
+        Caches the background-removed PNG for an image hash.
+        """
+        self._put(STAGE_CUTOUT, digest, cutout, len(cutout))
+
+    def get_attributes(self, digest: str):
+        """
+        Returns a copy of the cached recognition attributes for an image hash, or None.
+        """
+        attributes = self._get(STAGE_ATTRIBUTES, digest)
+        return dict(attributes) if attributes is not None else None
+
+    def put_attributes(self, digest: str, attributes: dict):
+        """
+        Caches the recognition attributes for an image hash.
+        """
+        self._put(STAGE_ATTRIBUTES, digest, dict(attributes), len(json.dumps(attributes, default=str)))
+
+    def stats(self):
+        """
+        Returns per-stage hit/miss counters and the memory usage.
+        """
+        with self._lock:
+            stats = {"entries": len(self._entries), "bytes": self._size, "disk_hits": self._disk_hits}
+            for stage in (STAGE_CUTOUT, STAGE_ATTRIBUTES):
+                lookups = self._hits[stage] + self._misses[stage]
+                stats[stage] = {
+                    "hits": self._hits[stage],
+                    "misses": self._misses[stage],
+                    "hit_rate": self._hits[stage] / lookups if lookups else 0.0,
+                }
+            return stats
+
+    def _get(self, stage, digest):
+        key = (stage, digest)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits[stage] += 1
+                return self._entries[key][0]
+
+        value = self._read_disk(stage, digest)
+        with self._lock:
+            if value is None:
+                self._misses[stage] += 1
+                return None
+            self._hits[stage] += 1
+            self._disk_hits += 1
+        size = len(value) if stage == STAGE_CUTOUT else len(json.dumps(value, default=str))
+        self._put(stage, digest, value, size, write_disk=False)
+        return value
+
+    def _put(self, stage, digest, value, size, write_disk=True):
+        key = (stage, digest)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+        if write_disk:
+            self._write_disk(stage, digest, value)
+
+    def _disk_path(self, stage, digest):
+        extension = "png" if stage == STAGE_CUTOUT else "json"
+        return os.path.join(self.disk_dir, f"{digest}.{extension}")
+
+    def _read_disk(self, stage, digest):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(stage, digest)
+        try:
+            if stage == STAGE_CUTOUT:
+                with open(path, "rb") as f:
+                    return f.read()
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading cache entry {path}: {e}")
+            return None
+
+    def _write_disk(self, stage, digest, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(stage, digest)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if stage == STAGE_CUTOUT:
+                with open(temp_path, "wb") as f:
+                    f.write(value)
+            else:
+                with open(temp_path, "w") as f:
+                    json.dump(value, f, default=str)
+            os.replace(temp_path, path)  # Atomic, so readers never see a partial file
+        except Exception as e:
+            logger.error(f"Error writing cache entry {path}: {e}")
@@ -0,0 +1,96 @@
+import contextvars
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+logger = logging.getLogger()
+
+# Job lifecycle: queued -> processing -> processed | failed
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_PROCESSED = "processed"
+JOB_FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Background job queue served by a fixed-size worker pool.
+
+    Jobs are plain callables. A job that returns normally ends as "processed",
+    a job that raises ends as "failed" with the exception message recorded.
+    Finished jobs are kept in memory (oldest evicted first) so clients can poll them.
+    """
+
+    def __init__(self, max_workers=4, max_history=1000):
+        """
+        Args:
+            max_workers (int): Number of worker threads processing jobs in parallel.
+            max_history (int): Maximum number of job records kept for status lookups.
+        """
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs = OrderedDict()  # key: job id, value: job record dict
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, item_id=None, **kwargs):
+        """
+        Queues a callable for background execution.
+
+        Args:
+            fn (callable): Work to run on a worker thread.
+            *args: Positional arguments passed to fn.
+            item_id (str, optional): Clothing item the job belongs to.
+            **kwargs: Keyword arguments passed to fn.
+
+        Returns:
+            str: Id of the queued job.
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "item_id": item_id,
+            "status": JOB_QUEUED,
+            "error": None,
+            "submitted_at": datetime.now(timezone.utc).isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+
+        # The job runs in the submitter's context, so it keeps the request's trace id
+        self._executor.submit(contextvars.copy_context().run, self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns a snapshot of a job record, or None if the job is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status=JOB_PROCESSING, started_at=datetime.now(timezone.utc).isoformat())
+        try:
+            fn(*args, **kwargs)
+            self._update(job_id, status=JOB_PROCESSED, finished_at=datetime.now(timezone.utc).isoformat())
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self._update(
+                job_id,
+                status=JOB_FAILED,
+                error=str(e),
+                finished_at=datetime.now(timezone.utc).isoformat()
+            )
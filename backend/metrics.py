@@ -0,0 +1,167 @@
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger()
+
+# Histogram bucket upper bounds in seconds, from a DynamoDB call or image decode to a full generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, e.g. requests by endpoint and status.
+    """
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # key: label values tuple, value: count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Adds amount to the series for the given label values.
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """
+    Latency histogram with cumulative buckets, a sum and a count per label set.
+    """
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key: label values tuple, value: [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Records one observation (seconds for durations) for the given label values.
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, values in series:
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, {'le': bound})} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, {'le': '+Inf'})} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Holds every metric of one service and renders them in the Prometheus text exposition format.
+    Shared by the backend ("wardrobe") and the recognition container ("recognition"); each
+    defines its own metrics on its own registry.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._metrics = []
+        # Recorded by span() for every service
+        self.stage_seconds = self.histogram("stage_duration_seconds", "Latency of one pipeline stage.", ("stage",))
+        self.stage_failures = self.counter("stage_failures_total", "Pipeline stages that raised.", ("stage",))
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(f"{self.namespace}_{name}", help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(f"{self.namespace}_{name}", help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    @contextmanager
+    def span(self, stage: str):
+        """
+        Times a block as one pipeline stage: its duration goes to stage_duration_seconds,
+        and an exception also counts in stage_failures_total before it propagates.
+
+        Usage:
+            with registry.span("rembg_remove"):
+                cutout = segmentation_engine.remove_background_image(input_bytes)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.stage_failures.inc(stage=stage)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(elapsed, stage=stage)
+            logger.debug(f"[{current_trace_id()}] {stage} took {elapsed * 1000:.1f} ms")
+
+    def render(self):
+        """
+        Returns the exposition text served at /metrics.
+        """
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+# ------------------------ Tracing ------------------------
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+
+
+def start_trace(trace_id: str = None):
+    """
+    Sets the trace id of the current request (a new one if not given) and returns it.
+    Threads started with contextvars.copy_context() inherit it.
+    """
+    trace_id = trace_id or uuid.uuid4().hex
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def current_trace_id():
+    """
+    Returns the trace id of the current request, or None outside a request.
+    """
+    return _trace_id.get()
+
@@ -0,0 +1,261 @@
+import logging
+import time
+
+import numpy as np
+
+from retrieval import query_terms, score_item, tokenize
+
+logger = logging.getLogger()
+
+REQUIRED_SLOTS = ["Top", "Bottom", "Footwear"]
+OUTERWEAR = "Outerwear"
+MAX_PER_SLOT = 15  # Best-matching items per slot that are combined (15^3 outfits, x10 with outerwear)
+MAX_OUTERWEAR = 10
+
+# Attribute vocabularies; each item becomes a multi-hot vector over them
+OCCASIONS = {
+    "casual": ["casual", "everyday", "relaxed", "weekend", "lounge"],
+    "formal": ["formal", "elegant", "dressy", "wedding", "gala", "black"],
+    "business": ["business", "office", "work", "professional", "smart"],
+    "sporty": ["sporty", "sport", "athletic", "gym", "workout", "running", "athleisure"],
+    "evening": ["evening", "party", "night", "date", "cocktail"],
+    "outdoor": ["outdoor", "hiking", "travel", "beach", "camping"],
+}
+WEATHER = {
+    "warm": ["warm", "hot", "summer", "sunny"],
+    "mild": ["mild", "spring", "transitional", "season", "seasons"],
+    "cold": ["cold", "winter", "chilly", "snow", "cool", "fall", "autumn"],
+    "wet": ["rain", "rainy", "wet", "water", "waterproof"],
+}
+STYLES = {
+    "casual": ["casual", "relaxed"],
+    "classic": ["classic", "traditional", "timeless", "preppy"],
+    "minimalist": ["minimalist", "minimal", "clean"],
+    "streetwear": ["streetwear", "street", "urban", "edgy"],
+    "athleisure": ["athleisure", "sporty", "athletic"],
+    "elegant": ["elegant", "formal", "sophisticated", "chic"],
+    "bohemian": ["bohemian", "boho", "vintage", "retro"],
+}
+# Colour families: neutrals go with everything, hues are scored by distance on the colour wheel
+NEUTRAL_COLORS = [
+    "black", "white", "grey", "gray", "navy", "beige", "brown", "cream", "khaki", "tan", "ivory",
+    "charcoal", "denim", "camel", "taupe", "olive", "nude", "silver",
+]
+HUES = {
+    "red": ["red", "burgundy", "maroon", "crimson", "wine", "scarlet"],
+    "orange": ["orange", "rust", "coral", "peach", "terracotta"],
+    "yellow": ["yellow", "mustard", "gold", "lemon"],
+    "green": ["green", "emerald", "sage", "mint", "forest", "lime"],
+    "blue": ["blue", "teal", "turquoise", "cobalt", "sky", "royal", "indigo"],
+    "purple": ["purple", "lavender", "violet", "plum", "lilac"],
+    "pink": ["pink", "magenta", "fuchsia", "rose", "blush"],
+}
+HUE_DISTANCE_SCORES = {0: 0.7, 1: 0.8, 2: 0.4, 3: 0.6}  # Monochrome, analogous, clashing, complementary
+
+# Weight of an item's prompt match (normalized to 0-1 per slot) and of the pairwise compatibility terms
+PROMPT_WEIGHT = 3.0
+OCCASION_WEIGHT = 1.0
+WEATHER_WEIGHT = 0.7
+STYLE_WEIGHT = 0.7
+COLOR_WEIGHT = 1.0
+LAYERING_TERMS = {"cold", "winter", "chilly", "snow", "rain", "rainy", "windy", "cool", "fall", "autumn", "layering"}
+
+
+def _color_matrix():
+    hues = list(HUES)
+    size = len(hues) + 1  # Index 0 is neutral
+    matrix = np.ones((size, size), dtype=np.float32)
+    for i in range(len(hues)):
+        for j in range(len(hues)):
+            distance = min(abs(i - j), len(hues) - abs(i - j))
+            matrix[i + 1, j + 1] = HUE_DISTANCE_SCORES.get(distance, 0.4)
+    return matrix
+
+
+COLOR_COMPATIBILITY = _color_matrix()
+
+
+def _multi_hot(items, field, vocabulary):
+    """
+    Encodes one attribute of every item as unit-length multi-hot rows over vocabulary.
+    Items that mention none of the words get a uniform row (compatible with anything).
+    """
+    matrix = np.zeros((len(items), len(vocabulary)), dtype=np.float32)
+    for row, item in enumerate(items):
+        words = set(tokenize(item.get(field)))
+        if field == "weather_appropriateness" and "all" in words:
+            matrix[row] = 1.0
+            continue
+        for col, synonyms in enumerate(vocabulary.values()):
+            if words.intersection(synonyms):
+                matrix[row, col] = 1.0
+    matrix[matrix.sum(axis=1) == 0] = 1.0
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _color_groups(items):
+    groups = np.zeros(len(items), dtype=np.int64)
+    for row, item in enumerate(items):
+        words = tokenize(item.get("color"))
+        for word in words:
+            if word in NEUTRAL_COLORS:
+                break
+            hue = next((index for index, synonyms in enumerate(HUES.values()) if word in synonyms), None)
+            if hue is not None:
+                groups[row] = hue + 1
+                break
+    return groups
+
+
+class SlotFeatures:
+    """
+    Attribute matrices for the candidate items of one outfit slot.
+    """
+
+    def __init__(self, scored_items):
+        self.items = [item for _, item in scored_items]
+        scores = np.array([score for score, _ in scored_items], dtype=np.float32)
+        # Normalized so the prompt match cannot drown out how well the pieces go together
+        self.scores = PROMPT_WEIGHT * scores / scores.max() if scores.max() > 0 else np.zeros_like(scores)
+        self.occasion = _multi_hot(self.items, "occasion_suitability", OCCASIONS)
+        self.weather = _multi_hot(self.items, "weather_appropriateness", WEATHER)
+        self.style = _multi_hot(self.items, "style", STYLES)
+        self.color = _color_groups(self.items)
+
+    def compatibility(self, other):
+        """
+        Pairwise compatibility of every item here with every item of another slot.
+
+        Returns:
+            np.ndarray: (len(self.items), len(other.items)) scores.
+        """
+        return (
+            OCCASION_WEIGHT * self.occasion @ other.occasion.T
+            + WEATHER_WEIGHT * self.weather @ other.weather.T
+            + STYLE_WEIGHT * self.style @ other.style.T
+            + COLOR_WEIGHT * COLOR_COMPATIBILITY[self.color][:, other.color]
+        )
+
+
+def _slot_candidates(items, terms, category, limit):
+    scored = [(score_item(item, terms), item) for item in items if item.get("category") == category]
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return scored[:limit]
+
+
+def generate_outfits(items: list, user_prompt: str = "", count: int = 1, outerwear: bool = None):
+    """
+    Builds ranked outfits from the wardrobe without a model call.
+
+    The best-matching items per slot are combined exhaustively: every top/bottom/footwear
+    triple is scored at once as a broadcast sum of the items' prompt matches and the
+    pairwise compatibility of their occasion, weather, style and colour. When an
+    outerwear slot is used, each triple gets its best-scoring outerwear piece.
+
+    Args:
+        items (list): Wardrobe items.
+        user_prompt (str, optional): The user's request.
+        count (int, optional): Number of outfits to return.
+        outerwear (bool, optional): Add an outerwear piece. Decided from the prompt's weather if None.
+
+    Returns:
+        list: (score, list of items) per outfit, best first. Outfits share at most one item.
+    """
+    start = time.perf_counter()
+    terms = query_terms(user_prompt)
+    processed = [item for item in items if item.get("status", "processed") == "processed"]
+    slots = [_slot_candidates(processed, terms, category, MAX_PER_SLOT) for category in REQUIRED_SLOTS]
+    if not all(slots):
+        return []
+    top, bottom, footwear = (SlotFeatures(slot) for slot in slots)
+
+    # scores[t, b, f] for every combination
+    scores = (
+        top.scores[:, None, None] + bottom.scores[None, :, None] + footwear.scores[None, None, :]
+        + top.compatibility(bottom)[:, :, None]
+        + top.compatibility(footwear)[:, None, :]
+        + bottom.compatibility(footwear)[None, :, :]
+    )
+
+    if outerwear is None:
+        outerwear = bool(terms & LAYERING_TERMS)
+    outer = _slot_candidates(processed, terms, OUTERWEAR, MAX_OUTERWEAR) if outerwear else []
+    best_outer = None
+    if outer:
+        layer = SlotFeatures(outer)
+        # outer_scores[t, b, f, o]; keep the best outerwear piece per combination
+        outer_scores = (
+            layer.scores[None, None, None, :]
+            + top.compatibility(layer)[:, None, None, :]
+            + bottom.compatibility(layer)[None, :, None, :]
+            + footwear.compatibility(layer)[None, None, :, :]
+        )
+        best_outer = outer_scores.argmax(axis=3)
+        scores = scores + outer_scores.max(axis=3)
+
+    # Walk the best combinations, skipping outfits that share 2+ items with an earlier pick
+    flat = scores.ravel()
+    pool = min(flat.size, max(count * 50, 200))
+    ranked = np.argpartition(-flat, pool - 1)[:pool]
+    ranked = ranked[np.argsort(-flat[ranked])]
+
+    outfits = []
+    for index in ranked:
+        t, b, f = np.unravel_index(index, scores.shape)
+        outfit = [top.items[t], bottom.items[b], footwear.items[f]]
+        if best_outer is not None:
+            outfit.append(layer.items[best_outer[t, b, f]])
+        ids = {id(item) for item in outfit}
+        if any(len(ids & {id(item) for item in picked}) > 1 for _, picked in outfits):
+            continue
+        outfits.append((float(flat[index]), outfit))
+        if len(outfits) == count:
+            break
+
+    logger.info(
+        f"Outfit engine scored {flat.size} combinations in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return outfits
+
+
+def candidate_items(items: list, user_prompt: str = "", outfits: int = 10):
+    """
+    Pre-ranks the wardrobe for the LLM prompt: the items that appear in the best
+    rule-based outfits, scored by the best outfit each one appears in.
+
+    Returns:
+        list: (score, item) pairs grouped by category, best first, as select_candidates returns.
+    """
+    best = {}
+    for score, outfit in generate_outfits(items, user_prompt, count=outfits):
+        for item in outfit:
+            if id(item) not in best or best[id(item)][0] < score:
+                best[id(item)] = (score, item)
+    categories = REQUIRED_SLOTS + [OUTERWEAR]
+    return sorted(best.values(), key=lambda pair: (categories.index(pair[1].get("category")), -pair[0]))
+
+
+def describe_outfit(outfit: list, user_prompt: str = ""):
+    """
+    Writes a templated explanation and styling tip for a rule-based outfit.
+
+    Returns:
+        tuple: (explanation, styling tips).
+    """
+    pieces = [" ".join(str(item.get(key)) for key in ("color", "type") if item.get(key)) for item in outfit]
+    occasions = set.intersection(*[
+        {name for name, synonyms in OCCASIONS.items() if set(tokenize(item.get("occasion_suitability"))) & set(synonyms)}
+        for item in outfit
+    ])
+    occasion = f" for {' and '.join(sorted(occasions))} occasions" if occasions else ""
+    explanation = f"The {', '.join(pieces[:-1])} and {pieces[-1]} share a compatible palette and style{occasion}."
+
+    colors = _color_groups(outfit)
+    if (colors == 0).all():
+        styling = "Everything here is neutral, so a coloured accessory or bag adds a focal point."
+    else:
+        statement = outfit[int(np.argmax(colors > 0))]
+        styling = f"Keep accessories neutral and let the {statement.get('color')} {statement.get('type')} stand out."
+    if user_prompt:
+        styling += f" Chosen by wardrobe rules for: \"{user_prompt.strip()}\"."
+    return explanation, styling
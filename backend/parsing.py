@@ -0,0 +1,289 @@
+import json
+import re
+
+
+class JsonObjectAccumulator:
+    """
+    Incrementally tracks model output until the first top-level JSON object is closed.
+
+    Text before the opening brace is ignored. Braces inside JSON strings (including
+    escaped quotes) do not count towards nesting.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.closed = False
+        self._chunks = []
+
+    def feed(self, text: str):
+        """
+        Consumes the next chunk of output.
+
+        Args:
+            text (str): Newly generated text.
+
+        Returns:
+            str: The complete JSON object text once its closing brace arrives, otherwise None.
+        """
+        if self.closed:
+            return None
+        if self.depth == 0:
+            # Skip any preamble before the object starts
+            start = text.find("{")
+            if start == -1:
+                return None
+            text = text[start:]
+        return self._consume(text)
+
+    def _consume(self, text):
+        for index, char in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.closed = True
+                    self._chunks.append(text[:index + 1])
+                    return "".join(self._chunks)
+        self._chunks.append(text)
+        return None
+
+
+class JsonArrayElementStream:
+    """
+    Incrementally extracts the objects that are direct elements of a JSON array, e.g.
+    each outfit of {"outfits": [{...}, {...}]}, as soon as each one is complete.
+
+    Text outside the JSON and braces inside strings are ignored.
+    """
+
+    def __init__(self):
+        self.in_string = False
+        self.escape = False
+        self._stack = []  # Open containers, "{" or "["
+        self._element = None  # Text of the array element being read, once one has started
+
+    def feed(self, text: str):
+        """
+        Consumes the next chunk of output.
+
+        Args:
+            text (str): Newly generated text.
+
+        Returns:
+            list: JSON texts of the array elements completed by this chunk.
+        """
+        completed = []
+        start = 0 if self._element is not None else None
+        for index, char in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = bool(self._stack)
+            elif char in "{[":
+                if char == "{" and self._stack and self._stack[-1] == "[" and self._element is None:
+                    self._element, start = [], index
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._element is not None and self._stack and self._stack[-1] == "[":
+                    self._element.append(text[start:index + 1])
+                    completed.append("".join(self._element))
+                    self._element, start = None, None
+        if self._element is not None:
+            self._element.append(text[start:])
+        return completed
+
+
+def _closers(stack):
+    return "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+
+def extract_json(text: str, expected=(dict, list)):
+    """
+    Extracts the first top-level JSON object or array from model output.
+
+    Tolerates text before and after the JSON (including markdown code fences),
+    braces inside strings, trailing commas and output that was cut off: a truncated
+    value is closed, or cut back to the last complete member, so what was generated
+    before the cut is kept. A bracket that does not open valid JSON of the expected
+    type, such as "[front view]" in "Here is the item [front view]: {...}", is
+    skipped and the next "{" or "[" is tried.
+
+    Args:
+        text (str): Raw model output.
+        expected (type | tuple): Accepted type(s) of the value, e.g. dict to skip arrays.
+
+    Returns:
+        dict | list: The parsed JSON value.
+
+    Raises:
+        ValueError: If no JSON value can be recovered.
+    """
+    found = False
+    for start, char in enumerate(text):
+        if char not in "{[":
+            continue
+        found = True
+        value = _parse_from(text, start)
+        if isinstance(value, expected):
+            return value
+    if not found:
+        raise ValueError("No JSON found in model output.")
+    raise ValueError("Could not parse the JSON in model output.")
+
+
+def _parse_from(text: str, start: int):
+    # Parses the JSON value opened at text[start], repairing it as extract_json describes; None if it cannot
+    stack, in_string, escape, end = [], False, False, None
+    commas = []  # (index, open containers) of each comma outside strings, for cutting back
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            stack.pop()
+            if not stack:
+                end = index + 1
+                break
+        elif char == ",":
+            commas.append((index, tuple(stack)))
+
+    if end is not None:
+        attempts = [text[start:end]]
+    else:
+        # Cut off: close what is open, or drop the incomplete last member
+        attempts = [text[start:] + ('"' if in_string else "") + _closers(stack)]
+        attempts += [text[start:index] + _closers(open_stack) for index, open_stack in reversed(commas[-3:])]
+
+    for candidate in attempts:
+        for repaired in (candidate, re.sub(r",\s*([}\]])", r"\1", candidate)):
+            try:
+                return json.loads(repaired)
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def normalize_key(key):
+    """
+    Normalizes a key the model wrote to snake_case: "Accent Color(s)" -> "accent_colors",
+    "Type of clothing" -> "type_of_clothing".
+    """
+    key = str(key).lower().replace("(s)", "s")
+    return re.sub(r"[^a-z0-9]+", "_", key).strip("_")
+
+
+def _flatten(value, into):
+    # Nested objects (e.g. {"analysis": {...}}) contribute their members; outer keys win
+    for key, member in value.items():
+        if isinstance(member, dict):
+            _flatten(member, into)
+        else:
+            into.setdefault(key, member)
+    return into
+
+
+def _to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_to_text(member) for member in value if member not in (None, ""))
+    return str(value).strip()
+
+
+class AttributeSchema:
+    """
+    Maps a model's attribute JSON onto a fixed set of keys.
+
+    Keys are matched after normalize_key and an alias table, nested objects are
+    flattened, and values are converted to strings (lists are comma-joined).
+    Required keys that are absent, empty, "unknown" or outside their allowed
+    choices are reported as missing, so they can be asked for again.
+    """
+
+    def __init__(self, keys: list, required: list = (), aliases: dict = None, choices: dict = None):
+        """
+        Args:
+            keys (list): Attribute keys to keep.
+            required (list): Keys an item cannot do without.
+            aliases (dict): key: normalized key the model may use, value: attribute key.
+            choices (dict): key: attribute key, value: allowed values (matched case-insensitively).
+        """
+        self.keys = list(keys)
+        self.required = list(required)
+        self.aliases = dict(aliases or {})
+        self.choices = {key: {value.lower(): value for value in values} for key, values in (choices or {}).items()}
+
+    def normalize(self, raw):
+        """
+        Normalizes parsed model output.
+
+        Returns:
+            dict: Attribute key to string value, for the keys that were found.
+        """
+        if not isinstance(raw, dict):
+            return {}
+        attributes = {}
+        for key, value in _flatten(raw, {}).items():
+            normalized = normalize_key(key)
+            key = normalized if normalized in self.keys else self.aliases.get(normalized)
+            if key is None:
+                continue
+            value = _to_text(value)
+            if key in self.choices:
+                value = self.choices[key].get(value.lower(), value)
+            # The first non-empty value wins when several keys map to the same attribute
+            if key not in attributes or (value and not attributes[key]):
+                attributes[key] = value
+        return attributes
+
+    def missing(self, attributes: dict):
+        """
+        Returns the required keys that are absent, empty, "unknown" or not an allowed choice.
+        """
+        missing = []
+        for key in self.required:
+            value = attributes.get(key, "")
+            if not value or value.lower() == "unknown" or (key in self.choices and value not in self.choices[key].values()):
+                missing.append(key)
+        return missing
+
+    def parse(self, text: str):
+        """
+        Extracts, normalizes and validates attributes from raw model output.
+
+        Returns:
+            tuple: (attributes dict, list of missing required keys). Unparseable output gives ({}, all required keys).
+        """
+        try:
+            raw = extract_json(text, dict)
+        except ValueError:
+            return {}, list(self.required)
+        attributes = self.normalize(raw)
+        return attributes, self.missing(attributes)
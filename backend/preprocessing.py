@@ -0,0 +1,122 @@
+import io
+import logging
+import math
+import time
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger()
+
+# Qwen2.5-VL turns every 28x28 pixel block into one vision token
+VISION_TOKEN_PATCH = 28
+DEFAULT_MAX_PIXELS = 768 * VISION_TOKEN_PATCH * VISION_TOKEN_PATCH  # Matches the container's processor max_pixels
+DEFAULT_QUALITY = 85
+MIN_QUALITY = 30
+MAX_QUALITY_STEPS = 4  # Bounded binary search if the first encode is over budget
+
+
+def estimate_vision_tokens(width: int, height: int):
+    """
+    Estimates how many vision tokens Qwen2.5-VL spends on an image of the given size.
+    """
+    return math.ceil(width / VISION_TOKEN_PATCH) * math.ceil(height / VISION_TOKEN_PATCH)
+
+
+def flatten_alpha(img, background=(255, 255, 255)):
+    """
+    Composites an image with transparency onto a solid background.
+    A plain convert('RGB') drops the alpha channel and exposes whatever colour the
+    transparent pixels of the rembg cutout happen to hold.
+
+    Args:
+        img (PIL.Image.Image): Input image.
+        background (tuple): RGB background colour.
+
+    Returns:
+        PIL.Image.Image: RGB image.
+    """
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        flattened = Image.new("RGB", img.size, background)
+        flattened.paste(img, mask=img.getchannel("A"))
+        return flattened
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def resize_to_pixel_budget(img, max_pixels: int):
+    """
+    Downscales an image so width * height fits the pixel budget, keeping the aspect ratio.
+
+    Returns:
+        PIL.Image.Image: Resized image (the input itself if it already fits).
+    """
+    width, height = img.size
+    if width * height <= max_pixels:
+        return img
+    scale = math.sqrt(max_pixels / (width * height))
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return img.resize(size, Image.LANCZOS)
+
+
+def encode_jpeg(img, quality: int):
+    """
+    Encodes an RGB image as JPEG bytes at the given quality.
+    """
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def prepare_recognition_image(image_bytes: bytes, img=None, max_pixels=DEFAULT_MAX_PIXELS, max_size=5 * 1024 * 1024):
+    """
+    Preprocesses an image for the recognition model: applies EXIF orientation,
+    flattens transparency onto white, resizes to the model's pixel budget and
+    encodes JPEG in one pass, only searching lower qualities if still over max_size.
+
+    Args:
+        image_bytes (bytes | memoryview): Encoded image.
+        img (PIL.Image.Image, optional): Already decoded image_bytes, to skip decoding again.
+        max_pixels (int, optional): Pixel budget, matching the processor's max_pixels.
+        max_size (int, optional): Maximum encoded size in bytes. Defaults to 5MB.
+
+    Returns:
+        tuple: (JPEG bytes, stats dict with bytes, encode_ms, encodes, quality, size and vision_tokens).
+    """
+    start = time.perf_counter()
+    if img is None:
+        img = Image.open(io.BytesIO(image_bytes))
+    img = ImageOps.exif_transpose(img)
+    img = resize_to_pixel_budget(flatten_alpha(img), max_pixels)
+
+    quality = DEFAULT_QUALITY
+    output = encode_jpeg(img, quality)
+    encodes = 1
+    if len(output) > max_size:
+        # Binary search for the highest quality that fits
+        low, high, best = MIN_QUALITY, quality - 1, None
+        for _ in range(MAX_QUALITY_STEPS):
+            if low > high:
+                break
+            mid = (low + high) // 2
+            candidate = encode_jpeg(img, mid)
+            encodes += 1
+            if len(candidate) <= max_size:
+                best, quality, low = candidate, mid, mid + 1
+            else:
+                high = mid - 1
+        if best is None:
+            quality = MIN_QUALITY
+            best = encode_jpeg(img, quality)
+            encodes += 1
+        output = best
+
+    stats = {
+        "input_bytes": len(image_bytes),
+        "bytes": len(output),
+        "encode_ms": round((time.perf_counter() - start) * 1000, 1),
+        "encodes": encodes,
+        "quality": quality,
+        "size": img.size,
+        "vision_tokens": estimate_vision_tokens(*img.size),
+    }
+    return output, stats
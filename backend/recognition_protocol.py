@@ -0,0 +1,74 @@
+import uuid
+
+from metrics import current_trace_id
+
+# Wire format of the recognition container's /invocations (see sagemaker-qwen-container/README.md)
+MULTIPART_PART_OVERHEAD = 256  # Upper bound of the boundary and headers build_multipart_body adds per image
+
+
+def build_multipart_body(images: list):
+    """
+    Encodes images as multipart/form-data 'image' parts for a batched recognition request.
+
+    Args:
+        images (list): JPEG bytes per image.
+
+    Returns:
+        tuple: (body bytes, Content-Type header value).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for index, image_bytes in enumerate(images):
+        parts.append(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="image"; filename="image{index}.jpg"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode("utf-8")
+        )
+        parts.append(bytes(image_bytes))
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def build_request_body(images: list):
+    """
+    Encodes the body of a recognition request: a raw JPEG body for one image, answered
+    with {"generated_text"}, or a multipart body for several, answered with {"generated_texts"}.
+
+    Args:
+        images (list): JPEG bytes per image.
+
+    Returns:
+        tuple: (body bytes, Content-Type header value).
+    """
+    if len(images) == 1:
+        return bytes(images[0]), "image/jpeg"
+    return build_multipart_body(images)
+
+
+def container_attributes(trace_ids=None, **values):
+    """
+    Formats the recognition container's CustomAttributes header ("key=value;key=value"),
+    adding the trace id of the current request, or of every request in a batch.
+
+    Args:
+        trace_ids (list, optional): Trace ids of the batched requests. Defaults to the current one.
+        **values: Other attributes, e.g. stream=1. Values must already be URL-encoded.
+
+    Returns:
+        str: The header value.
+    """
+    trace_ids = [trace_id for trace_id in (trace_ids or [current_trace_id()]) if trace_id]
+    if trace_ids:
+        values["trace_id"] = ",".join(dict.fromkeys(trace_ids))
+    return ";".join(f"{key}={value}" for key, value in values.items())
+
+
+def parse_container_attributes(header: str):
+    """
+    Parses the CustomAttributes the container returns (ttft_ms, tokens, tokens_per_second, trace_id).
+
+    Returns:
+        dict: key: attribute name, value: raw string value.
+    """
+    return dict(pair.split("=", 1) for pair in (header or "").split(";") if "=" in pair)
@@ -0,0 +1,100 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(user_prompt: str):
+    """
+    Normalizes a user prompt for cache lookups: case, punctuation and whitespace are
+    ignored, so "Outfit for a wedding!" and "outfit for a  wedding" share an entry.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", (user_prompt or "").lower()).split())
+
+
+class RecommendationCache:
+    """
+    LRU cache of /recommend responses with a TTL.
+
+    Keys include the wardrobe version, so a cached outfit is never served once the
+    wardrobe has changed; mutations also clear the cache outright to free memory.
+    Each entry remembers how long the model call took, so hits report latency saved.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted.
+            ttl_seconds (float): Seconds an entry stays valid.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+        self._entries = OrderedDict()  # key: cache key, value: (response, seconds to compute, stored at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached response for a key, or None on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[2] > self.ttl_seconds:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved += entry[1]
+            return entry[0]
+
+    def put(self, key, response, elapsed: float):
+        """
+        Caches a response.
+
+        Args:
+            key: Cache key, e.g. (wardrobe version, normalized prompt).
+            response: The response to return on later hits.
+            elapsed (float): Seconds it took to compute the response.
+        """
+        with self._lock:
+            self._entries[key] = (response, elapsed, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_bypass(self):
+        """
+        Counts a request that skipped the cache (e.g. the user asked to regenerate).
+        """
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        """
+        Drops every entry after the wardrobe changed.
+        """
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the total model latency saved by hits.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "latency_saved_ms": round(self.latency_saved * 1000, 1),
+            }
@@ -0,0 +1,60 @@
+import io
+import logging
+
+from PIL import Image
+
+logger = logging.getLogger()
+
+# Derived sizes: key: rendition name, value: longest side in pixels
+RENDITION_SIZES = {
+    "thumb": 256,  # Wardrobe grid tiles
+    "preview": 1024,  # Item modal and outfit views
+}
+RENDITION_FORMAT = "WEBP"
+RENDITION_CONTENT_TYPE = "image/webp"
+RENDITION_QUALITY = 80
+# Every key embeds the item id and is written once, so objects can be cached indefinitely
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def rendition_key(item_id: str, name: str):
+    """
+    Returns the S3 key of an item's rendition, e.g. renditions/<item id>/thumb.webp.
+    """
+    return f"renditions/{item_id}/{name}.webp"
+
+
+def render(image):
+    """
+    Renders every size in RENDITION_SIZES as WebP, keeping transparency. Images are only
+    ever scaled down, so a small original gives renditions at its own size.
+
+    Args:
+        image (PIL.Image.Image | bytes): The original image, decoded or encoded.
+
+    Returns:
+        dict: key: rendition name, value: encoded WebP bytes.
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.open(io.BytesIO(image))
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    renditions = {}
+    # Largest first, so each smaller size is resampled from the previous one
+    for name, size in sorted(RENDITION_SIZES.items(), key=lambda pair: pair[1], reverse=True):
+        image = image.copy() if image.width <= size and image.height <= size else _resized(image, size)
+        output = io.BytesIO()
+        image.save(output, format=RENDITION_FORMAT, quality=RENDITION_QUALITY, method=4)
+        renditions[name] = output.getvalue()
+    return renditions
+
+
+def _resized(image, size):
+    scale = size / max(image.width, image.height)
+    return image.resize(
+        (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+        Image.LANCZOS,
+        reducing_gap=3.0
+    )
@@ -0,0 +1,169 @@
+import math
+import re
+
+# Outfit slots the recommendation prompt has to be able to fill
+OUTFIT_CATEGORIES = ["Top", "Bottom", "Footwear", "Outerwear"]
+
+# Words in the user prompt that imply attribute values the model writes for items
+QUERY_EXPANSIONS = {
+    # Occasions
+    "wedding": ["formal", "elegant", "dressy", "classic"],
+    "gala": ["formal", "elegant", "dressy"],
+    "interview": ["formal", "business", "professional", "classic"],
+    "office": ["business", "professional", "smart", "work"],
+    "work": ["business", "professional", "smart", "office"],
+    "meeting": ["business", "professional", "smart"],
+    "party": ["party", "evening", "dressy", "night"],
+    "date": ["evening", "smart", "dressy", "night"],
+    "dinner": ["evening", "smart", "dressy"],
+    "brunch": ["casual", "relaxed", "smart"],
+    "gym": ["sporty", "athletic", "athleisure", "workout"],
+    "workout": ["sporty", "athletic", "athleisure", "gym"],
+    "run": ["sporty", "athletic", "running"],
+    "hike": ["outdoor", "sporty", "hiking", "durable"],
+    "hiking": ["outdoor", "sporty", "durable"],
+    "beach": ["casual", "summer", "warm", "lightweight"],
+    "travel": ["casual", "comfortable", "relaxed"],
+    "weekend": ["casual", "relaxed"],
+    "school": ["casual", "everyday"],
+    # Weather
+    "cold": ["cold", "winter", "insulated", "warm", "wool"],
+    "winter": ["cold", "winter", "insulated", "wool"],
+    "snow": ["cold", "winter", "insulated", "water"],
+    "chilly": ["cold", "cool", "layering"],
+    "autumn": ["cool", "fall", "layering"],
+    "fall": ["cool", "autumn", "layering"],
+    "spring": ["mild", "transitional", "layering"],
+    "hot": ["warm", "summer", "breathable", "lightweight"],
+    "summer": ["warm", "summer", "breathable", "lightweight"],
+    "sunny": ["warm", "summer", "breathable"],
+    "humid": ["breathable", "lightweight", "moisture"],
+    "rain": ["water", "resistant", "waterproof", "rain"],
+    "rainy": ["water", "resistant", "waterproof", "rain"],
+    "windy": ["windproof", "layering", "outerwear"],
+}
+
+# How much a query term matching each item field counts towards the item's score
+FIELD_WEIGHTS = {
+    "occasion_suitability": 3.0,
+    "weather_appropriateness": 3.0,
+    "style": 2.0,
+    "type": 1.5,
+    "functional_features": 1.0,
+    "color": 1.0,
+    "material": 1.0,
+    "fabric_weight": 1.0,
+    "pattern": 0.5,
+    "key_design_elements": 0.5,
+}
+FAVORITE_BONUS = 0.5
+
+STOPWORDS = {
+    "a", "an", "and", "the", "for", "to", "of", "in", "on", "at", "with", "my", "me", "i",
+    "is", "it", "be", "what", "should", "wear", "outfit", "something", "some", "want", "need",
+    "today", "tomorrow", "tonight", "please", "going", "go", "like", "would", "can", "you",
+}
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens of a text (or of the str() of any other value).
+    """
+    return re.findall(r"[a-z]+", str(text).lower()) if text else []
+
+
+def estimate_tokens(text: str):
+    """
+    Rough prompt-token estimate (about 4 characters per token for English text).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def query_terms(user_prompt: str):
+    """
+    Extracts the terms items are scored against: the prompt's own words plus the
+    attribute words its occasions and weather imply.
+
+    Returns:
+        set: Query terms.
+    """
+    terms = {word for word in tokenize(user_prompt) if word not in STOPWORDS}
+    for word in list(terms):
+        terms.update(QUERY_EXPANSIONS.get(word, []))
+    return terms
+
+
+def score_item(item: dict, terms: set):
+    """
+    Scores an item by the weighted number of query terms found in its attributes.
+    """
+    score = FAVORITE_BONUS if item.get("favorite") else 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        score += weight * len(terms.intersection(tokenize(item.get(field))))
+    return score
+
+
+def select_candidates(items: list, user_prompt: str, per_category: int):
+    """
+    Keeps the per_category best-scoring processed items of each category, so every
+    outfit slot can still be filled while the prompt stops growing with the wardrobe.
+
+    Args:
+        items (list): Wardrobe items.
+        user_prompt (str): The user's request.
+        per_category (int): Items to keep per category.
+
+    Returns:
+        list: (score, item) pairs, grouped by category (outfit slots first) and best first.
+    """
+    terms = query_terms(user_prompt)
+    by_category = {}
+    for item in items:
+        if item.get("status", "processed") != "processed":
+            continue
+        by_category.setdefault(item.get("category", "Unknown"), []).append((score_item(item, terms), item))
+
+    categories = [c for c in OUTFIT_CATEGORIES if c in by_category] + [c for c in by_category if c not in OUTFIT_CATEGORIES]
+    candidates = []
+    for category in categories:
+        # Stable sort: ties keep wardrobe order
+        ranked = sorted(by_category[category], key=lambda pair: pair[0], reverse=True)
+        candidates.extend(ranked[:per_category])
+    return candidates
+
+
+def trim_to_token_budget(candidates: list, describe, max_tokens: int, min_per_category: int = 1):
+    """
+    Drops the lowest-scoring candidates, from whichever category has the most left,
+    until their descriptions fit the token budget or every category is down to
+    min_per_category items.
+
+    Args:
+        candidates (list): (score, item) pairs from select_candidates.
+        describe (callable): Returns the prompt description of an item.
+        max_tokens (int): Token budget for all descriptions together.
+        min_per_category (int): Items each category keeps regardless of the budget.
+
+    Returns:
+        list: The remaining (score, item) pairs, in the same order.
+    """
+    costs = [estimate_tokens(describe(item)) for _, item in candidates]
+    total = sum(costs)
+    kept = [True] * len(candidates)
+    while total > max_tokens:
+        counts = {}
+        for index, (_, item) in enumerate(candidates):
+            if kept[index]:
+                category = item.get("category", "Unknown")
+                counts[category] = counts.get(category, 0) + 1
+        category = max(counts, key=counts.get)
+        if counts[category] <= min_per_category:
+            break
+        # Lowest-scoring kept item of that category
+        index = min(
+            (i for i, (_, item) in enumerate(candidates) if kept[i] and item.get("category", "Unknown") == category),
+            key=lambda i: (candidates[i][0], -i)
+        )
+        kept[index] = False
+        total -= costs[index]
+    return [pair for pair, keep in zip(candidates, kept) if keep]
@@ -0,0 +1,173 @@
+import logging
+import re
+
+from parsing import AttributeSchema, JsonArrayElementStream, extract_json, normalize_key
+from retrieval import OUTFIT_CATEGORIES
+
+logger = logging.getLogger()
+
+ATTRIBUTE_KEYS = [
+    "category",
+    "type",
+    "brand",
+    "size",
+    "style",
+    "color",
+    "material",
+    "fitted_market_value",
+    "accent_colors",
+    "pattern",
+    "shape",
+    "fit",
+    "neckline",
+    "key_design_elements",
+    "occasion_suitability",
+    "weather_appropriateness",
+    "fabric_weight",
+    "functional_features",
+    "additional_notes"
+]
+
+# Attributes the wardrobe cannot do without: listing filters and outfit selection depend on them
+REQUIRED_ATTRIBUTE_KEYS = ["category", "type", "color", "style", "occasion_suitability", "weather_appropriateness"]
+
+# Keys the recognition model writes (after normalize_key), mapped to ATTRIBUTE_KEYS
+ATTRIBUTE_ALIASES = {
+    "type_of_clothing": "type",
+    "clothing_type": "type",
+    "item_type": "type",
+    "primary_color": "color",
+    "primary_colour": "color",
+    "main_color": "color",
+    "colour": "color",
+    "accent_color": "accent_colors",
+    "accent_colours": "accent_colors",
+    "fabric_material": "material",
+    "fabric": "material",
+    "materials": "material",
+    "brand_name": "brand",
+    "silhouette": "shape",
+    "design_elements": "key_design_elements",
+    "key_design_element": "key_design_elements",
+    "occasion": "occasion_suitability",
+    "occasions": "occasion_suitability",
+    "weather": "weather_appropriateness",
+    "season": "weather_appropriateness",
+    "weight": "fabric_weight",
+    "functional_feature": "functional_features",
+    "features": "functional_features",
+    "market_value": "fitted_market_value",
+    "estimated_value": "fitted_market_value",
+    "extra_notes": "additional_notes",
+    "notes": "additional_notes",
+}
+
+# What to ask for when a required attribute has to be requested again
+ATTRIBUTE_HINTS = {
+    "category": f"one of {', '.join(OUTFIT_CATEGORIES)}",
+    "type": "type of clothing, e.g. T-shirt, jeans, sneakers",
+    "color": "primary color",
+    "style": "e.g. streetwear, minimalist, athleisure, classic",
+    "occasion_suitability": "e.g. casual, formal, sporty",
+    "weather_appropriateness": "e.g. warm, cold, all-season",
+}
+
+ITEM_ATTRIBUTES = AttributeSchema(
+    ATTRIBUTE_KEYS,
+    required=REQUIRED_ATTRIBUTE_KEYS,
+    aliases=ATTRIBUTE_ALIASES,
+    choices={"category": OUTFIT_CATEGORIES}
+)
+
+
+def build_repair_prompt(missing: list):
+    """
+    Builds the instruction that asks the recognition model for only the missing attributes.
+
+    Args:
+        missing (list): Attribute keys to ask for.
+
+    Returns:
+        str: Prompt text, sent as the container's `prompt` custom attribute.
+    """
+    fields = ", ".join(f'"{key}" ({ATTRIBUTE_HINTS[key]})' if key in ATTRIBUTE_HINTS else f'"{key}"' for key in missing)
+    return f"Return only a flat JSON object with exactly these keys: {fields}. No other keys or text."
+
+
+# ------------------------ Recommendation output ------------------------
+def parse_item_number(value):
+    """
+    Parses an item number from an outfit: 37, "37" or "Item 37".
+
+    Returns:
+        int: The item number, or None if there is none.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = re.search(r"\d+", str(value))
+    return int(match.group()) if match else None
+
+
+def parse_rec_outfit(outfit: dict):
+    """
+    Validates one outfit object from the recommendation model. Keys are matched
+    case-insensitively ("Styling Tips", "styling_tips").
+
+    Args:
+        outfit (dict): Object with "Outfit", "Explanation" and "Styling Tips".
+
+    Returns:
+        dict: The outfit as {"outfit": [ids], "explanation": str, "styling": str}.
+
+    Raises:
+        ValueError: If a field is missing or has the wrong type.
+    """
+    if not isinstance(outfit, dict):
+        raise ValueError("Outfit is not a JSON object.")
+    fields = {normalize_key(key): value for key, value in outfit.items()}
+    outfit_ids = fields.get("outfit", fields.get("items"))
+    explanation = fields.get("explanation")
+    styling_tips = fields.get("styling_tips", fields.get("styling"))
+    if not isinstance(outfit_ids, list) or not isinstance(explanation, str) or not isinstance(styling_tips, str):
+        raise ValueError("Invalid response format from recommendation model.")
+    return {
+        "outfit": [number for number in map(parse_item_number, outfit_ids) if number is not None],
+        "explanation": explanation,
+        "styling": styling_tips
+    }
+
+
+def parse_rec_response(response_str: str):
+    """
+    Parses the raw model response string into outfits. Accepts {"outfits": [...]},
+    a bare list, or a single outfit object. Output that was cut off keeps its
+    complete outfits, and invalid outfits are skipped.
+
+    Args:
+        response_str (str): Raw text response from the recommendation model.
+
+    Returns:
+        list: Parsed outfits as dictionaries with 'outfit', 'explanation' and 'styling'.
+
+    Raises:
+        ValueError: If no valid outfit JSON is found.
+    """
+    try:
+        parsed = extract_json(response_str)
+    except ValueError:
+        # Fall back to whichever outfit objects are complete
+        parsed = [extract_json(text) for text in JsonArrayElementStream().feed(response_str)]
+
+    if isinstance(parsed, dict):
+        parsed = parsed.get("outfits", parsed.get("Outfits", [parsed]))
+    outfits = []
+    for outfit in parsed if isinstance(parsed, list) else []:
+        try:
+            outfits.append(parse_rec_outfit(outfit))
+        except ValueError as e:
+            logger.error(f"Skipping invalid outfit from model: {e}: {outfit}")
+    if not outfits:
+        raise ValueError("Invalid response format from recommendation model.")
+    return outfits
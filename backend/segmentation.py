@@ -0,0 +1,151 @@
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from PIL import Image, ImageOps
+from rembg import new_session, remove
+
+logger = logging.getLogger()
+
+# Supported background-removal models
+SEGMENTATION_MODELS = {
+    "u2netp": "Small and fast",
+    "u2net": "rembg default",
+    "isnet-general-use": "Highest quality, slowest",
+    "silueta": "u2net quality at a fraction of the size",
+}
+
+
+class SegmentationEngine:
+    """
+    Background-removal engine backed by a bounded pool of preloaded rembg sessions.
+
+    Each session is an ONNX Runtime model instance and serves one image at a time,
+    so the pool size caps how many uploads segment in parallel. Images larger than
+    max_side are segmented on a downscaled copy and the mask is upscaled back onto
+    the original pixels.
+    """
+
+    def __init__(self, model_name="u2net", pool_size=2, max_side=None, threads=None):
+        """
+        Args:
+            model_name (str): One of SEGMENTATION_MODELS.
+            pool_size (int): Number of sessions, i.e. concurrent segmentations.
+            max_side (int, optional): Longest side to segment at. No downscaling if None.
+            threads (int, optional): ONNX Runtime threads per session. Runtime default if None.
+        """
+        if model_name not in SEGMENTATION_MODELS:
+            raise ValueError(f"Unknown segmentation model '{model_name}'. Choose one of: {', '.join(SEGMENTATION_MODELS)}")
+        self.model_name = model_name
+        self.pool_size = pool_size
+        self.max_side = max_side
+        self.threads = threads
+        self._sessions = queue.Queue()
+        self._created = 0
+        self._create_lock = threading.Lock()
+        self._latencies = deque(maxlen=500)  # Seconds per image over the most recent images
+        self._count = 0
+        self._wait_time = 0.0
+        self._stats_lock = threading.Lock()
+
+    def warmup(self):
+        """
+        Loads every session in the pool and runs a dummy image through each,
+        so the first upload after a restart does not pay for model loading.
+        """
+        start = time.perf_counter()
+        sessions = []
+        while self._created < self.pool_size:
+            sessions.append(self._acquire())
+        dummy = Image.new("RGB", (64, 64))
+        for session in sessions:
+            remove(dummy, session=session)
+            self._sessions.put(session)
+        logger.info(
+            f"Loaded {self.pool_size} '{self.model_name}' segmentation sessions "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def remove_background_image(self, image_bytes: bytes):
+        """
+        Removes the background from an image. The cutout is returned decoded, so callers
+        that resize or re-encode it never decode a PNG again.
+
+        Args:
+            image_bytes (bytes | memoryview): Encoded input image.
+
+        Returns:
+            PIL.Image.Image: RGBA cutout.
+        """
+        img = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+
+        wait_start = time.perf_counter()
+        session = self._acquire()
+        start = time.perf_counter()
+        try:
+            if self.max_side and max(img.size) > self.max_side:
+                # Segment a downscaled copy and apply the upscaled mask to the full-size image
+                small = img.copy()
+                small.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+                mask = remove(small, session=session, only_mask=True)
+                cutout = img.convert("RGBA")
+                cutout.putalpha(mask.convert("L").resize(img.size, Image.LANCZOS))
+            else:
+                cutout = remove(img, session=session)
+        finally:
+            self._sessions.put(session)
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._count += 1
+            self._wait_time += start - wait_start
+            self._latencies.append(elapsed)
+        logger.info(f"Background removal took {elapsed * 1000:.0f} ms ({img.size[0]}x{img.size[1]})")
+        return cutout
+
+    def stats(self):
+        """
+        Returns per-image latency metrics over the most recent images.
+        """
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            count = self._count
+            wait_time = self._wait_time
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "model": self.model_name,
+            "pool_size": self.pool_size,
+            "sessions_loaded": self._created,
+            "images": count,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "mean_wait_ms": round(wait_time / count * 1000, 1) if count else None,
+        }
+
+    def _acquire(self):
+        # Lazily create sessions up to the pool size, then block until one is free
+        try:
+            return self._sessions.get_nowait()
+        except queue.Empty:
+            pass
+        with self._create_lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                return self._new_session()
+        return self._sessions.get()
+
+    def _new_session(self):
+        if self.threads:
+            # rembg reads the ONNX Runtime thread count from OMP_NUM_THREADS when building a session
+            os.environ["OMP_NUM_THREADS"] = str(self.threads)
+        return new_session(self.model_name)
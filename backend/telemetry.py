@@ -0,0 +1,13 @@
+from metrics import Registry
+
+# The backend's metrics, served at /metrics; metrics.py itself is shared with the recognition container
+registry = Registry("wardrobe")
+span = registry.span
+TRACE_HEADER = "X-Trace-Id"
+
+REQUESTS = registry.counter("http_requests_total", "HTTP requests by endpoint and status.", ("endpoint", "method", "status"))
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "HTTP request latency.", ("endpoint",))
+AWS_CALL_SECONDS = registry.histogram("aws_call_duration_seconds", "AWS API call latency, retries included.", ("service", "operation"))
+AWS_CALL_FAILURES = registry.counter("aws_call_failures_total", "AWS API calls that failed.", ("service", "operation"))
+MODEL_TOKENS = registry.counter("model_tokens_total", "Tokens sent to and generated by models.", ("model", "direction"))
+BYTES = registry.counter("bytes_total", "Bytes received, stored and sent to models.", ("kind",))
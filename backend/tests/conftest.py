@@ -0,0 +1,89 @@
+import importlib
+import os
+import sys
+import urllib.request
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = "wardrobe-test"
+REGION = "us-east-1"
+# Indexes the listing and delete endpoints query (see README "Notes")
+ITEM_INDEXES = {"category-index": "category", "status-index": "status", "s3_url-index": "s3_url"}
+
+# Backend modules are imported as top-level modules, as app.py does
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def moto_endpoint():
+    """
+    Local stand-in for DynamoDB and S3, reached over HTTP like DynamoDB Local or MinIO,
+    so presigned URLs can be used against it too.
+    """
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def backend(moto_endpoint):
+    """
+    The backend app module, configured against the stand-in with models kept unloaded.
+    """
+    os.environ.update({
+        "AWS_REGION": REGION,
+        "AWS_DEFAULT_REGION": REGION,
+        "AWS_ACCESS_KEY_ID": "test",
+        "AWS_SECRET_ACCESS_KEY": "test",
+        "S3_BUCKET": BUCKET,
+        "S3_ENDPOINT_URL": moto_endpoint,
+        "DYNAMODB_ENDPOINT_URL": moto_endpoint,
+        "REMBG_PRELOAD": "0",
+        "VECTOR_INDEX_DISK": "0",
+    })
+    return importlib.import_module("app")
+
+
+@pytest.fixture
+def aws(backend, moto_endpoint):
+    """
+    Empty clothing-items and outfits tables and upload bucket for one test, with the
+    app's wardrobe cache reloaded from them.
+    """
+    urllib.request.urlopen(urllib.request.Request(f"{moto_endpoint}/moto-api/reset", method="POST")).close()
+    dynamodb = boto3.resource("dynamodb", endpoint_url=moto_endpoint, region_name=REGION)
+    dynamodb.create_table(
+        TableName="clothing-items",
+        KeySchema=[{"AttributeName": "clothing-item-id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "clothing-item-id", "AttributeType": "S"}] + [
+            {"AttributeName": attribute, "AttributeType": "S"} for attribute in ITEM_INDEXES.values()
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": index_name,
+                "KeySchema": [{"AttributeName": attribute, "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+            for index_name, attribute in ITEM_INDEXES.items()
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="outfits",
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    boto3.client("s3", endpoint_url=moto_endpoint, region_name=REGION).create_bucket(Bucket=BUCKET)
+    backend.wardrobe_cache.refresh()
+    return dynamodb
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from changefeed import CHANGE_DELETE, CHANGE_UPSERT, ChangeLog
+
+
+def item(item_id, **fields):
+    return {"clothing-item-id": item_id, "id": item_id, "name": item_id, "status": "processed", **fields}
+
+
+def test_changes_since_returns_the_latest_change_per_item():
+    log = ChangeLog()
+    log.record(CHANGE_UPSERT, "a", item("a"))
+    cursor = log.version
+    log.record(CHANGE_UPSERT, "b", item("b"))
+    log.record(CHANGE_UPSERT, "b", item("b", color="Red"))
+    log.record(CHANGE_UPSERT, "c", item("c"))
+    log.record(CHANGE_DELETE, "c")
+    log.record(CHANGE_DELETE, "a")
+
+    upserted, deleted, new_cursor = log.changes_since(cursor)
+
+    assert upserted == [item("b", color="Red")]
+    assert sorted(deleted) == ["a", "c"]
+    assert new_cursor == log.version
+    assert log.changes_since(new_cursor) == ([], [], new_cursor)
+
+
+def test_versions_increase_monotonically():
+    log = ChangeLog()
+    versions = [log.record(CHANGE_UPSERT, str(index), item(str(index))) for index in range(100)]
+
+    assert versions == sorted(set(versions))
+
+
+def test_cursors_outside_the_log_need_a_resync():
+    log = ChangeLog(max_entries=3)
+    first = log.version
+    for index in range(5):
+        log.record(CHANGE_UPSERT, str(index), item(str(index)))
+
+    # Entries after `first` have been evicted, and cursors from the future are unknown
+    assert log.changes_since(first) is None
+    assert log.changes_since(log.version + 1) is None
+    assert log.changes_since(log.version - 1) is not None
+
+
+def test_wait_for_change_wakes_up_on_record():
+    log = ChangeLog()
+    cursor = log.version
+    threading.Timer(0.05, log.record, (CHANGE_UPSERT, "a", item("a"))).start()
+
+    start = time.monotonic()
+    assert log.wait_for_change(cursor, timeout=5)
+    assert time.monotonic() - start < 2
+    assert not log.wait_for_change(log.version, timeout=0.01)
+
+
+def test_list_since_returns_a_delta(backend, client, aws):
+    cursor = client.get("/list").get_json()["cursor"]
+    backend.record_item_upsert(item("item-01"))
+    backend.record_item_upsert(item("item-02"))
+    backend.record_item_delete("item-01")
+
+    response = client.get(f"/list?since={cursor}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["full"] is False
+    assert [file["id"] for file in body["files"]] == ["item-02"]
+    assert body["deleted"] == ["item-01"]
+    assert body["cursor"] == backend.change_log.version
+
+
+def test_list_since_an_evicted_cursor_is_a_full_listing(backend, client, aws, monkeypatch):
+    monkeypatch.setattr(backend, "change_log", ChangeLog(max_entries=2))
+    cursor = backend.change_log.version
+    for index in range(3):
+        backend.record_item_upsert(item(f"item-{index:02d}"))
+
+    body = client.get(f"/list?since={cursor}").get_json()
+
+    assert body["full"] is True
+    assert body["deleted"] == []
+    assert body["cursor"] == backend.change_log.version
+
+
+def test_list_long_poll_wakes_up_on_a_change(backend, client, aws):
+    cursor = client.get("/list").get_json()["cursor"]
+    threading.Timer(0.1, backend.record_item_upsert, (item("item-01"),)).start()
+
+    start = time.monotonic()
+    body = client.get(f"/list?since={cursor}&wait=10").get_json()
+
+    assert time.monotonic() - start < 5
+    assert body["full"] is False
+    assert [file["id"] for file in body["files"]] == ["item-01"]
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.fixture
+def item(backend, aws):
+    """
+    One processed item with its image in the upload bucket.
+    """
+    bucket = backend.os.getenv("S3_BUCKET")
+    backend.s3_client.put_object(Bucket=bucket, Key="user-uploads/item-01.png", Body=b"png")
+    s3_url = f"https://{bucket}.s3.amazonaws.com/user-uploads/item-01.png"
+    record = {"clothing-item-id": "item-01", "id": "item-01", "s3_url": s3_url, "status": "processed"}
+    aws.Table("clothing-items").put_item(Item=record)
+    backend.wardrobe_cache.refresh()
+    return record
+
+
+def test_delete_by_ids_reports_unknown_ids(backend, client, item):
+    response = client.post("/delete", json={"ids": ["item-01", "item-99"]})
+
+    assert response.status_code == 200
+    assert response.get_json()["deleted"] == ["item-01"]
+    assert response.get_json()["not_found"] == ["item-99"]
+    assert "Item" not in backend.clothing_items_table.get_item(Key={"clothing-item-id": "item-01"})
+
+
+@pytest.mark.parametrize("body", [
+    {"ids": "item-01"},
+    {"ids": 1},
+    {"urls": "https://example.com/a.png"},
+    {"ids": [None]},
+    {"ids": [["item-01"]]},
+    {"id": 5},
+    ["item-01"],
+    {},
+])
+def test_invalid_delete_returns_400(backend, client, item, body):
+    response = client.post("/delete", json=body)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert "Item" in backend.clothing_items_table.get_item(Key={"clothing-item-id": "item-01"})
@@ -0,0 +1,180 @@
+import io
+import json
+import os
+import time
+import urllib.request
+
+import pytest
+from PIL import Image
+
+ATTRIBUTES = {
+    "category": "Top", "type": "T-Shirt", "color": "Red", "style": "Casual",
+    "occasion_suitability": "Casual", "weather_appropriateness": "Warm",
+}
+
+
+class StreamingBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class RecognitionEndpoint:
+    """
+    Stands in for the SageMaker recognition endpoint: answers every image with ATTRIBUTES.
+    """
+
+    def invoke_endpoint(self, ContentType, Body, **kwargs):
+        text = json.dumps(ATTRIBUTES)
+        if ContentType.startswith("multipart/"):
+            body = {"generated_texts": [text] * Body.count(b'name="image"')}
+        else:
+            body = {"generated_text": text}
+        return {"Body": StreamingBody(json.dumps(body).encode("utf-8"))}
+
+
+@pytest.fixture
+def models(backend, monkeypatch):
+    """
+    Replaces background removal and the recognition endpoint, so upload jobs run without models.
+    """
+    monkeypatch.setattr(
+        backend.segmentation_engine, "remove_background_image",
+        lambda image_bytes: Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+    )
+    monkeypatch.setattr(backend, "sagemaker_client", RecognitionEndpoint())
+
+
+def png(color, size=(64, 48)):
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def put(url, data, headers=None):
+    request = urllib.request.Request(url, data=data, method="PUT", headers=headers or {})
+    with urllib.request.urlopen(request) as response:
+        return response.status, response.headers.get("ETag")
+
+
+def wait_for_job(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").get_json()
+        if job["status"] in ("processed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish: {job}")
+
+
+def test_init_put_complete_processes_the_upload(backend, client, aws, models):
+    image = png("red")
+    init = client.post("/upload/init", json={"files": [{"filename": "shirt.png", "size": len(image), "content_type": "image/png"}]})
+    assert init.status_code == 200
+    upload = init.get_json()["uploads"][0]
+    assert init.get_json()["items"][0]["status"] == "uploading"
+    assert upload["method"] == "PUT"
+
+    status, _ = put(upload["url"], image, upload["headers"])
+    assert status == 200
+
+    complete = client.post("/upload/complete", json={"uploads": [{"item_id": upload["item_id"]}]})
+    assert complete.status_code == 202
+    job = wait_for_job(client, complete.get_json()["jobs"][0]["job_id"])
+    assert job["status"] == "processed", job
+
+    item = backend.clothing_items_table.get_item(Key={"clothing-item-id": upload["item_id"]})["Item"]
+    assert item["status"] == "processed"
+    assert item["category"] == "Top"
+    assert set(item["renditions"]) == {"original", "thumb", "preview"}
+    # The raw upload is deleted once the processed image is stored
+    keys = [obj["Key"] for obj in backend.s3_client.list_objects_v2(Bucket=os.getenv("S3_BUCKET")).get("Contents", [])]
+    assert not any(key.startswith(backend.INCOMING_PREFIX) for key in keys)
+    assert backend.s3_key_from_url(item["s3_url"]) in keys
+
+    # A repeated complete cannot queue the job twice
+    repeated = client.post("/upload/complete", json={"uploads": [{"item_id": upload["item_id"]}]})
+    assert repeated.status_code == 400
+    assert repeated.get_json()["errors"][0]["item_id"] == upload["item_id"]
+
+
+def test_failed_processing_deletes_the_raw_upload(backend, client, aws, models, monkeypatch):
+    def remove_background_image(image_bytes):
+        raise RuntimeError("rembg failed")
+
+    monkeypatch.setattr(backend.segmentation_engine, "remove_background_image", remove_background_image)
+    image = png("green")
+    init = client.post("/upload/init", json={"files": [{"filename": "shirt.png", "size": len(image), "content_type": "image/png"}]})
+    upload = init.get_json()["uploads"][0]
+    put(upload["url"], image, upload["headers"])
+
+    complete = client.post("/upload/complete", json={"uploads": [{"item_id": upload["item_id"]}]})
+    assert wait_for_job(client, complete.get_json()["jobs"][0]["job_id"])["status"] == "failed"
+
+    item = backend.clothing_items_table.get_item(Key={"clothing-item-id": upload["item_id"]})["Item"]
+    assert item["status"] == "failed"
+    keys = [obj["Key"] for obj in backend.s3_client.list_objects_v2(Bucket=os.getenv("S3_BUCKET")).get("Contents", [])]
+    assert upload["key"] not in keys
+
+
+def test_multipart_upload_is_completed_and_processed(backend, client, aws, models, monkeypatch):
+    monkeypatch.setattr(backend, "MULTIPART_THRESHOLD", 1024)
+    image = png("blue", size=(400, 300))
+    init = client.post("/upload/init", json={"files": [{"filename": "coat.png", "size": len(image), "content_type": "image/png"}]})
+    upload = init.get_json()["uploads"][0]
+    assert upload["upload_id"]
+
+    parts = []
+    for part in upload["parts"]:
+        start = (part["part_number"] - 1) * upload["part_size"]
+        # An explicit type keeps urllib from sending the part as form data
+        _, etag = put(part["url"], image[start:start + upload["part_size"]], {"Content-Type": "application/octet-stream"})
+        parts.append({"part_number": part["part_number"], "etag": etag})
+
+    complete = client.post("/upload/complete", json={"uploads": [
+        {"item_id": upload["item_id"], "upload_id": upload["upload_id"], "parts": parts}
+    ]})
+    assert complete.status_code == 202
+    assert wait_for_job(client, complete.get_json()["jobs"][0]["job_id"])["status"] == "processed"
+
+
+def test_complete_without_upload_returns_400(client, aws, models):
+    init = client.post("/upload/init", json={"files": [{"filename": "shirt.png", "size": 100, "content_type": "image/png"}]})
+    item_id = init.get_json()["items"][0]["id"]
+
+    response = client.post("/upload/complete", json={"uploads": [{"item_id": item_id}]})
+
+    assert response.status_code == 400
+    assert response.get_json()["errors"][0]["item_id"] == item_id
+
+
+@pytest.mark.parametrize("files", [
+    [{"filename": "shirt.png", "size": 0, "content_type": "image/png"}],
+    [{"filename": "shirt.png", "size": "100", "content_type": "image/png"}],
+    [{"filename": "shirt.png", "size": True, "content_type": "image/png"}],
+    [{"filename": "notes.txt", "size": 100, "content_type": "text/plain"}],
+    ["shirt.png"],
+    "shirt.png",
+])
+def test_init_rejects_invalid_files(client, aws, files):
+    response = client.post("/upload/init", json={"files": files})
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_init_rejects_oversize_files(backend, client, aws):
+    response = client.post("/upload/init", json={"files": [
+        {"filename": "shirt.png", "size": backend.MAX_UPLOAD_SIZE + 1, "content_type": "image/png"}
+    ]})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("uploads", [["item-id"], [{"upload_id": "x"}], {"item_id": "item-id"}])
+def test_complete_rejects_invalid_uploads(client, aws, uploads):
+    response = client.post("/upload/complete", json={"uploads": uploads})
+
+    assert response.status_code == 400
@@ -0,0 +1,132 @@
+import pytest
+
+CATEGORIES = ["Top", "Bottom", "Footwear"]
+
+
+@pytest.fixture
+def wardrobe(aws):
+    """
+    Seeds 10 items: categories cycle Top/Bottom/Footwear, every fourth item is still processing.
+    """
+    items = [
+        {
+            "clothing-item-id": f"item-{index:02d}",
+            "id": f"item-{index:02d}",
+            "name": f"Clothing Piece {index}",
+            "s3_url": f"https://example.com/user-uploads/item-{index:02d}.png",
+            "category": CATEGORIES[index % 3],
+            "status": "processing" if index % 4 == 0 else "processed",
+            "color": "Navy",
+        }
+        for index in range(10)
+    ]
+    with aws.Table("clothing-items").batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    return items
+
+
+@pytest.fixture
+def recorded_reads(backend, monkeypatch):
+    """
+    Records the keyword arguments of every scan/query the listing makes.
+    """
+    calls = []
+    table = backend.clothing_items_table
+    for method in ("scan", "query"):
+        original = getattr(table, method)
+
+        def record(original=original, method=method, **kwargs):
+            calls.append((method, kwargs))
+            return original(**kwargs)
+
+        monkeypatch.setattr(table, method, record)
+    return calls
+
+
+def read_pages(client, query):
+    pages = []
+    next_token = None
+    while True:
+        url = f"/list?{query}" + (f"&next_token={next_token}" if next_token else "")
+        response = client.get(url)
+        assert response.status_code == 200, response.get_json()
+        pages.append(response.get_json())
+        next_token = pages[-1]["next_token"]
+        if next_token is None:
+            return pages
+
+
+def test_limit_and_next_token_page_through_every_item(client, wardrobe):
+    pages = read_pages(client, "limit=4")
+
+    assert [len(page["files"]) for page in pages] == [4, 4, 2]
+    ids = [item["id"] for page in pages for item in page["files"]]
+    assert sorted(ids) == sorted(item["id"] for item in wardrobe)
+    # Every page of one listing carries the cursor taken before its first page
+    assert len({page["cursor"] for page in pages}) == 1
+    assert all(page["full"] for page in pages)
+
+
+def test_limit_is_capped(backend, client, wardrobe, recorded_reads):
+    response = client.get(f"/list?limit={backend.MAX_PAGE_SIZE * 10}")
+
+    assert response.status_code == 200
+    assert len(response.get_json()["files"]) == len(wardrobe)
+    assert recorded_reads[0][1]["Limit"] == backend.MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize("query", ["next_token=not-a-token", "limit=0", "limit=abc", "fields=id,password"])
+def test_invalid_parameters_return_400(client, wardrobe, query):
+    response = client.get(f"/list?{query}")
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_fields_projects_attributes(client, wardrobe, recorded_reads):
+    response = client.get("/list?limit=3&fields=id,name")
+
+    assert response.status_code == 200
+    files = response.get_json()["files"]
+    assert len(files) == 3
+    assert all(set(item) == {"id", "name"} for item in files)
+    method, kwargs = recorded_reads[0]
+    assert method == "scan"
+    assert set(kwargs["ExpressionAttributeNames"].values()) == {"id", "name"}
+
+
+def test_fields_projects_cached_listing(client, wardrobe):
+    response = client.get("/list?fields=id,category")
+
+    assert response.status_code == 200
+    assert all(set(item) == {"id", "category"} for item in response.get_json()["files"])
+
+
+def test_category_filter_queries_category_index(client, wardrobe, recorded_reads):
+    pages = read_pages(client, "category=Top&limit=2")
+
+    ids = sorted(item["id"] for page in pages for item in page["files"])
+    assert ids == sorted(item["id"] for item in wardrobe if item["category"] == "Top")
+    assert {method for method, _ in recorded_reads} == {"query"}
+    assert {kwargs["IndexName"] for _, kwargs in recorded_reads} == {"category-index"}
+
+
+def test_status_filter_queries_status_index(client, wardrobe, recorded_reads):
+    pages = read_pages(client, "status=processing&limit=2")
+
+    ids = sorted(item["id"] for page in pages for item in page["files"])
+    assert ids == sorted(item["id"] for item in wardrobe if item["status"] == "processing")
+    assert {method for method, _ in recorded_reads} == {"query"}
+    assert {kwargs["IndexName"] for _, kwargs in recorded_reads} == {"status-index"}
+
+
+def test_category_and_status_filter_on_category_index(client, wardrobe, recorded_reads):
+    pages = read_pages(client, "category=Bottom&status=processed&limit=5")
+
+    ids = sorted(item["id"] for page in pages for item in page["files"])
+    assert ids == sorted(
+        item["id"] for item in wardrobe if item["category"] == "Bottom" and item["status"] == "processed"
+    )
+    assert recorded_reads[0][1]["IndexName"] == "category-index"
+    assert "FilterExpression" in recorded_reads[0][1]
@@ -0,0 +1,126 @@
+import itertools
+
+import pytest
+
+from outfit_engine import REQUIRED_SLOTS, SlotFeatures, _slot_candidates, generate_outfits
+from retrieval import query_terms
+
+
+def piece(item_id, category, item_type, color, occasion, weather, style):
+    return {
+        "clothing-item-id": item_id, "id": item_id, "status": "processed",
+        "s3_url": f"https://example.com/{item_id}.png", "category": category, "type": item_type,
+        "color": color, "occasion_suitability": occasion, "weather_appropriateness": weather, "style": style,
+    }
+
+
+WARDROBE = [
+    piece("shirt", "Top", "Dress Shirt", "White", "Formal, Business", "All seasons", "Classic"),
+    piece("tee", "Top", "T-Shirt", "Red", "Casual, Weekend", "Summer", "Casual"),
+    piece("hoodie", "Top", "Hoodie", "Green", "Sporty, Gym", "Cool", "Athleisure"),
+    piece("trousers", "Bottom", "Trousers", "Navy", "Formal, Business", "All seasons", "Classic"),
+    piece("jeans", "Bottom", "Jeans", "Denim", "Casual, Weekend", "Mild", "Casual"),
+    piece("joggers", "Bottom", "Joggers", "Grey", "Sporty, Gym", "Cool", "Athleisure"),
+    piece("oxfords", "Footwear", "Oxford Shoes", "Black", "Formal, Business", "All seasons", "Classic"),
+    piece("sneakers", "Footwear", "Sneakers", "White", "Casual, Weekend", "Summer", "Casual"),
+    piece("trainers", "Footwear", "Running Trainers", "Grey", "Sporty, Gym", "Mild", "Athleisure"),
+    piece("coat", "Outerwear", "Wool Coat", "Charcoal", "Formal, Business", "Winter", "Classic"),
+]
+
+
+def ids(outfit):
+    return [item["id"] for item in outfit]
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("formal business meeting", ["shirt", "trousers", "oxfords"]),
+    ("casual weekend", ["tee", "jeans", "sneakers"]),
+    ("gym workout", ["hoodie", "joggers", "trainers"]),
+])
+def test_top_outfit_matches_the_prompt(prompt, expected):
+    [(_, outfit)] = generate_outfits(WARDROBE, prompt, outerwear=False)
+
+    assert ids(outfit) == expected
+
+
+def test_vectorized_scores_match_a_brute_force_sum():
+    terms = query_terms("casual weekend")
+    top, bottom, footwear = (SlotFeatures(_slot_candidates(WARDROBE, terms, slot, 15)) for slot in REQUIRED_SLOTS)
+    expected = {
+        (ids(top.items)[t], ids(bottom.items)[b], ids(footwear.items)[f]):
+            top.scores[t] + bottom.scores[b] + footwear.scores[f]
+            + top.compatibility(bottom)[t, b] + top.compatibility(footwear)[t, f] + bottom.compatibility(footwear)[b, f]
+        for t, b, f in itertools.product(range(3), repeat=3)
+    }
+
+    outfits = generate_outfits(WARDROBE, "casual weekend", count=27, outerwear=False)
+
+    assert outfits[0][0] == pytest.approx(max(expected.values()), rel=1e-5)
+    for score, outfit in outfits:
+        assert score == pytest.approx(expected[tuple(ids(outfit))], rel=1e-5)
+    assert [score for score, _ in outfits] == sorted((score for score, _ in outfits), reverse=True)
+
+
+def test_outfits_share_at_most_one_item():
+    outfits = generate_outfits(WARDROBE, "casual weekend", count=10, outerwear=False)
+
+    assert len(outfits) > 1
+    for (_, first), (_, second) in itertools.combinations(outfits, 2):
+        assert len(set(ids(first)) & set(ids(second))) <= 1
+
+
+def test_cold_weather_adds_outerwear():
+    [(_, outfit)] = generate_outfits(WARDROBE, "formal winter dinner")
+
+    assert len(outfit) == 4
+    assert outfit[-1]["id"] == "coat"
+
+
+def test_empty_slot_gives_no_outfits():
+    assert generate_outfits([item for item in WARDROBE if item["category"] != "Footwear"], "casual") == []
+
+
+@pytest.fixture
+def wardrobe(backend, aws):
+    for item in WARDROBE:
+        backend.wardrobe_cache.put(item)
+    return WARDROBE
+
+
+def test_recommend_fast_mode_uses_the_outfit_engine(backend, client, wardrobe, monkeypatch):
+    def invoke_model(**kwargs):
+        raise AssertionError("fast mode must not call Bedrock")
+
+    monkeypatch.setattr(backend.bedrock_runtime, "invoke_model", invoke_model)
+
+    response = client.post("/recommend", json={"user_prompt": "formal business meeting", "mode": "fast", "count": 2})
+
+    assert response.status_code == 200
+    outfits = response.get_json()["outfits"]
+    assert len(outfits) == 2
+    assert outfits[0]["outfit"] == [f"https://example.com/{item_id}.png" for item_id in ("shirt", "trousers", "oxfords")]
+    assert all(outfit["source"] == "rules" and outfit["explanation"] for outfit in outfits)
+
+
+def test_recommend_falls_back_to_rules_when_bedrock_fails(backend, client, wardrobe, monkeypatch):
+    def invoke_model(**kwargs):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(backend.bedrock_runtime, "invoke_model", invoke_model)
+
+    response = client.post("/recommend", json={"user_prompt": "casual weekend"})
+
+    assert response.status_code == 200
+    assert response.get_json()["source"] == "rules"
+    assert response.get_json()["outfit"][0] == "https://example.com/tee.png"
+
+
+def test_recommend_fast_mode_without_footwear_returns_400(backend, client, wardrobe):
+    for item in WARDROBE:
+        if item["category"] == "Footwear":
+            backend.wardrobe_cache.remove(item["id"])
+
+    response = client.post("/recommend", json={"mode": "fast"})
+
+    assert response.status_code == 400
+    assert "footwear" in response.get_json()["error"]
@@ -0,0 +1,39 @@
+import pytest
+
+from parsing import extract_json
+from schemas import ITEM_ATTRIBUTES
+
+ATTRIBUTES = '{"category": "Top", "type": "T-Shirt", "color": "Red"}'
+
+
+@pytest.mark.parametrize("text", [
+    ATTRIBUTES,
+    f"```json\n{ATTRIBUTES}\n```",
+    f"Here is the item [front view]: {ATTRIBUTES}",
+    f"Attributes [1]: {ATTRIBUTES} [done]",
+    f"Brackets {{like this}} come first: {ATTRIBUTES}",
+])
+def test_extract_json_finds_the_object(text):
+    assert extract_json(text, dict) == {"category": "Top", "type": "T-Shirt", "color": "Red"}
+
+
+def test_extract_json_skips_brackets_that_are_not_json():
+    assert extract_json("Outfits [see below]: [{\"outfit\": [1, 2]}]") == [{"outfit": [1, 2]}]
+
+
+def test_extract_json_repairs_trailing_commas_and_truncation():
+    assert extract_json('{"category": "Top", "type": "Shirt",}') == {"category": "Top", "type": "Shirt"}
+    assert extract_json('{"category": "Top", "type": "Shi') == {"category": "Top", "type": "Shi"}
+
+
+@pytest.mark.parametrize("text", ["no json here", "[front view] and {not json}"])
+def test_extract_json_raises_without_json(text):
+    with pytest.raises(ValueError):
+        extract_json(text)
+
+
+def test_attribute_schema_parses_past_leading_brackets():
+    attributes, _ = ITEM_ATTRIBUTES.parse(f"Here is the item [front view]: {ATTRIBUTES}")
+
+    assert attributes["category"] == "Top"
+    assert attributes["color"] == "Red"
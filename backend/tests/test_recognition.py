@@ -0,0 +1,51 @@
+import json
+
+
+class EventStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield {"PayloadPart": {"Bytes": chunk.encode("utf-8")}}
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingEndpoint:
+    """
+    Stands in for the SageMaker recognition endpoint's response stream and records each call.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def invoke_endpoint_with_response_stream(self, **kwargs):
+        self.calls.append(kwargs)
+        self.stream = EventStream(self.chunks)
+        return {"Body": self.stream, "ResponseMetadata": {"RequestId": "request-1"}}
+
+
+def stage_count(backend, stage):
+    lines = backend.registry.render().splitlines()
+    prefix = f'{backend.registry.stage_seconds.name}_count{{stage="{stage}"}} '
+    return next((int(line[len(prefix):]) for line in lines if line.startswith(prefix)), 0)
+
+
+def test_streamed_recognition_is_traced_and_timed(backend, monkeypatch):
+    attributes = {"category": "Top", "type": "T-Shirt", "color": "Red"}
+    text = json.dumps(attributes)
+    endpoint = StreamingEndpoint([text[:10], text[10:], " and more text the model kept generating"])
+    monkeypatch.setattr(backend, "sagemaker_client", endpoint)
+    invokes, parses = stage_count(backend, "recognition_invoke"), stage_count(backend, "recognition_parse")
+
+    result = backend.run_recognition_stream(b"jpeg", "trace-a")
+
+    assert {key: result[key] for key in attributes} == attributes
+    assert backend.parse_container_attributes(endpoint.calls[0]["CustomAttributes"]) == {"stream": "1", "trace_id": "trace-a"}
+    assert endpoint.stream.closed
+    assert stage_count(backend, "recognition_invoke") == invokes + 1
+    assert stage_count(backend, "recognition_parse") == parses + 1
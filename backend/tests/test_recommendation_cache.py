@@ -0,0 +1,129 @@
+import io
+import json
+
+import pytest
+
+from recommendation_cache import RecommendationCache, normalize_prompt
+
+
+@pytest.mark.parametrize("prompt", ["Outfit for a wedding!", "outfit for a  wedding", "  OUTFIT, for a wedding.  "])
+def test_normalize_prompt_ignores_case_punctuation_and_spacing(prompt):
+    assert normalize_prompt(prompt) == "outfit for a wedding"
+
+
+def test_normalize_prompt_keeps_different_requests_apart():
+    assert normalize_prompt("summer wedding") != normalize_prompt("winter wedding")
+    assert normalize_prompt(None) == normalize_prompt("") == ""
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("recommendation_cache.time.monotonic", lambda: now[0])
+    cache = RecommendationCache(ttl_seconds=60)
+    cache.put("key", {"outfit": []}, elapsed=2.0)
+
+    now[0] += 59
+    assert cache.get("key") == {"outfit": []}
+    now[0] += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["latency_saved_ms"] == 2000.0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RecommendationCache(max_entries=2)
+    cache.put("a", 1, elapsed=0)
+    cache.put("b", 2, elapsed=0)
+    cache.get("a")
+    cache.put("c", 3, elapsed=0)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_clear_drops_every_entry():
+    cache = RecommendationCache()
+    cache.clear()
+    cache.put("a", 1, elapsed=0)
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+WARDROBE = [
+    {"clothing-item-id": item_id, "id": item_id, "status": "processed", "category": category,
+     "s3_url": f"https://example.com/{item_id}.png", "type": item_id, "color": "Black"}
+    for item_id, category in (("shirt", "Top"), ("trousers", "Bottom"), ("shoes", "Footwear"))
+]
+
+
+class Bedrock:
+    """
+    Stands in for Bedrock: every call answers one outfit whose explanation numbers the call.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        text = json.dumps({"Outfit": [0, 1, 2], "Explanation": f"call {self.calls}", "Styling Tips": "Tuck it in."})
+        body = {"content": [{"text": text}], "usage": {"input_tokens": 10, "output_tokens": 20}}
+        return {"body": io.BytesIO(json.dumps(body).encode("utf-8"))}
+
+
+@pytest.fixture
+def bedrock(backend, aws, monkeypatch):
+    for item in WARDROBE:
+        backend.wardrobe_cache.put(item)
+    monkeypatch.setattr(backend, "recommendation_cache", RecommendationCache())
+    stub = Bedrock()
+    monkeypatch.setattr(backend, "bedrock_runtime", stub)
+    return stub
+
+
+def recommend(client, **body):
+    response = client.post("/recommend", json=body)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["explanation"]
+
+
+def test_equivalent_prompts_share_a_cache_entry(backend, client, bedrock):
+    assert recommend(client, user_prompt="Outfit for a wedding!") == "call 1"
+    assert recommend(client, user_prompt="outfit for a  wedding") == "call 1"
+    assert recommend(client, user_prompt="outfit for a funeral") == "call 2"
+    assert bedrock.calls == 2
+    assert backend.recommendation_cache.stats()["hits"] == 1
+
+
+def test_regenerate_bypasses_and_overwrites_the_entry(backend, client, bedrock):
+    assert recommend(client, user_prompt="wedding") == "call 1"
+    assert recommend(client, user_prompt="wedding", regenerate=True) == "call 2"
+    # Later requests get the regenerated answer
+    assert recommend(client, user_prompt="wedding") == "call 2"
+    assert bedrock.calls == 2
+    assert backend.recommendation_cache.stats()["bypasses"] == 1
+
+
+def test_item_changes_invalidate_cached_outfits(backend, client, bedrock):
+    assert recommend(client, user_prompt="wedding") == "call 1"
+
+    backend.record_item_upsert({**WARDROBE[0], "color": "White"})
+    assert recommend(client, user_prompt="wedding") == "call 2"
+
+    backend.record_item_delete("shoes")
+    backend.record_item_upsert(WARDROBE[2])
+    assert recommend(client, user_prompt="wedding") == "call 3"
+    assert backend.recommendation_cache.stats()["invalidations"] == 2
+
+
+def test_count_is_part_of_the_key(client, bedrock):
+    recommend(client, user_prompt="wedding")
+    response = client.post("/recommend", json={"user_prompt": "wedding", "count": 2})
+
+    assert response.status_code == 200
+    assert bedrock.calls == 2
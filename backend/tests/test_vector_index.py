@@ -0,0 +1,98 @@
+import numpy as np
+
+from vector_index import HashingEmbedder, VectorIndex
+
+TEXTS = {
+    "shirt": "Top red cotton t-shirt casual summer",
+    "coat": "Outerwear navy wool coat formal winter",
+    "boots": "Footwear brown leather boots casual winter",
+}
+
+
+class CountingEmbedder(HashingEmbedder):
+    """
+    Hashing embedder that records how many texts it embedded.
+    """
+
+    def __init__(self, dim=64):
+        super().__init__(dim)
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+def test_search_ranks_by_similarity_and_respects_filters():
+    index = VectorIndex(CountingEmbedder())
+    index.upsert_many(TEXTS)
+
+    results = index.search("navy wool winter coat", k=2)
+
+    assert [item_id for item_id, _ in results][0] == "coat"
+    assert len(results) == 2
+    assert results[0][1] >= results[1][1]
+    assert [item_id for item_id, _ in index.search("winter", k=3, include={"boots", "shirt"})][0] == "boots"
+    assert "coat" not in [item_id for item_id, _ in index.search("winter coat", k=3, exclude={"coat"})]
+    assert sorted(dict(index.similar("boots", k=3))) == ["coat", "shirt"]
+    assert index.similar("missing") is None
+
+
+def test_upsert_skips_unchanged_texts_and_remove_frees_rows():
+    embedder = CountingEmbedder()
+    index = VectorIndex(embedder)
+    assert index.upsert_many(TEXTS) == 3
+    assert index.upsert_many(TEXTS) == 0
+    assert embedder.embedded == 3
+
+    index.upsert("shirt", "Top green linen shirt")
+    assert embedder.embedded == 4
+    assert index.search("green linen", k=1)[0][0] == "shirt"
+
+    index.remove("coat")
+    index.remove("coat")
+    assert len(index) == 2
+    assert "coat" not in dict(index.search("navy wool coat", k=3))
+
+    # The freed row is reused
+    index.upsert("scarf", "Accessory grey wool scarf")
+    assert index.stats()["items"] == 3
+    assert len(index._ids) == 3
+
+
+def test_sync_drops_stale_items_and_skips_a_current_version():
+    embedder = CountingEmbedder()
+    index = VectorIndex(embedder)
+    index.sync(TEXTS, version=1)
+
+    index.sync({"shirt": TEXTS["shirt"], "hat": "Accessory black wool hat"}, version=2)
+    assert embedder.embedded == 4  # Only the new text
+    assert sorted(dict(index.search("wool", k=10))) == ["hat", "shirt"]
+
+    index.sync({}, version=2)
+    assert len(index) == 2
+
+
+def test_reload_from_disk_keeps_vectors_without_re_embedding(tmp_path):
+    index = VectorIndex(CountingEmbedder(), path=str(tmp_path))
+    index.upsert_many(TEXTS)
+    index.remove("coat")
+    expected = index.search("casual winter boots", k=3)
+
+    embedder = CountingEmbedder()
+    reloaded = VectorIndex(embedder, path=str(tmp_path))
+
+    assert len(reloaded) == 2
+    assert isinstance(reloaded._matrix, np.memmap)
+    assert reloaded.search("casual winter boots", k=3) == expected
+    assert reloaded.upsert_many({"shirt": TEXTS["shirt"], "boots": TEXTS["boots"]}) == 0
+    assert embedder.embedded == 1  # Only the query
+
+
+def test_reload_with_another_embedder_rebuilds(tmp_path):
+    VectorIndex(CountingEmbedder(dim=64), path=str(tmp_path)).upsert_many(TEXTS)
+
+    reloaded = VectorIndex(CountingEmbedder(dim=32), path=str(tmp_path))
+
+    assert len(reloaded) == 0
+    assert reloaded.upsert_many(TEXTS) == 3
@@ -0,0 +1,114 @@
+import pytest
+
+from wardrobe_cache import WardrobeCache
+
+
+def item(item_id, category="Top", **fields):
+    return {"clothing-item-id": item_id, "s3_url": f"https://example.com/{item_id}.png", "category": category, **fields}
+
+
+class Table:
+    """
+    Stands in for the clothing-items scan. During a scan it can run writes, as a
+    concurrent request would, to check they survive the reload.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.scans = 0
+        self.during_scan = None
+
+    def scan(self):
+        self.scans += 1
+        snapshot = list(self.items)
+        if self.during_scan:
+            self.during_scan()
+        return snapshot
+
+
+def test_writes_during_a_reload_are_replayed():
+    table = Table([item("a"), item("b")])
+    cache = WardrobeCache(table.scan)
+    cache.refresh()
+
+    def concurrent_writes():
+        cache.put(item("c", category="Bottom"))
+        cache.put(item("a", category="Footwear"))
+        cache.remove("b")
+
+    table.during_scan = concurrent_writes
+    cache.refresh()
+
+    assert sorted(entry["clothing-item-id"] for entry in cache.items()) == ["a", "c"]
+    assert cache.get("a")["category"] == "Footwear"
+    assert cache.get("b") is None
+    assert cache.items("Top") == []
+    assert [entry["clothing-item-id"] for entry in cache.items("Footwear")] == ["a"]
+    assert cache.get_by_url("https://example.com/b.png") is None
+
+
+def test_failed_reload_keeps_the_items_and_stops_recording_writes():
+    table = Table([item("a")])
+    cache = WardrobeCache(table.scan)
+    cache.refresh()
+
+    def fail():
+        raise RuntimeError("throttled")
+
+    cache.loader = fail
+    with pytest.raises(RuntimeError):
+        cache.refresh()
+    cache.put(item("b"))
+    assert sorted(entry["clothing-item-id"] for entry in cache.items()) == ["a", "b"]
+
+    # The write was made outside a reload, so the next reload does not replay it
+    cache.loader = table.scan
+    cache.refresh()
+    assert [entry["clothing-item-id"] for entry in cache.items()] == ["a"]
+
+
+def test_count_is_maintained_without_reloading():
+    table = Table([item("a"), item("b")])
+    cache = WardrobeCache(table.scan, ttl_seconds=0)
+
+    # A cache that was never loaded is filled first
+    assert cache.count() == 2
+    assert table.scans == 1
+
+    cache.put(item("c"))
+    cache.put(item("a", category="Bottom"))
+    cache.remove("b")
+    cache.remove("missing")
+
+    # The TTL has expired, but the count is kept by the writes
+    assert cache.count() == 2
+    assert table.scans == 1
+
+
+def test_reads_reload_after_the_ttl(monkeypatch):
+    table = Table([item("a")])
+    cache = WardrobeCache(table.scan, ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr("wardrobe_cache.time.monotonic", lambda: now[0])
+
+    cache.get("a")
+    cache.get("a")
+    table.items.append(item("b"))
+    assert cache.get("b") is None
+
+    now[0] += 61
+    assert cache.get("b") is not None
+    assert table.scans == 2
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["hits"] == 2
+
+
+def test_put_moves_an_item_between_indexes():
+    cache = WardrobeCache(Table([item("a")]).scan)
+    cache.refresh()
+
+    cache.put(item("a", category="Bottom", s3_url="https://example.com/a-v2.png"))
+
+    assert cache.get_by_url("https://example.com/a.png") is None
+    assert cache.get_by_url("https://example.com/a-v2.png")["category"] == "Bottom"
+    assert cache.items("Top") == []
@@ -0,0 +1,342 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger()
+
+DEFAULT_DIM = 512
+INITIAL_CAPACITY = 1024
+
+
+class HashingEmbedder:
+    """
+    Deterministic offline embedder: word unigrams and bigrams are hashed into signed
+    buckets (the hashing trick) and the vector is L2-normalized. Texts that share
+    attribute words end up with a high cosine similarity.
+    """
+
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: list):
+        """
+        Embeds texts.
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32 matrix of unit vectors.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z0-9]+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class SentenceTransformerEmbedder:
+    """
+    Embedder backed by a local sentence-transformers model (e.g. all-MiniLM-L6-v2), run on CPU.
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = os.path.basename(model_name.rstrip("/"))
+
+    def embed(self, texts: list):
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def create_embedder(model_name=None, dim=DEFAULT_DIM):
+    """
+    Returns the sentence-transformers embedder for model_name, or the hashing embedder
+    if no model is configured or it cannot be loaded (package missing, no local files).
+    """
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            logger.warning(f"Could not load embedding model '{model_name}' ({e}), using the hashing embedder")
+    return HashingEmbedder(dim)
+
+
+class VectorIndex:
+    """
+    In-process vector index over wardrobe items.
+
+    Vectors are rows of one float32 matrix, so a query is a single matrix product and
+    top-K is an argpartition over the scores. Removed rows are reused by later adds.
+    When path is set the matrix is a memory-mapped file (vectors.f32) next to an
+    index.json holding the row ids, so a restart only re-embeds items that changed.
+    """
+
+    def __init__(self, embedder, path=None):
+        """
+        Args:
+            embedder: HashingEmbedder or SentenceTransformerEmbedder.
+            path (str, optional): Directory to persist the index in. In memory only if None.
+        """
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.path = path
+        self.synced_version = None  # Wardrobe version the index was last synced with
+        self._ids = []  # key: row, value: item id (None for a free row)
+        self._rows = {}  # key: item id, value: row
+        self._digests = {}  # key: item id, value: hash of the embedded text
+        self._free = []
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._lock = threading.RLock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ---------------- Writes ----------------
+    def upsert(self, item_id: str, text: str):
+        """
+        Embeds and stores an item's text, unless the same text is already indexed.
+        """
+        self.upsert_many({item_id: text})
+
+    def upsert_many(self, texts: dict):
+        """
+        Embeds and stores several items in one batch, skipping unchanged texts.
+
+        Args:
+            texts (dict): key: item id, value: text to embed.
+
+        Returns:
+            int: Number of items embedded.
+        """
+        changed, vectors = self._embed_changed(texts)
+        if not changed:
+            return 0
+        with self._lock:
+            self._store(changed, vectors)
+            self._save()
+        return len(changed)
+
+    def remove(self, item_id: str):
+        """
+        Drops an item from the index (no-op if it is not indexed).
+        """
+        with self._lock:
+            if self._drop(item_id):
+                self._save()
+
+    def sync(self, texts: dict, version=None):
+        """
+        Makes the index match a full set of items: removes ids that are gone and embeds
+        new or changed texts, then writes index.json once. Skipped if the index was
+        already synced with this version.
+
+        Args:
+            texts (dict): key: item id, value: text to embed, for every item that should be indexed.
+            version (optional): Version of the source data, e.g. the wardrobe cache reload count.
+        """
+        if version is not None and version == self.synced_version:
+            return
+        changed, vectors = self._embed_changed(texts)
+        with self._lock:
+            stale = [item_id for item_id in self._rows if item_id not in texts]
+            for item_id in stale:
+                self._drop(item_id)
+            self._store(changed, vectors)
+            if stale or changed:
+                self._save()
+        self.synced_version = version
+        logger.info(f"Vector index synced: {len(self)} items, {len(changed)} embedded, {len(stale)} removed")
+
+    # ---------------- Queries ----------------
+    def search(self, text: str, k: int = 10, include: set = None, exclude: set = None):
+        """
+        Returns the items most similar to a free-text query.
+
+        Args:
+            text (str): Query text.
+            k (int): Number of results.
+            include (set, optional): Only consider these item ids.
+            exclude (set, optional): Never return these item ids.
+
+        Returns:
+            list: (item id, cosine similarity) pairs, best first.
+        """
+        return self.search_many(self.embedder.embed([text]), k, include, exclude)[0]
+
+    def similar(self, item_id: str, k: int = 10, include: set = None):
+        """
+        Returns the items most similar to an indexed item, excluding the item itself.
+
+        Returns:
+            list: (item id, cosine similarity) pairs, or None if the item is not indexed.
+        """
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                return None
+            vector = np.array(self._matrix[row:row + 1])
+        return self.search_many(vector, k, include, exclude={item_id})[0]
+
+    def search_many(self, vectors: np.ndarray, k: int = 10, include: set = None, exclude: set = None):
+        """
+        Batched cosine top-K for unit query vectors.
+
+        Args:
+            vectors (np.ndarray): (n, dim) query matrix.
+
+        Returns:
+            list: One list of (item id, cosine similarity) pairs per query.
+        """
+        with self._lock:
+            rows = len(self._ids)
+            if not self._rows or k <= 0:
+                return [[] for _ in range(len(vectors))]
+            scores = vectors @ self._matrix[:rows].T
+            ids = list(self._ids)
+
+        valid = np.array([
+            item_id is not None
+            and (include is None or item_id in include)
+            and (exclude is None or item_id not in exclude)
+            for item_id in ids
+        ])
+        count = min(k, int(valid.sum()))
+        if count == 0:
+            return [[] for _ in range(len(vectors))]
+        scores[:, ~valid] = -np.inf
+
+        results = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, count - 1)[:count]
+            top = top[np.argsort(-row_scores[top])]
+            results.append([(ids[row], float(row_scores[row])) for row in top])
+        return results
+
+    def stats(self):
+        """
+        Returns the embedder name, dimension and index size.
+        """
+        with self._lock:
+            return {
+                "embedder": self.embedder.name,
+                "dim": self.dim,
+                "items": len(self._rows),
+                "capacity": len(self._matrix),
+                "persistent": self.path is not None,
+            }
+
+    # ---------------- Storage ----------------
+    @staticmethod
+    def _digest(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _embed_changed(self, texts):
+        # Embedding runs outside the lock, so queries are not blocked by it
+        with self._lock:
+            changed = {
+                item_id: text for item_id, text in texts.items()
+                if self._digests.get(item_id) != self._digest(text)
+            }
+        if not changed:
+            return changed, np.zeros((0, self.dim), dtype=np.float32)
+        return changed, self.embedder.embed(list(changed.values()))
+
+    def _store(self, changed, vectors):
+        for (item_id, text), vector in zip(changed.items(), vectors):
+            row = self._rows.get(item_id)
+            if row is None:
+                row = self._allocate_row()
+                self._ids[row] = item_id
+                self._rows[item_id] = row
+            self._matrix[row] = vector
+            self._digests[item_id] = self._digest(text)
+
+    def _drop(self, item_id):
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return False
+        self._digests.pop(item_id, None)
+        self._ids[row] = None
+        self._matrix[row] = 0.0
+        self._free.append(row)
+        return True
+
+    def _allocate_row(self):
+        if self._free:
+            return self._free.pop()
+        if len(self._ids) == len(self._matrix):
+            self._grow(max(INITIAL_CAPACITY, len(self._matrix) * 2))
+        self._ids.append(None)
+        return len(self._ids) - 1
+
+    def _grow(self, capacity):
+        if not self.path:
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:len(self._matrix)] = self._matrix
+            self._matrix = matrix
+            return
+        # Copy into a larger file and swap it in atomically
+        tmp_path = self._vectors_path() + ".tmp"
+        matrix = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        matrix[:len(self._matrix)] = self._matrix
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, self._vectors_path())
+        self._matrix = np.memmap(self._vectors_path(), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _vectors_path(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    def _meta_path(self):
+        return os.path.join(self.path, "index.json")
+
+    def _load(self):
+        try:
+            with open(self._meta_path()) as f:
+                meta = json.load(f)
+            capacity = meta["capacity"]
+            if meta["embedder"] != self.embedder.name or meta["dim"] != self.dim:
+                logger.info(f"Vector index at {self.path} was built with {meta['embedder']}, rebuilding")
+                return
+            if os.path.getsize(self._vectors_path()) != capacity * self.dim * 4:
+                raise ValueError("vector file size does not match the index")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable vector index at {self.path}: {e}")
+            return
+
+        self._matrix = np.memmap(self._vectors_path(), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._ids = meta["ids"]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids) if item_id is not None}
+        self._digests = meta["digests"]
+        self._free = [row for row, item_id in enumerate(self._ids) if item_id is None]
+        logger.info(f"Loaded vector index with {len(self._rows)} items from {self.path}")
+
+    def _save(self):
+        if not self.path:
+            return
+        self._matrix.flush()
+        meta = {
+            "embedder": self.embedder.name,
+            "dim": self.dim,
+            "capacity": len(self._matrix),
+            "ids": self._ids,
+            "digests": self._digests,
+        }
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
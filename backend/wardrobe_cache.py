@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger()
+
+
+def item_key(item: dict):
+    """
+    Returns the id of a clothing item record.
+    """
+    return item.get("clothing-item-id") or item.get("id")
+
+
+class WardrobeCache:
+    """
+    Process-local copy of the clothing-items table.
+
+    Items are stored by id with secondary indexes by s3_url and category. Mutation
+    endpoints write through with put()/remove(), and the whole table is reloaded
+    from DynamoDB once the TTL expires. Reads served from memory count as hits,
+    reads that had to reload the table count as misses.
+    """
+
+    def __init__(self, loader, ttl_seconds=300):
+        """
+        Args:
+            loader (callable): Returns every item in the table (a full DynamoDB scan).
+            ttl_seconds (float): Seconds before the cache is reloaded from DynamoDB.
+        """
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._items = {}  # key: item id, value: item dict
+        self._by_url = {}  # key: s3_url, value: item id
+        self._by_category = defaultdict(set)  # key: category, value: set of item ids
+        self._loaded_at = None
+        self._pending = None  # Writes made while a reload is in flight
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()  # One reload at a time
+
+    # ---------------- Reads ----------------
+    def get(self, item_id: str):
+        """
+        Returns the cached item with the given id, or None.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            return self._items.get(item_id)
+
+    def get_by_url(self, s3_url: str):
+        """
+        Returns the cached item stored at the given S3 URL, or None.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            item_id = self._by_url.get(s3_url)
+            return self._items.get(item_id) if item_id else None
+
+    def items(self, category: str = None):
+        """
+        Returns every cached item, optionally restricted to one category.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            if category is None:
+                return list(self._items.values())
+            return [self._items[item_id] for item_id in self._by_category.get(category, ())]
+
+    def count(self):
+        """
+        Returns the number of items in the wardrobe. Once the table has been loaded the
+        count is kept current by the write-through calls, so an expired TTL does not
+        trigger a full scan; only a cache that was never loaded is filled first.
+        """
+        with self._lock:
+            if self.refreshes:
+                return len(self._items)
+        self._ensure_fresh()
+        with self._lock:
+            return len(self._items)
+
+    # ---------------- Write-through ----------------
+    def put(self, item: dict):
+        """
+        Inserts or replaces an item after it was written to DynamoDB.
+        """
+        if not item:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("put", item))
+            self._put(item)
+
+    def remove(self, item_id: str):
+        """
+        Drops an item after it was deleted from DynamoDB.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("remove", item_id))
+            self._remove(item_id)
+
+    def invalidate(self):
+        """
+        Forces a reload from DynamoDB on the next read.
+        """
+        with self._lock:
+            self._loaded_at = None
+
+    # ---------------- Reload ----------------
+    def refresh(self):
+        """
+        Reloads every item from DynamoDB. Writes made during the reload are replayed on top.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            items = self.loader()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._items = {}
+            self._by_url = {}
+            self._by_category = defaultdict(set)
+            for item in items:
+                self._put(item)
+            for op, value in pending:
+                if op == "put":
+                    self._put(value)
+                else:
+                    self._remove(value)
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+        logger.info(f"Wardrobe cache loaded {len(items)} items from DynamoDB")
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the cache size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+            }
+
+    def _is_fresh(self):
+        with self._lock:
+            return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def _ensure_fresh(self):
+        if self._is_fresh():
+            with self._lock:
+                self.hits += 1
+            return
+        with self._lock:
+            self.misses += 1
+        with self._refresh_lock:
+            # Another reader may have reloaded while we waited
+            if not self._is_fresh():
+                self.refresh()
+
+    def _put(self, item):
+        item_id = item_key(item)
+        self._remove(item_id)
+        self._items[item_id] = item
+        if item.get("s3_url"):
+            self._by_url[item["s3_url"]] = item_id
+        self._by_category[item.get("category", "Unknown")].add(item_id)
+
+    def _remove(self, item_id):
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        if self._by_url.get(item.get("s3_url")) == item_id:
+            del self._by_url[item["s3_url"]]
+        category_ids = self._by_category.get(item.get("category", "Unknown"))
+        if category_ids is not None:
+            category_ids.discard(item_id)
+            if not category_ids:
+                del self._by_category[item.get("category", "Unknown")]
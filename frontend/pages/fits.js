@@ -152,7 +152,7 @@ export default function Fits({ darkMode, toggleDarkMode }) {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
-  const handleSend = async (e, promptOverride = null) => {
+  const handleSend = async (e, promptOverride = null, regenerate = false) => {
     e?.preventDefault();
     const prompt = promptOverride || input;
     if (prompt.trim() === '') return;
@@ -169,7 +169,7 @@ export default function Fits({ darkMode, toggleDarkMode }) {
       const response = await fetch('http://127.0.0.1:5001/recommend', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ user_prompt: userMessage.content }),
+        body: JSON.stringify({ user_prompt: userMessage.content, regenerate }),
       });
       const data = await response.json();
 
@@ -196,7 +196,7 @@ export default function Fits({ darkMode, toggleDarkMode }) {
 
   const handleRegenerate = (prompt) => {
     const regeneratePrompt = `Give me another outfit option for: ${prompt}`;
-    handleSend(null, regeneratePrompt);
+    handleSend(null, regeneratePrompt, true);
   };
 
   const handleSaveOutfit = async (outfitData, promptUsed) => {
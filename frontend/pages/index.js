@@ -1,5 +1,5 @@
 // pages/Display.js
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useRouter } from 'next/router';
 import { Modal, Toast } from 'react-bootstrap';
 import FixedHeader from '../components/FixedHeader';  // your existing header
@@ -56,12 +56,36 @@ function Display({ darkMode, toggleDarkMode }) {
     "type"
   ];
 
-  // 1. Fetch images from the backend
+  // 1. Fetch images from the backend. After the first full listing only the
+  //    changes since the last cursor are requested and merged in.
+  const cursorRef = useRef(null);
+  const itemKey = (item) => item.id || item['clothing-item-id'];
+
   const fetchData = () => {
-    fetch('http://127.0.0.1:5001/list')
+    const url = cursorRef.current === null
+      ? 'http://127.0.0.1:5001/list'
+      : `http://127.0.0.1:5001/list?since=${cursorRef.current}`;
+    fetch(url)
       .then((res) => res.json())
       .then((data) => {
-        if (data.files) setImages(data.files);
+        if (!data.files) return;
+        if (data.full) {
+          setImages(data.files);
+        } else if (data.files.length > 0 || data.deleted.length > 0) {
+          setImages((prev) => {
+            const changed = new Map(data.files.map((item) => [itemKey(item), item]));
+            const removed = new Set(data.deleted);
+            const merged = prev
+              .filter((item) => !removed.has(itemKey(item)))
+              .map((item) => {
+                const update = changed.get(itemKey(item));
+                changed.delete(itemKey(item));
+                return update || item;
+              });
+            return [...merged, ...changed.values()];
+          });
+        }
+        cursorRef.current = data.cursor;
       })
       .catch((err) => console.error('Error fetching images:', err));
   };
@@ -75,14 +99,12 @@ function Display({ darkMode, toggleDarkMode }) {
   // 2. Delete-mode toggles
   const toggleDeleteMode = () => {
     if (deleteMode && selectedForDeletion.length > 0) {
-      Promise.all(selectedForDeletion.map(url =>
-        fetch('http://127.0.0.1:5001/delete', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ url: url }),
-        })
-      ))
-      .then((responses) => Promise.all(responses.map(res => res.json())))
+      fetch('http://127.0.0.1:5001/delete', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ urls: selectedForDeletion }),
+      })
+      .then((res) => res.json())
       .then(() => {
         showToast('Selected images deleted');
         fetchData();
@@ -155,32 +177,49 @@ function Display({ darkMode, toggleDarkMode }) {
     }
   };
 
-  const uploadSingleFile = (file, name = null) => {
-    return new Promise((resolve, reject) => {
-      if (!file.type.startsWith('image/')) {
-        reject(new Error('Only image files are allowed'));
-        return;
-      }
-      const formData = new FormData();
-      formData.append('file', file);
-      if (name) formData.append('name', name);
-      const xhr = new XMLHttpRequest();
-      xhr.open('POST', 'http://127.0.0.1:5001/upload');
-      xhr.onload = () => {
-        if (xhr.status === 200) {
-          try {
-            const responseJson = JSON.parse(xhr.responseText);
-            resolve(responseJson);
-          } catch (error) {
-            reject(error);
-          }
-        } else {
-          reject(new Error(`Upload failed: ${xhr.statusText}`));
-        }
-      };
-      xhr.onerror = () => reject(new Error('Upload error'));
-      xhr.send(formData);
+  // Two-phase upload: the image goes straight to S3 through presigned URLs and the
+  // backend only receives small JSON requests before and after the transfer.
+  const putToS3 = async (url, body, headers = {}) => {
+    const res = await fetch(url, { method: 'PUT', headers, body });
+    if (!res.ok) throw new Error(`Upload failed: ${res.statusText}`);
+    return res;
+  };
+
+  const uploadSingleFile = async (file, name = null) => {
+    if (!file.type.startsWith('image/')) {
+      throw new Error('Only image files are allowed');
+    }
+    const initRes = await fetch('http://127.0.0.1:5001/upload/init', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        name,
+        files: [{ filename: file.name, size: file.size, content_type: file.type }],
+      }),
+    });
+    if (!initRes.ok) throw new Error(`Upload failed: ${initRes.statusText}`);
+    const [upload] = (await initRes.json()).uploads;
+
+    const completion = { item_id: upload.item_id };
+    if (upload.upload_id) {
+      // Large files: one presigned URL per part, uploaded in parallel
+      completion.upload_id = upload.upload_id;
+      completion.parts = await Promise.all(upload.parts.map(async (part) => {
+        const start = (part.part_number - 1) * upload.part_size;
+        const res = await putToS3(part.url, file.slice(start, start + upload.part_size));
+        return { part_number: part.part_number, etag: res.headers.get('ETag') };
+      }));
+    } else {
+      await putToS3(upload.url, file, upload.headers);
+    }
+
+    const completeRes = await fetch('http://127.0.0.1:5001/upload/complete', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ uploads: [completion] }),
     });
+    if (!completeRes.ok) throw new Error(`Upload failed: ${completeRes.statusText}`);
+    return completeRes.json();
   };
 
   const handleUploadSubmit = async () => {
@@ -324,7 +363,7 @@ function Display({ darkMode, toggleDarkMode }) {
                 onClick={() => openModal(item)}
               >
                 <div className="aspectRatioBox">
-                  <img src={item.s3_url} alt={`Clothing item ${item.id}`} className="image" />
+                  <img src={item.renditions?.thumb || item.s3_url} alt={`Clothing item ${item.id}`} className="image" loading="lazy" />
                   {deleteMode && (
                     <div
                       style={{
@@ -367,7 +406,7 @@ function Display({ darkMode, toggleDarkMode }) {
               onClick={() => openModal(item)}
             >
               <div className="aspectRatioBox">
-                <img src={item.s3_url} alt={`Clothing item ${item.id}`} className="image" />
+                <img src={item.renditions?.thumb || item.s3_url} alt={`Clothing item ${item.id}`} className="image" loading="lazy" />
                 {deleteMode && (
                   <div
                     style={{
@@ -527,7 +566,7 @@ function Display({ darkMode, toggleDarkMode }) {
             <Modal.Body>
               <div className="modalImageContainer">
                 <img
-                  src={selectedItem.s3_url}
+                  src={selectedItem.renditions?.preview || selectedItem.s3_url}
                   alt="Bigger preview"
                   className="modalImage"
                   onClick={() => setShowItemKeys(prev => !prev)}
@@ -0,0 +1,132 @@
+"""
+Compares model-loading profiles on a fixed image set.
+
+Usage:
+    python benchmarks/bench_profiles.py images/ --profiles fp16 --save results/
+    python benchmarks/bench_profiles.py images/ --profiles bf16-cpu,int8-dynamic,small --baseline results/fp16.json
+
+Each profile runs in its own process (so peak RSS is per profile) with MODEL_PROFILE set,
+recognizing the images one at a time. It reports mean/p50/p95 per-image latency, peak RSS
+and attribute agreement: the share of baseline attributes whose value the profile
+reproduces (case- and whitespace-insensitive), against the fp16 outputs from --baseline
+or the first profile in --profiles.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+CONTAINER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(os.path.dirname(CONTAINER_DIR), "backend")  # Shared metrics.py
+
+
+def image_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def run_profile(paths):
+    """
+    Worker mode: loads the model for MODEL_PROFILE and recognizes each image.
+
+    Returns:
+        dict: Profile name, per-image outputs and latencies, and peak RSS in MB.
+    """
+    os.environ.setdefault("WARMUP", "1")
+    sys.path.insert(0, CONTAINER_DIR)
+    sys.path.append(BACKEND_DIR)
+    import inference  # noqa: E402  (loads and warms up the model)
+
+    outputs, latencies = {}, []
+    for path in image_files(paths):
+        with open(path, "rb") as f:
+            image = inference.decode_image(f.read())
+        start = time.perf_counter()
+        [(text, _)] = inference.generate_batch([(image, {"prompt": None, "max_new_tokens": inference.MAX_NEW_TOKENS})])
+        latencies.append(time.perf_counter() - start)
+        outputs[os.path.basename(path)] = text
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"profile": inference.MODEL_PROFILE, "outputs": outputs, "latencies": latencies, "peak_rss_mb": peak_rss_mb}
+
+
+def parse_attributes(text):
+    start, end = text.find("{"), text.rfind("}") + 1
+    try:
+        attributes = json.loads(text[start:end]) if start != -1 and end else {}
+    except json.JSONDecodeError:
+        return {}
+    return {key.strip().lower(): " ".join(str(value).lower().split()) for key, value in attributes.items()}
+
+
+def agreement(result, baseline):
+    """
+    Share of baseline attributes (over all images) whose value the result reproduces.
+    """
+    matched = total = 0
+    for name, baseline_text in baseline["outputs"].items():
+        expected = parse_attributes(baseline_text)
+        actual = parse_attributes(result["outputs"].get(name, ""))
+        total += len(expected)
+        matched += sum(1 for key, value in expected.items() if actual.get(key) == value)
+    return matched / total if total else None
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+", help="Image files or directories")
+    parser.add_argument("--profiles", default="fp16", help="Comma-separated MODEL_PROFILE values")
+    parser.add_argument("--baseline", help="Saved fp16 results to compare against")
+    parser.add_argument("--save", help="Directory to write <profile>.json results to")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_profile(args.images), sys.stdout)
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'profile':<16}{'images':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak RSS MB':>14}{'agreement':>11}")
+    for profile in args.profiles.split(","):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", *args.images],
+            env={**os.environ, "MODEL_PROFILE": profile},
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        result = json.loads(completed.stdout)
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            with open(os.path.join(args.save, f"{profile}.json"), "w") as f:
+                json.dump(result, f, indent=2)
+        if baseline is None:
+            baseline = result
+
+        latencies = result["latencies"]
+        score = agreement(result, baseline)
+        print(
+            f"{profile:<16}{len(latencies):>8}{sum(latencies) / len(latencies) * 1000:>10.0f}"
+            f"{percentile(latencies, 0.5) * 1000:>10.0f}{percentile(latencies, 0.95) * 1000:>10.0f}"
+            f"{result['peak_rss_mb']:>14.0f}{score * 100 if score is not None else 0:>10.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+
+# One worker process owns the model; concurrent requests are handled by threads and
+# merged into batches by the micro-batcher. The model loads (and warms up) when the
+# worker imports inference.py, so the GPU is never initialized before a fork.
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = 1
+worker_class = "gthread"
+# Enough threads for MAX_QUEUE_DEPTH in-flight invocations plus /ping
+threads = int(os.environ.get("SERVER_THREADS", str(int(os.environ.get("MAX_QUEUE_DEPTH", "32")) + 4)))
+backlog = int(os.environ.get("SERVER_BACKLOG", "64"))
+# Model loading and long generations must not trip the worker timeout
+timeout = 0
+graceful_timeout = 30
+keepalive = 75  # Above the SageMaker load balancer's idle timeout
+accesslog = "-"
@@ -1,12 +1,86 @@
+import base64
+import io
+import logging
 import os
+import queue
+import threading
+import time
+from urllib.parse import unquote
+from concurrent.futures import Future
+from functools import lru_cache
 import torch
+from PIL import Image
 from qwen_vl_utils import process_vision_info
-from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor
-from flask import Flask, request, jsonify
+from transformers import Qwen2_5_VLForConditionalGeneration, Qwen2VLForConditionalGeneration, AutoProcessor, BatchFeature, StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+from transformers.generation.streamers import BaseStreamer
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
+from metrics import Registry, start_trace  # backend/metrics.py, copied in at build time
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger()
 
 MODEL_DIR = os.environ.get("MODEL_DIR", "/opt/ml/model")
-model = Qwen2_5_VLForConditionalGeneration.from_pretrained(MODEL_DIR, torch_dtype=torch.float16, device_map="auto")
-processor = AutoProcessor.from_pretrained(MODEL_DIR)
+MODEL_DIR_SMALL = os.environ.get("MODEL_DIR_SMALL", "/opt/ml/model-small")  # Qwen2-VL checkpoint for the "small" profile
+DEVICE = os.environ.get("DEVICE", "auto")  # "cpu" runs fp32 on CPU, e.g. with a tiny checkpoint for testing
+
+# Model-loading profiles: (model class, checkpoint, dtype, device_map, int8 dynamic quantization)
+MODEL_PROFILES = {
+    "fp16": (Qwen2_5_VLForConditionalGeneration, MODEL_DIR, torch.float16, DEVICE, False),  # GPU default
+    "fp32-cpu": (Qwen2_5_VLForConditionalGeneration, MODEL_DIR, torch.float32, "cpu", False),
+    "bf16-cpu": (Qwen2_5_VLForConditionalGeneration, MODEL_DIR, torch.bfloat16, "cpu", False),  # Needs AVX512-BF16/AMX to be fast
+    "int8-dynamic": (Qwen2_5_VLForConditionalGeneration, MODEL_DIR, torch.float32, "cpu", True),  # int8 Linear weights, fp32 activations
+    "small": (Qwen2VLForConditionalGeneration, MODEL_DIR_SMALL, torch.bfloat16, "cpu", False),
+}
+MODEL_PROFILE = os.environ.get("MODEL_PROFILE", "fp32-cpu" if DEVICE == "cpu" else "fp16")
+if MODEL_PROFILE not in MODEL_PROFILES:
+    raise ValueError(f"Unknown MODEL_PROFILE '{MODEL_PROFILE}'. Choose one of: {', '.join(MODEL_PROFILES)}")
+MODEL_CLASS, MODEL_PATH, MODEL_DTYPE, MODEL_DEVICE_MAP, MODEL_QUANTIZE = MODEL_PROFILES[MODEL_PROFILE]
+
+def load_model():
+    """
+    Loads the recognition model for MODEL_PROFILE. The int8-dynamic profile loads fp32
+    weights and converts every nn.Linear to a dynamically quantized int8 layer.
+    """
+    start = time.perf_counter()
+    loaded = MODEL_CLASS.from_pretrained(MODEL_PATH, torch_dtype=MODEL_DTYPE, device_map=MODEL_DEVICE_MAP)
+    if MODEL_QUANTIZE:
+        loaded = torch.ao.quantization.quantize_dynamic(loaded, {torch.nn.Linear}, dtype=torch.qint8)
+    loaded.eval()
+    logger.info(f"Loaded '{MODEL_PROFILE}' model from {MODEL_PATH} in {time.perf_counter() - start:.1f}s")
+    return loaded
+
+model = load_model()
+# Vision tokens scale with pixel count; the backend resizes to the same budget (RECOGNITION_MAX_PIXELS)
+MAX_PIXELS = int(os.environ.get("MAX_PIXELS", str(768 * 28 * 28)))
+processor = AutoProcessor.from_pretrained(MODEL_PATH, max_pixels=MAX_PIXELS)
+processor.tokenizer.padding_side = "left"  # Decoder-only batches must be left padded for generate
+
+MAX_NEW_TOKENS = int(os.environ.get("MAX_NEW_TOKENS", "512"))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "8"))
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "20"))
+EARLY_STOP = os.environ.get("EARLY_STOP", "1") == "1"  # Stop decoding once the JSON object closes
+WARMUP = os.environ.get("WARMUP", "1") == "1"  # Run one inference at startup so the first request skips kernel initialization
+MAX_QUEUE_DEPTH = int(os.environ.get("MAX_QUEUE_DEPTH", "32"))  # In-flight /invocations before answering 503
+
+# Wire protocol for /invocations (see README.md)
+IMAGE_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+CUSTOM_ATTRIBUTES_HEADER = "X-Amzn-SageMaker-Custom-Attributes"
+
+# Metrics served at /metrics; stages are decode_image, preprocess, prefill and decode
+registry = Registry("recognition")
+span = registry.span
+STAGE_SECONDS = registry.stage_seconds
+REQUESTS = registry.counter("requests_total", "/invocations requests by status (503 when the queue is full).", ("status",))
+REQUEST_SECONDS = registry.histogram("request_duration_seconds", "/invocations latency until the response is ready.", ("mode",))
+TOKENS = registry.counter("tokens_total", "Prompt (input) and generated (output) tokens.", ("direction",))
+BYTES = registry.counter("bytes_total", "Encoded image bytes received.", ("kind",))
+BATCH_SIZE = registry.histogram("batch_size", "Images per generate call.", buckets=(1, 2, 4, 8, 16, 32))
+
+# Serializes model.generate between the micro-batcher and streaming requests
+generate_lock = threading.Lock()
+
+# Admission control: requests beyond MAX_QUEUE_DEPTH are rejected instead of queueing without bound
+admission = threading.BoundedSemaphore(MAX_QUEUE_DEPTH)
 
 SYSTEM_PROMPT = """
 You are a fashion expert and product description generator. Your task is to analyze clothing product images and generate detailed and accurate descriptions. Include the following attributes in your descriptions:
@@ -32,55 +106,498 @@ Your descriptions should be professional and detailed enough to help a recommend
 Format your response in JSON with the attribute name as the key and the corresponding description as the value.
 """
 
-app = Flask(__name__)
+class JsonBraceTracker:
+    """
+    Tracks brace depth of generated text, ignoring braces inside JSON strings,
+    to detect when the top-level JSON object has been closed.
+    """
 
-@app.route("/invocations", methods=["POST"])
-def predict():
-    # Expecting multipart/form-data with 'image' field
-    if "image" not in request.files:
-        return jsonify({"error": "Missing image"}), 400
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.closed = False
+
+    def feed(self, text):
+        for char in text:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth > 0:
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.closed = True
+                    return True
+        return self.closed
+
+class JsonObjectClosed(StoppingCriteria):
+    """
+    Stops each sequence in a batch as soon as its top-level JSON object is balanced,
+    so trailing chatter after the attributes doesn't burn tokens.
+    """
+
+    def __init__(self, tokenizer, batch_size):
+        self.tokenizer = tokenizer
+        self.trackers = [JsonBraceTracker() for _ in range(batch_size)]
+
+    def __call__(self, input_ids, scores, **kwargs):
+        for tracker, token_id in zip(self.trackers, input_ids[:, -1].tolist()):
+            if not tracker.closed:
+                tracker.feed(self.tokenizer.decode([token_id], skip_special_tokens=True))
+        return torch.tensor([tracker.closed for tracker in self.trackers], device=input_ids.device)
+
+class MaxNewTokensPerRow(StoppingCriteria):
+    """
+    Stops each sequence in a batch at its own request's max_new_tokens, so a short
+    request batched with longer ones does not decode up to the largest limit.
+    """
+
+    def __init__(self, prompt_length, max_new_tokens):
+        self.prompt_length = prompt_length
+        self.max_new_tokens = max_new_tokens
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_length
+        return torch.tensor([generated >= limit for limit in self.max_new_tokens], device=input_ids.device)
+
+class GenerationTimer(BaseStreamer):
+    """
+    Streamer that timestamps generation: the first put() is the prompt, every later
+    put() is one decode step. Forwards everything to an inner streamer if given.
+    """
+
+    def __init__(self, inner=None):
+        self.inner = inner
+        self.started_at = time.perf_counter()
+        self.prompt_at = None  # When generate() started prefilling the prompt
+        self.first_token_at = None
+        self.finished_at = None
+        self.steps = 0
+        self._prompt_seen = False
+
+    def put(self, value):
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            self.prompt_at = time.perf_counter()
+        else:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.steps += 1
+        if self.inner is not None:
+            self.inner.put(value)
+
+    def end(self):
+        self.finished_at = time.perf_counter()
+        if self.inner is not None:
+            self.inner.end()
+
+    def record_phases(self):
+        """
+        Observes the prefill (prompt to first token) and decode (first token to end)
+        durations of this generate call in the stage histogram.
+        """
+        if self.prompt_at is None or self.finished_at is None:
+            return
+        first_token_at = self.first_token_at or self.finished_at
+        STAGE_SECONDS.observe(first_token_at - self.prompt_at, stage="prefill")
+        STAGE_SECONDS.observe(self.finished_at - first_token_at, stage="decode")
+
+    def timing(self, tokens=None):
+        """
+        Returns the generation timestamps and the number of tokens generated for one sequence.
+        """
+        return {
+            "first_token_at": self.first_token_at or self.finished_at,
+            "finished_at": self.finished_at,
+            "tokens": self.steps if tokens is None else tokens,
+        }
+
+def request_metrics(received_at, timings):
+    """
+    Summarizes time-to-first-token and decode speed for one request.
+
+    Args:
+        received_at (float): perf_counter() when the request arrived.
+        timings (list): GenerationTimer.timing() per image in the request.
+
+    Returns:
+        dict: ttft_ms, tokens and tokens_per_second.
+    """
+    first_token_at = min(timing["first_token_at"] for timing in timings)
+    finished_at = max(timing["finished_at"] for timing in timings)
+    tokens = sum(timing["tokens"] for timing in timings)
+    decode_time = finished_at - first_token_at
+    return {
+        "ttft_ms": round((first_token_at - received_at) * 1000, 1),
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / decode_time, 1) if decode_time > 0 else None,
+    }
+
+def format_custom_attributes(values):
+    """
+    Formats a dict as a "key=value;key=value" CustomAttributes header.
+    """
+    return ";".join(f"{key}={value}" for key, value in values.items() if value is not None)
+
+def decode_image(data):
+    """
+    Decodes an image in memory, without touching disk.
+
+    Args:
+        data (bytes | memoryview | str): Encoded image bytes, or a base64 data URI string.
+
+    Returns:
+        PIL.Image.Image: Fully loaded RGB image.
+    """
+    if isinstance(data, str):
+        data = base64.b64decode(data.split(",", 1)[1] if data.startswith("data:") else data)
+    BYTES.inc(len(data), kind="image")
+    with span("decode_image"):
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image.convert("RGB")
+
+def parse_custom_attributes(header):
+    """
+    Parses request parameters from the SageMaker CustomAttributes header,
+    formatted as "key=value;key=value" with URL-encoded values.
+
+    Supported keys: stream (1 to stream the output), max_new_tokens, prompt
+    (extra instruction appended after the image), trace_id (the backend's request
+    trace id, comma-separated when the backend batched several requests).
+
+    Returns:
+        dict: Request options with "stream", "max_new_tokens", "prompt" and "trace_id".
+    """
+    attributes = {}
+    for pair in (header or "").split(";"):
+        if "=" in pair:
+            key, value = pair.split("=", 1)
+            attributes[key.strip()] = unquote(value.strip())
+    return {
+        "stream": attributes.get("stream") == "1",
+        "max_new_tokens": min(int(attributes.get("max_new_tokens", MAX_NEW_TOKENS)), MAX_NEW_TOKENS),
+        "prompt": attributes.get("prompt") or None,
+        "trace_id": attributes.get("trace_id") or None,
+    }
+
+@lru_cache(maxsize=64)
+def render_chat_template(prompt=None):
+    """
+    Renders the chat template text for a request. The image only appears as a fixed
+    placeholder in the text, so the string is rendered once per prompt instead of once
+    per image.
+
+    Args:
+        prompt (str, optional): Extra user instruction.
+
+    Returns:
+        str: Chat template text ending with the generation prompt.
+    """
+    return processor.apply_chat_template(build_messages(None, prompt), tokenize=False, add_generation_prompt=True)
+
+@lru_cache(maxsize=64)
+def chat_template_ids(prompt=None):
+    """
+    Tokenizes the chat template around the image placeholder once per prompt, so the
+    system prompt is not re-tokenized on every request. prepare_inputs splices the
+    image's own placeholder tokens in between. The model still prefills every token.
+
+    Args:
+        prompt (str, optional): Extra user instruction.
 
-    image_file = request.files["image"]
+    Returns:
+        tuple: (token ids before the image placeholder, token ids after it).
+    """
+    before, after = render_chat_template(prompt).split(processor.image_token)
+    return (
+        tuple(processor.tokenizer.encode(before, add_special_tokens=False)),
+        tuple(processor.tokenizer.encode(after, add_special_tokens=False)),
+    )
 
-    # Save image temporarily (or process in-memory)
-    image_path = "/tmp/input_image"
-    image_file.save(image_path)
+def build_messages(image, prompt=None):
+    """
+    Builds the chat messages for one image: system prompt, then the user image
+    and an optional extra instruction.
 
-    # Build messages: system prompt, then user image
-    messages = [
+    Args:
+        image (PIL.Image.Image): Decoded input image.
+        prompt (str, optional): Extra user instruction.
+    """
+    content = [{"type": "image", "image": image}]
+    if prompt:
+        content.append({"type": "text", "text": prompt})
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
-        {
-            "role": "user",
-            "content": [
-                {"type": "image", "image": image_path}
-            ],
-        },
+        {"role": "user", "content": content},
     ]
 
+def prepare_inputs(images, prompts=None):
+    """
+    Processes the images and builds the token ids of one left-padded batch from the
+    cached template ids, with each image placeholder expanded to the image's token count
+    as the processor would.
+
+    Args:
+        images (list): Decoded PIL images, one sequence each.
+        prompts (list, optional): Extra user instruction (or None) per image.
+
+    Returns:
+        BatchFeature: Model inputs on the model's device.
+    """
+    prompts = prompts or [None] * len(images)
+    messages_batch = [build_messages(image, prompt) for image, prompt in zip(images, prompts)]
+
     # Preparation for inference
-    text = processor.apply_chat_template(
-        messages, tokenize=False, add_generation_prompt=True
-    )
-    image_inputs, video_inputs = process_vision_info(messages)
-    inputs = processor(
-        text=[text],
-        images=image_inputs,
-        videos=video_inputs,
-        padding=True,
-        return_tensors="pt",
-    )
-    inputs = inputs.to(model.device)
+    image_inputs, _ = process_vision_info(messages_batch)
+    vision = processor.image_processor(images=image_inputs, return_tensors="pt")
+    image_token_id = processor.tokenizer.convert_tokens_to_ids(processor.image_token)
+    merge_length = processor.image_processor.merge_size ** 2  # Patches merged into one vision token
+    rows = []
+    for prompt, grid in zip(prompts, vision["image_grid_thw"]):
+        before, after = chat_template_ids(prompt)
+        rows.append([*before, *[image_token_id] * int(grid.prod() // merge_length), *after])
+    text = processor.tokenizer.pad({"input_ids": rows}, padding=True, return_tensors="pt")
+    inputs = BatchFeature({**text, **vision})
+    TOKENS.inc(int(inputs.attention_mask.sum()), direction="input")
+    return inputs.to(model.device)
+
+def generation_kwargs(input_ids, max_new_tokens):
+    """
+    Returns the model.generate arguments shared by batched and streaming generation.
+
+    Args:
+        input_ids (torch.Tensor): Padded prompt ids, one row per sequence.
+        max_new_tokens (list): Token limit per row. Generation runs up to the largest,
+            and each row stops at its own.
+    """
+    criteria = []
+    if EARLY_STOP:
+        criteria.append(JsonObjectClosed(processor.tokenizer, len(max_new_tokens)))
+    if len(set(max_new_tokens)) > 1:
+        criteria.append(MaxNewTokensPerRow(input_ids.shape[1], max_new_tokens))
+    return {"max_new_tokens": max(max_new_tokens), "stopping_criteria": StoppingCriteriaList(criteria)}
+
+def generate_batch(entries):
+    """
+    Runs one padded batch through the processor and model.generate.
+
+    Args:
+        entries (list): (PIL image, options dict) per sequence.
+
+    Returns:
+        list: (generated text, GenerationTimer.timing() dict) per image, in order.
+    """
+    images = [image for image, _ in entries]
+    with span("preprocess"):
+        inputs = prepare_inputs(images, [options["prompt"] for _, options in entries])
+    max_new_tokens = [options["max_new_tokens"] for _, options in entries]
+    BATCH_SIZE.observe(len(images))
 
     # Inference: Generation of the output
-    generated_ids = model.generate(**inputs, max_new_tokens=512)
+    timer = GenerationTimer()
+    with generate_lock:
+        generated_ids = model.generate(**inputs, streamer=timer, **generation_kwargs(inputs.input_ids, max_new_tokens))
+    timer.record_phases()
     generated_ids_trimmed = [
         out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
     ]
-    output_text = processor.batch_decode(
+    texts = processor.batch_decode(
         generated_ids_trimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False
     )
+    # Rows that stopped early are padded up to the longest one
+    pad_token_id = processor.tokenizer.pad_token_id
+    outputs = [
+        (text, timer.timing(int((out_ids != pad_token_id).sum())))
+        for text, out_ids in zip(texts, generated_ids_trimmed)
+    ]
+    TOKENS.inc(sum(timing["tokens"] for _, timing in outputs), direction="output")
+    trace_ids = ",".join(dict.fromkeys(options["trace_id"] for _, options in entries if options.get("trace_id")))
+    logger.info(
+        f"[{trace_ids or '-'}] Batch of {len(images)}: prefill {((timer.first_token_at or timer.finished_at) - timer.prompt_at) * 1000:.0f} ms, "
+        f"decode {(timer.finished_at - (timer.first_token_at or timer.finished_at)) * 1000:.0f} ms"
+    )
+    return outputs
+
+class MicroBatcher:
+    """
+    Merges concurrent requests into one generate call. The worker waits for the first
+    image, collects more for up to BATCH_WINDOW_MS (or until MAX_BATCH_SIZE), runs them
+    as one batch and resolves each request's Future. Running every generate call on this
+    single thread also keeps the model from being used concurrently.
+    """
+
+    def __init__(self, max_batch_size, window_ms):
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+
+    def submit(self, image, options):
+        future = Future()
+        self._queue.put(((image, options), future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                outputs = generate_batch([entry for entry, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+def generate_stream(image, options, received_at):
+    """
+    Generates for one image on a background thread and yields text chunks as they decode.
+
+    Args:
+        image (PIL.Image.Image): Decoded input image.
+        options (dict): Request options from parse_custom_attributes.
+        received_at (float): perf_counter() when the request arrived, for the logged metrics.
+
+    Yields:
+        str: Newly decoded text.
+    """
+    with span("preprocess"):
+        inputs = prepare_inputs([image], [options["prompt"]])
+    streamer = TextIteratorStreamer(
+        processor.tokenizer, skip_prompt=True, skip_special_tokens=True, clean_up_tokenization_spaces=False
+    )
+    timer = GenerationTimer(inner=streamer)
+
+    def run():
+        with generate_lock:
+            model.generate(**inputs, streamer=timer, **generation_kwargs(inputs.input_ids, [options["max_new_tokens"]]))
+
+    threading.Thread(target=run, daemon=True).start()
+    for text in streamer:
+        if text:
+            yield text
+    timer.record_phases()
+    TOKENS.inc(timer.steps, direction="output")
+    REQUEST_SECONDS.observe(time.perf_counter() - received_at, mode="stream")
+    logger.info(f"[{options['trace_id'] or '-'}] Streamed request: {request_metrics(received_at, [timer.timing()])}")
+
+def warmup():
+    """
+    Runs one short generation on a blank image, so CUDA context creation, kernel
+    selection and the chat template are paid for before the first request.
+    """
+    start = time.perf_counter()
+    generate_batch([(Image.new("RGB", (224, 224), "white"), {"prompt": None, "max_new_tokens": 8})])
+    logger.info(f"Warmup inference took {time.perf_counter() - start:.2f}s")
+
+if WARMUP:
+    warmup()
+
+batcher = MicroBatcher(MAX_BATCH_SIZE, BATCH_WINDOW_MS)
+
+app = Flask(__name__)
+
+@app.route("/ping", methods=["GET"])
+def ping():
+    # SageMaker health check; the model is loaded and warmed up before the server starts
+    return jsonify({"status": "ok"})
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    # Prometheus scrape target; SageMaker only routes /ping and /invocations, so it is
+    # reached from inside the container or a local run
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/invocations", methods=["POST"])
+def predict():
+    if not admission.acquire(blocking=False):
+        REQUESTS.inc(status=503)
+        return jsonify({"error": "Too many requests in flight, retry later"}), 503
+    try:
+        response = make_response(invoke(time.perf_counter()))
+    except BaseException:
+        admission.release()
+        REQUESTS.inc(status=500)
+        raise
+    REQUESTS.inc(status=response.status_code)
+    # Released once the server has sent the whole response, including streamed ones
+    response.call_on_close(admission.release)
+    return response
+
+def invoke(received_at):
+    # Wire protocol:
+    #   - image/jpeg, image/png or image/webp body: one raw image -> {"generated_text": ...}
+    #   - multipart/form-data with one or more binary 'image' parts -> {"generated_texts": [...]}
+    #   - application/json with base64 'image' / 'images' (legacy) -> same shapes as above
+    # Parameters travel in the CustomAttributes header, e.g. "stream=1;max_new_tokens=256".
+    try:
+        options = parse_custom_attributes(request.headers.get(CUSTOM_ATTRIBUTES_HEADER))
+    except ValueError:
+        return jsonify({"error": f"Invalid {CUSTOM_ATTRIBUTES_HEADER} header"}), 400
+    options["trace_id"] = start_trace(options["trace_id"])
+
+    if request.mimetype in IMAGE_CONTENT_TYPES:
+        encoded_images = [request.get_data()]
+        is_list = False
+    elif request.mimetype == "multipart/form-data":
+        encoded_images = [image_file.read() for image_file in request.files.getlist("image")]
+        is_list = True
+    else:
+        payload = request.get_json(silent=True) or {}
+        options["stream"] = options["stream"] or bool(payload.get("stream"))
+        is_list = "images" in payload
+        encoded_images = payload["images"] if is_list else [payload["image"]] if "image" in payload else []
+
+    if not encoded_images:
+        return jsonify({"error": "Missing image"}), 400
+
+    # Decode once, in memory; each request gets its own image objects
+    try:
+        images = [decode_image(data) for data in encoded_images]
+    except Exception as e:
+        return jsonify({"error": f"Invalid image: {e}"}), 400
+
+    if options["stream"]:
+        if len(images) != 1:
+            return jsonify({"error": "Streaming takes a single image"}), 400
+        return Response(
+            stream_with_context(generate_stream(images[0], options, received_at)), mimetype="text/plain"
+        )
+
+    # Every image goes through the micro-batcher so concurrent requests share generate calls
+    futures = [batcher.submit(image, options) for image in images]
+    outputs = [future.result() for future in futures]
+    output_texts = [text for text, _ in outputs]
+    metrics = request_metrics(received_at, [timing for _, timing in outputs])
+    REQUEST_SECONDS.observe(time.perf_counter() - received_at, mode="batch")
+    logger.info(f"[{options['trace_id']}] Request of {len(images)} images: {metrics}")
 
-    return jsonify({"generated_text": output_text[0]})
+    body = {"generated_texts": output_texts} if is_list else {"generated_text": output_texts[0]}
+    # Returned to the caller as the CustomAttributes field of the invoke_endpoint response
+    return jsonify(body), 200, {CUSTOM_ATTRIBUTES_HEADER: format_custom_attributes({**metrics, "trace_id": options["trace_id"]})}
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
+    # Development server; the container serves through gunicorn (see gunicorn.conf.py)
+    app.run(host="0.0.0.0", port=8080, threaded=True)
@@ -0,0 +1,27 @@
+import importlib
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+CONTAINER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(os.path.dirname(CONTAINER_DIR), "backend")
+
+
+@pytest.fixture(scope="session")
+def inference():
+    """
+    The container's inference module with model loading patched out and no warmup.
+    The backend directory goes on the path after it, for the shared metrics.py and the backend's
+    request builders.
+    """
+    pytest.importorskip("torch")
+    pytest.importorskip("qwen_vl_utils")
+    transformers = pytest.importorskip("transformers")
+    sys.path.insert(0, CONTAINER_DIR)
+    sys.path.append(BACKEND_DIR)
+    with mock.patch.dict(os.environ, {"WARMUP": "0"}), \
+            mock.patch.object(transformers.Qwen2_5_VLForConditionalGeneration, "from_pretrained"), \
+            mock.patch.object(transformers.AutoProcessor, "from_pretrained"):
+        return importlib.import_module("inference")
@@ -0,0 +1,23 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+def test_batched_rows_stop_at_their_own_max_new_tokens(inference):
+    prompt_ids = torch.zeros((3, 5), dtype=torch.long)
+
+    kwargs = inference.generation_kwargs(prompt_ids, [128, 512, 128])
+
+    assert kwargs["max_new_tokens"] == 512
+    row_limit = next(
+        criterion for criterion in kwargs["stopping_criteria"] if isinstance(criterion, inference.MaxNewTokensPerRow)
+    )
+    assert row_limit(torch.zeros((3, 5 + 127), dtype=torch.long), None).tolist() == [False, False, False]
+    assert row_limit(torch.zeros((3, 5 + 128), dtype=torch.long), None).tolist() == [True, False, True]
+
+
+def test_equal_limits_need_no_row_criterion(inference):
+    kwargs = inference.generation_kwargs(torch.zeros((2, 5), dtype=torch.long), [256, 256])
+
+    assert kwargs["max_new_tokens"] == 256
+    assert not any(isinstance(criterion, inference.MaxNewTokensPerRow) for criterion in kwargs["stopping_criteria"])
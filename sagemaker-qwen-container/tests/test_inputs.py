@@ -0,0 +1,69 @@
+import types
+
+import pytest
+from PIL import Image
+
+torch = pytest.importorskip("torch")
+
+# Qwen's chat format for a system prompt and one user turn of an image and optional text
+CHAT_TEMPLATE = (
+    "{% for message in messages %}<|im_start|>{{ message['role'] }}\n"
+    "{% if message['content'] is string %}{{ message['content'] }}"
+    "{% else %}{% for content in message['content'] %}"
+    "{% if content['type'] == 'image' %}<|vision_start|><|image_pad|><|vision_end|>"
+    "{% elif content['type'] == 'text' %}{{ content['text'] }}{% endif %}"
+    "{% endfor %}{% endif %}<|im_end|>\n{% endfor %}"
+    "{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+)
+
+
+@pytest.fixture
+def processor(inference, monkeypatch):
+    """
+    A real Qwen2.5-VL processor with a byte-level tokenizer built offline, so the cached
+    template ids can be checked against the processor's own tokenization.
+    """
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+    from transformers import Qwen2_5_VLProcessor, Qwen2TokenizerFast, Qwen2VLImageProcessor
+    from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+    byte_level = Tokenizer(models.BPE(vocab={char: index for index, char in enumerate(bytes_to_unicode().values())}, merges=[]))
+    byte_level.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    byte_level.decoder = decoders.ByteLevel()
+    tokenizer = Qwen2TokenizerFast(
+        tokenizer_object=byte_level,
+        pad_token="<|endoftext|>",
+        additional_special_tokens=["<|im_start|>", "<|im_end|>", "<|vision_start|>", "<|vision_end|>", "<|image_pad|>"],
+    )
+    tokenizer.padding_side = "left"
+    qwen_processor = Qwen2_5_VLProcessor(image_processor=Qwen2VLImageProcessor(), tokenizer=tokenizer, chat_template=CHAT_TEMPLATE)
+
+    monkeypatch.setattr(inference, "processor", qwen_processor)
+    monkeypatch.setattr(inference, "model", types.SimpleNamespace(device="cpu"))
+    inference.render_chat_template.cache_clear()
+    inference.chat_template_ids.cache_clear()
+    yield qwen_processor
+    inference.render_chat_template.cache_clear()
+    inference.chat_template_ids.cache_clear()
+
+
+def test_cached_template_ids_match_the_processor(inference, processor):
+    images = [Image.new("RGB", (64, 48), "red"), Image.new("RGB", (320, 240), "blue"), Image.new("RGB", (96, 200), "green")]
+    prompts = [None, "Only return: color; fit", None]
+    messages_batch = [inference.build_messages(image, prompt) for image, prompt in zip(images, prompts)]
+    image_inputs, _ = inference.process_vision_info(messages_batch)
+
+    expected = processor(
+        text=[inference.render_chat_template(prompt) for prompt in prompts],
+        images=image_inputs, padding=True, return_tensors="pt",
+    )
+    # Twice, so the second batch is built entirely from cached template ids
+    for _ in range(2):
+        inputs = inference.prepare_inputs(images, prompts)
+        assert torch.equal(inputs.input_ids, expected.input_ids)
+        assert torch.equal(inputs.attention_mask, expected.attention_mask)
+        assert torch.equal(inputs.pixel_values, expected.pixel_values)
+        assert torch.equal(inputs.image_grid_thw, expected.image_grid_thw)
+
+    assert inference.chat_template_ids.cache_info().hits >= 4
+    assert inference.chat_template_ids.cache_info().currsize == 2
@@ -0,0 +1,122 @@
+"""
+Contract test between the backend's recognition client and the container's /invocations.
+
+Requests are built with the backend's own code (preprocessing.py and recognition_protocol.py)
+and sent to the container's Flask app. Model loading is patched out and generate_batch is
+replaced by a stub, so only the wire protocol is exercised.
+"""
+import importlib
+import io
+import time
+from urllib.parse import quote
+
+import pytest
+from PIL import Image
+
+CUSTOM_ATTRIBUTES_HEADER = "X-Amzn-SageMaker-Custom-Attributes"
+
+
+@pytest.fixture(scope="session")
+def backend(inference):
+    return importlib.import_module("preprocessing"), importlib.import_module("recognition_protocol")
+
+
+@pytest.fixture
+def generated(inference, monkeypatch):
+    """
+    Replaces generate_batch with a stub that answers "text-<n>" per image and records its entries.
+    """
+    entries_seen = []
+
+    def generate_batch(entries):
+        now = time.perf_counter()
+        outputs = []
+        for entry in entries:
+            entries_seen.append(entry)
+            outputs.append((f"text-{len(entries_seen)}", {"first_token_at": now, "finished_at": now, "tokens": 3}))
+        return outputs
+
+    monkeypatch.setattr(inference, "generate_batch", generate_batch)
+    return entries_seen
+
+
+@pytest.fixture
+def client(inference):
+    return inference.app.test_client()
+
+
+def jpeg(backend, color):
+    preprocessing, _ = backend
+    png = io.BytesIO()
+    Image.new("RGBA", (320, 240), color).save(png, format="PNG")
+    image_bytes, _ = preprocessing.prepare_recognition_image(png.getvalue())
+    return image_bytes
+
+
+def invoke(client, body, content_type, custom_attributes):
+    return client.post(
+        "/invocations", data=body, content_type=content_type,
+        headers={CUSTOM_ATTRIBUTES_HEADER: custom_attributes} if custom_attributes else {}
+    )
+
+
+def test_raw_jpeg_body_returns_generated_text(backend, client, generated):
+    _, protocol = backend
+    body, content_type = protocol.build_request_body([jpeg(backend, "red")])
+    custom_attributes = protocol.container_attributes(
+        ["trace-a"], prompt=quote("Only return: color; fit"), max_new_tokens=128
+    )
+
+    response = invoke(client, body, content_type, custom_attributes)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"generated_text": "text-1"}
+    image, options = generated[0]
+    assert image.size == (320, 240)
+    assert options["prompt"] == "Only return: color; fit"
+    assert options["max_new_tokens"] == 128
+    assert options["trace_id"] == "trace-a"
+    attributes = protocol.parse_container_attributes(response.headers[CUSTOM_ATTRIBUTES_HEADER])
+    assert attributes["trace_id"] == "trace-a"
+    assert attributes["tokens"] == "3"
+
+
+def test_multipart_body_returns_generated_texts_in_order(backend, client, generated):
+    _, protocol = backend
+    colors = ["red", "green", "blue"]
+    body, content_type = protocol.build_request_body([jpeg(backend, color) for color in colors])
+
+    response = invoke(client, body, content_type, protocol.container_attributes(["trace-a", "trace-b"]))
+
+    assert response.status_code == 200
+    assert response.get_json() == {"generated_texts": ["text-1", "text-2", "text-3"]}
+    # Images arrive in request order: the dominant channel of each is red, green, blue
+    assert [max(range(3), key=image.getpixel((0, 0)).__getitem__) for image, _ in generated] == [0, 1, 2]
+    assert {options["trace_id"] for _, options in generated} == {"trace-a,trace-b"}
+
+
+def test_multipart_overhead_fits_the_backend_budget(backend):
+    _, protocol = backend
+    images = [b"x" * 1000] * 16
+    body, _ = protocol.build_multipart_body(images)
+
+    assert len(body) <= sum(len(image) + protocol.MULTIPART_PART_OVERHEAD for image in images)
+
+
+@pytest.mark.parametrize("custom_attributes", ["max_new_tokens=abc", "max_new_tokens=12;max_new_tokens=1e3"])
+def test_bad_custom_attributes_return_400(backend, client, generated, custom_attributes):
+    _, protocol = backend
+    body, content_type = protocol.build_request_body([jpeg(backend, "red")])
+
+    response = invoke(client, body, content_type, custom_attributes)
+
+    assert response.status_code == 400
+    assert CUSTOM_ATTRIBUTES_HEADER in response.get_json()["error"]
+    assert generated == []
+
+
+def test_invalid_image_returns_400(client, generated):
+    response = invoke(client, b"not an image", "image/jpeg", None)
+
+    assert response.status_code == 400
+    assert generated == []